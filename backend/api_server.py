@@ -1,16 +1,35 @@
 import sys
 import os
+import json
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 
 # Add parent directory to path so we can import digital_self
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from digital_self import DigitalSelf
+from brain import async_db
+from brain import db
+from brain.llm_interface import QueueFullError
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    await async_db.init_pool()
+    yield
+    if bot:
+        # Drain buffered logs/observations before the pools go away
+        await asyncio.to_thread(bot.writer.close)
+        bot.user_service.close()
+        await bot.async_user_service.aclose()
+        await bot.async_brain.aclose()
+    await async_db.close_pool()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -29,13 +48,86 @@ except Exception as e:
     print(f"Failed to initialize Digital Self: {e}")
     bot = None
 
+class ActiveChat:
+    """A streaming /chat response that can be cancelled by disconnect or /chat/{id}/cancel."""
+
+    def __init__(self, request_id, user_id=None):
+        self.request_id = request_id
+        self.user_id = user_id
+        self.task = None
+        self.reason = None
+
+    def cancel(self, reason):
+        if self.reason is None and self.task:
+            self.reason = reason
+            self.task.cancel()
+
+# request id -> ActiveChat for streams in progress
+active_chats = {}
+cancel_counts = {"disconnect": 0, "cancel": 0}
+
+async def watch_disconnect(fast_req: Request, chat: ActiveChat):
+    # Tokens may be seconds apart (prompt evaluation), so don't wait for the next send to notice
+    while True:
+        message = await fast_req.receive()
+        if message["type"] == "http.disconnect":
+            chat.cancel("disconnect")
+            return
+
 class ChatRequest(BaseModel):
     message: str
     model: str = "llama3.2:1b"
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "bot_initialized": bot is not None}
+    return {
+        "status": "ok",
+        "bot_initialized": bot is not None,
+        "ollama": bot.brain.health.state() if bot else None,
+    }
+
+@app.get("/metrics/db")
+def db_metrics():
+    return {
+        "sync_pool": db.pool_stats(),
+        "async_pool": async_db.pool_stats(),
+        "write_behind": bot.writer.stats() if bot else {},
+    }
+
+@app.get("/metrics/user_service")
+def user_service_metrics():
+    if not bot:
+         raise HTTPException(status_code=503, detail="Digital Self not initialized")
+    return {
+        "connector": bot.user_service.stats(),
+        "async_connector": bot.async_user_service.stats(),
+        "participants": bot.participants.stats(),
+    }
+
+@app.get("/metrics/retrieval")
+def retrieval_metrics():
+    if not bot:
+         raise HTTPException(status_code=503, detail="Digital Self not initialized")
+    retriever = bot.memory_controller.retriever
+    return {
+        "cache": bot.retrieval_cache.stats() if bot.retrieval_cache else {},
+        "response_cache": bot.response_cache.stats() if bot.response_cache else {},
+        "leg_latency_ms": {name: t * 1000 for name, t in retriever.leg_latency.items()} if retriever else {},
+    }
+
+@app.get("/metrics/llm")
+def llm_metrics():
+    if not bot:
+         raise HTTPException(status_code=503, detail="Digital Self not initialized")
+    return {
+        "scheduler": bot.async_brain.scheduler.stats(),
+        "cancellations": dict(cancel_counts, active_streams=len(active_chats),
+                              **bot.async_brain.cancellation_stats()),
+        "warmup": [warmer.stats() for warmer in bot.warmers],
+        "pool": bot.llm_pool.stats() if bot.llm_pool else {},
+        "prompt_cache": bot.prompt_builder.stats.stats(),
+        "router": bot.router.stats() if bot.router else {},
+    }
 
 @app.post("/chat")
 async def chat(request: ChatRequest, fast_req: Request):
@@ -45,27 +137,100 @@ async def chat(request: ChatRequest, fast_req: Request):
     user_input = request.message
     request_model = request.model
     uid = fast_req.headers.get("X-User-Id")
+    # Always generated here: a client-chosen id could collide with, or target, another stream
+    request_id = uuid.uuid4().hex
     
     print(f"[API] Chat: {user_input[:50]}... | User: {uid}")
     
-    # bot.chat returns a generator (either LLM stream or single-yield intent response)
-    response_generator = bot.chat(user_input, model=request_model, user_id=uid)
+    # bot.achat returns an async generator (either LLM stream or single-yield intent response)
+    try:
+        response_generator = await bot.achat(user_input, model=request_model, user_id=uid)
+    except QueueFullError as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)},
+                            headers={"Retry-After": str(e.retry_after)})
     
+    chat = ActiveChat(request_id, uid)
+
     async def stream_wrapper():
+        chat.task = asyncio.current_task()
+        active_chats[request_id] = chat
+        watcher = asyncio.create_task(watch_disconnect(fast_req, chat))
         try:
-            for chunk in response_generator:
+            async for chunk in response_generator:
                 yield str(chunk)
+        except asyncio.CancelledError:
+            if chat.reason is None:
+                raise
+            # Our own cancellation: end the response cleanly instead of failing the request
+            chat.task.uncancel()
+            cancel_counts[chat.reason] += 1
+            print(f"[API] Chat {request_id} stopped ({chat.reason})")
         except Exception as e:
             print(f"[API ERROR] {e}")
             yield f"[Chat Error: {e}]"
+        finally:
+            watcher.cancel()
+            active_chats.pop(request_id, None)
+            # Closes the Ollama stream right away rather than when the generator is collected
+            await response_generator.aclose()
 
-    return StreamingResponse(stream_wrapper(), media_type="text/plain")
+    return StreamingResponse(stream_wrapper(), media_type="text/plain",
+                             headers={"X-Request-Id": request_id})
+
+@app.post("/chat/{request_id}/cancel")
+async def cancel_chat(request_id: str, fast_req: Request):
+    chat = active_chats.get(request_id)
+    # Streams started by another user look the same as unknown ids
+    if not chat or chat.user_id != fast_req.headers.get("X-User-Id"):
+        raise HTTPException(status_code=404, detail="No active chat with that id")
+    chat.cancel("cancel")
+    return {"cancelled": True, "request_id": request_id}
 
 @app.get("/memories")
-def get_memories():
+async def get_memories():
+    if not bot:
+         raise HTTPException(status_code=503, detail="Digital Self not initialized")
+    return await bot.memory_controller.aget_all_memories()
+
+@app.post("/memories/bulk")
+async def add_memories_bulk(fast_req: Request):
+    """
+    Bulk memory import. Body is NDJSON: one JSON object per line with
+    'content' and optional 'category', 'confidence' and 'source'.
+    """
     if not bot:
          raise HTTPException(status_code=503, detail="Digital Self not initialized")
-    return bot.memory_controller.get_all_memories()
+
+    memories = []
+    buffer = b""
+    line_no = 0
+
+    def parse_line(raw):
+        nonlocal line_no
+        line_no += 1
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            item = json.loads(raw)
+            memories.append(db.normalize_memory_row(item, default_source="bulk_api"))
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid memory on line {line_no}: {e}")
+
+    async for chunk in fast_req.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            parse_line(raw)
+    parse_line(buffer)
+
+    if not memories:
+        return {"inserted": 0, "ids": []}
+
+    ids = await async_db.add_memories_bulk(memories)
+    if not ids:
+        raise HTTPException(status_code=500, detail="Bulk import failed")
+    return {"inserted": len(ids), "ids": ids}
 
 @app.get("/users")
 def get_users():
@@ -0,0 +1,149 @@
+"""
+Benchmark for brain/intent_router.py against the previous chain of
+startswith/find loops and keyword scans. Also checks that both classify
+every utterance in the corpus the same way.
+
+Usage: python bench_intent_router.py [number_of_utterances]
+"""
+import random
+import re
+import sys
+import time
+
+from brain import intent_router
+from brain.memory_controller import MemoryController
+
+LEGACY_COMMAND_PREFIXES = [
+    "remember that", "remember:", "learn that", "store this:",
+    "can you remember", "please remember", "could you remember",
+    "i want you to remember", "make a note that"
+]
+LEGACY_FILLER_PREFIXES = [
+    "just remember", "ok remember", "okay remember", "please remember",
+    "remember that", "remember:", "remember",
+    "just", "ok", "okay", "please", "so", "well"
+]
+
+def legacy_extract(text):
+    cleaned = text.strip()
+    lower_text = cleaned.lower()
+    for prefix in LEGACY_FILLER_PREFIXES:
+        if lower_text.startswith(prefix):
+            cleaned = cleaned[len(prefix):].strip()
+            lower_text = cleaned.lower()
+    return cleaned
+
+def legacy_classify(user_input):
+    """The checks process_input and _process_user_intents used to run, in order."""
+    normalized = user_input.strip()
+    lower_input = normalized.lower()
+    clean_start = re.sub(r'^[^a-zA-Z0-9\s]+', '', lower_input).strip()
+    for prefix in LEGACY_COMMAND_PREFIXES:
+        if clean_start.startswith(prefix):
+            idx = lower_input.find(prefix)
+            if idx == -1:
+                continue
+            content = re.sub(r'^[\s,:]+', '', normalized[idx + len(prefix):].strip())
+            return "memory_command", legacy_extract(content) if content else None
+    if clean_start.startswith("remember") and not clean_start.startswith("remembering"):
+        idx = lower_input.find("remember")
+        if idx != -1:
+            content = re.sub(r'^[\s,:]+', '', normalized[idx + 8:].strip())
+            if content:
+                return "memory_command", legacy_extract(content)
+
+    input_lower = user_input.lower()
+    if re.search(r"\brecogni[sz]e\b", input_lower):
+        return "recognition", None
+    if any(keyword in input_lower for keyword in ["how many recognition", "show my recognitions", "received recognition"]):
+        return "history", None
+    if any(keyword in input_lower for keyword in ["get all users", "list users", "show participants"]):
+        return "list_users", None
+    if "get user" in input_lower or "show user" in input_lower:
+        return "get_user", None
+    return "llm", None
+
+def new_classify(user_input):
+    normalized = user_input.strip()
+    intent = intent_router.classify(normalized)
+    if intent.kind == intent_router.MEMORY_COMMAND:
+        content = intent.command_content(normalized)
+        if intent.explicit or content:
+            return "memory_command", intent_router.strip_filler(content) if content else None
+        return "llm", None
+    return intent.kind, None
+
+TEMPLATES = [
+    "{lead}remember that my {thing} is {value}",
+    "{lead}Remember, my {thing} was {value}",
+    "{lead}please remember {thing} is {value}",
+    "{lead}make a note that {thing} is {value}",
+    "{lead}remember: ok so {thing} is {value}",
+    "remembering {thing} is hard",
+    "recognize {name} for the {thing} launch",
+    "please recognise {name} with great work on {thing}",
+    "how many recognitions have I received?",
+    "show my recognitions please",
+    "list users",
+    "can you show participants who like {thing}",
+    "get user {number}",
+    "show user {number} details",
+    "what is my {thing}?",
+    "tell me something about {thing} and {value}",
+    "I think {thing} is {value}, what do you think?",
+    "hello there",
+    "{lead}remember",
+]
+THINGS = ["birthday", "favorite color", "coffee order", "team", "project", "manager", "sofa", "well-being"]
+VALUES = ["27th December", "blue", "a flat white", "platform", "Atlas", "Neeli", "green", "fine"]
+NAMES = ["neeli kumar", "asha", "Rajesh Iyer", "zoe", "NEET"]
+LEADS = ["", "", "", "  ", "!! ", "...", "Ok ", "just "]
+
+def make_corpus(n, seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        text = rng.choice(TEMPLATES).format(
+            lead=rng.choice(LEADS), thing=rng.choice(THINGS), value=rng.choice(VALUES),
+            name=rng.choice(NAMES), number=rng.randint(1, 9999))
+        # Long rambling messages are where per-keyword scans hurt most
+        if rng.random() < 0.2:
+            text += " " + " ".join(rng.choice(THINGS + VALUES) for _ in range(rng.randint(20, 80)))
+        corpus.append(text)
+    return corpus
+
+def time_it(fn, corpus):
+    start = time.perf_counter()
+    for text in corpus:
+        fn(text)
+    return time.perf_counter() - start
+
+def run_benchmark(n=200000):
+    corpus = make_corpus(n)
+    print(f"Corpus: {len(corpus)} utterances")
+
+    mismatches = [(t, legacy_classify(t), new_classify(t)) for t in corpus if legacy_classify(t) != new_classify(t)]
+    print(f"Mismatches vs legacy: {len(mismatches)}")
+    for text, old, new in mismatches[:5]:
+        print(f"  {text!r}: legacy={old} new={new}")
+
+    legacy = time_it(legacy_classify, corpus)
+    compiled = time_it(new_classify, corpus)
+    print(f"Legacy chain:    {legacy:.3f}s ({legacy / n * 1e6:.2f} us/msg)")
+    print(f"Compiled router: {compiled:.3f}s ({compiled / n * 1e6:.2f} us/msg)")
+    print(f"Speedup: {legacy / compiled:.1f}x")
+
+    # Per-message cost should grow linearly with message length
+    for words in (10, 100, 1000):
+        text = " ".join(random.Random(words).choice(THINGS + VALUES) for _ in range(words))
+        per_msg = time_it(new_classify, [text] * 2000) / 2000
+        print(f"  {len(text):>6} chars: {per_msg * 1e6:.2f} us/msg")
+
+    # Sanity check the fact extraction the controller now does through the router
+    mc = MemoryController()
+    print(f"Example fact: {mc._extract_fact('just remember my birthday was 27th December')!r}")
+    return not mismatches
+
+if __name__ == "__main__":
+    ok = run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,203 @@
+"""
+Async counterpart of brain/db.py for the FastAPI chat path.
+
+Uses an asyncpg pool so Postgres work never blocks the event loop.
+The sync module stays the source of truth for schema, credentials and
+query building; scripts like verify_perf.py keep using it directly.
+"""
+import asyncio
+import re
+
+import asyncpg
+
+from . import db
+
+# Global Async Connection Pool
+connection_pool = None
+_pool_lock = None
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 20
+
+_PLACEHOLDER = re.compile(r'%s|%%')
+
+def to_asyncpg_sql(sql):
+    """
+    Converts psycopg2-style SQL (%s placeholders, %% escapes) to asyncpg ($1, $2, ...).
+    """
+    counter = 0
+
+    def replace(match):
+        nonlocal counter
+        if match.group() == '%%':
+            return '%'
+        counter += 1
+        return f"${counter}"
+
+    return _PLACEHOLDER.sub(replace, sql)
+
+async def init_pool():
+    global connection_pool, _pool_lock
+    if connection_pool:
+        return
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if connection_pool:
+            return
+        try:
+            connection_pool = await asyncpg.create_pool(
+                host=db.DB_HOST,
+                port=int(db.DB_PORT),
+                database=db.DB_NAME,
+                user=db.DB_USER,
+                password=db.DB_PASS,
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+            )
+            print("Async database connection pool initialized.")
+        except Exception as e:
+            print(f"Error initializing async connection pool: {e}")
+
+async def get_pool():
+    if not connection_pool:
+        await init_pool()
+    return connection_pool
+
+async def close_pool():
+    global connection_pool
+    if connection_pool:
+        await connection_pool.close()
+        connection_pool = None
+
+def pool_stats():
+    """Returns async pool utilisation (empty if the pool is not initialized)."""
+    if not connection_pool:
+        return {}
+    size = connection_pool.get_size()
+    idle = connection_pool.get_idle_size()
+    return {
+        "size": size,
+        "max_size": connection_pool.get_max_size(),
+        "in_use": size - idle,
+        "idle": idle,
+    }
+
+def _serialize_timestamps(memories):
+    # Convert timestamp to str for JSON serialization
+    for m in memories:
+        if m.get('created_at'): m['created_at'] = str(m['created_at'])
+        if m.get('last_accessed'): m['last_accessed'] = str(m['last_accessed'])
+    return memories
+
+# --- Memory Access ---
+
+async def add_memory(category, content, confidence=1.0, source="user_interaction"):
+    pool = await get_pool()
+    if not pool: return None
+    try:
+        memory_id = await pool.fetchval('''
+            INSERT INTO long_term_memory (category, content, confidence_score, source, last_accessed)
+            VALUES ($1, $2, $3, $4, CURRENT_TIMESTAMP)
+            RETURNING id
+        ''', category, content, confidence, source)
+        db.notify_memory_change("add", [db.memory_row(memory_id, category, content, confidence, source)])
+        return memory_id
+    except Exception as e:
+        print(f"Error adding memory: {e}")
+        return None
+
+async def add_memories_bulk(memories, batch_size=db.BULK_BATCH_SIZE):
+    """
+    Async counterpart of db.add_memories_bulk. Each batch is sent as one
+    INSERT ... SELECT FROM unnest(...) statement inside a single transaction.
+    Returns the generated ids in input order, or [] if the import failed.
+    """
+    pool = await get_pool()
+    if not pool: return []
+    try:
+        ids = []
+        inserted = []
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for batch in db.iter_batches(memories, batch_size):
+                    normalized = [db.normalize_memory_row(item) for item in batch]
+                    categories, contents, confidences, sources = zip(*normalized)
+                    rows = await conn.fetch('''
+                        INSERT INTO long_term_memory (category, content, confidence_score, source, last_accessed)
+                        SELECT category, content, confidence, source, CURRENT_TIMESTAMP
+                        FROM unnest($1::text[], $2::text[], $3::real[], $4::text[])
+                             WITH ORDINALITY AS t(category, content, confidence, source, ord)
+                        ORDER BY ord
+                        RETURNING id
+                    ''', list(categories), list(contents), list(confidences), list(sources))
+                    batch_ids = [row['id'] for row in rows]
+                    ids.extend(batch_ids)
+                    inserted.extend(db.memory_row(i, *row) for i, row in zip(batch_ids, normalized))
+        db.notify_memory_change("add", inserted)
+        return ids
+    except Exception as e:
+        print(f"Error adding memories in bulk: {e}")
+        return []
+
+async def get_memories(limit=10):
+    pool = await get_pool()
+    if not pool: return []
+    rows = await pool.fetch(f'SELECT {db.MEMORY_COLUMNS} FROM long_term_memory ORDER BY created_at DESC LIMIT $1', limit)
+    return _serialize_timestamps([dict(row) for row in rows])
+
+async def delete_memory(memory_id):
+    pool = await get_pool()
+    if not pool: return
+    await pool.execute('DELETE FROM long_term_memory WHERE id = $1', memory_id)
+    db.notify_memory_change("delete", [{'id': memory_id}])
+
+async def search_memories(query_text, mode=None, limit=5, threshold=None):
+    pool = await get_pool()
+    if not pool: return []
+    sql, params = db.build_search_query(query_text, limit, mode)
+    setup = db.search_setup_statements(mode, threshold)
+    try:
+        async with pool.acquire() as conn:
+            # Setup statements use transaction-local settings
+            async with conn.transaction():
+                for setup_sql, setup_params in setup:
+                    await conn.execute(to_asyncpg_sql(setup_sql), *setup_params)
+                rows = await conn.fetch(to_asyncpg_sql(sql), *params)
+    except asyncpg.PostgresError as e:
+        if (mode or db.SEARCH_MODE) == "ilike":
+            raise
+        print(f"[DB] {mode or db.SEARCH_MODE} search failed, falling back to ILIKE: {e}")
+        sql, params = db.build_search_query(query_text, limit, "ilike")
+        rows = await pool.fetch(to_asyncpg_sql(sql), *params)
+
+    memories = [dict(row) for row in rows]
+    for m in memories:
+        m.pop('relevance', None)
+    return memories
+
+async def search_memories_semantic(query_vec, k=5):
+    pool = await get_pool()
+    if not pool: return []
+    sql, params = db.build_semantic_query(query_vec, k)
+    try:
+        rows = await pool.fetch(to_asyncpg_sql(sql), *params)
+    except asyncpg.PostgresError as e:
+        print(f"[DB] Semantic search failed: {e}")
+        return []
+    return [dict(row) for row in rows]
+
+async def log_conversation(input_text, response_text, model="unknown"):
+    pool = await get_pool()
+    if not pool: return
+    await pool.execute('''
+        INSERT INTO conversation_logs (input_text, response_text, model_used)
+        VALUES ($1, $2, $3)
+    ''', input_text, response_text, model)
+
+async def get_identity():
+    pool = await get_pool()
+    if not pool: return {}
+    row = await pool.fetchrow("SELECT * FROM identity_profile LIMIT 1")
+    if row: return dict(row)
+    return {}
@@ -0,0 +1,195 @@
+"""
+In-process BM25 index over long_term_memory.
+
+For single-box deployments this answers retrieve_context without a
+Postgres round trip. Postings are stored as compact typed arrays
+(document slot + term frequency) rather than dicts of lists and are scored
+through zero-copy NumPy views. The index follows db.add_memory /
+db.delete_memory through db's memory listeners.
+"""
+import math
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from . import db
+
+class BM25Index:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._lock = threading.RLock()
+        self._building = False
+        self._queued_events = []     # changes that arrive while a build is running
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}          # term -> (array('i') slots, array('i') term frequencies)
+        self._df = {}                # term -> number of live documents containing it
+        self._doc_len = array('i')   # slot -> token count
+        self._alive = bytearray()    # slot -> 1 if live, 0 if deleted
+        self._rows = []              # slot -> memory row (None once deleted)
+        self._slot_of = {}           # memory id -> slot
+        self._live_docs = 0
+        self._total_len = 0
+
+    @staticmethod
+    def tokenize(text):
+        return db.extract_keywords(text)
+
+    # --- Building ---
+
+    _STATE = ('_postings', '_df', '_doc_len', '_alive', '_rows', '_slot_of', '_live_docs', '_total_len')
+
+    def build(self, memories):
+        """
+        Rebuilds the index from an iterable of memory rows. The new index is
+        built off to the side so searches and writers aren't blocked meanwhile;
+        changes that arrive during the build are replayed before the swap.
+        """
+        with self._lock:
+            self._building = True
+            self._queued_events = []
+        try:
+            fresh = BM25Index(self.k1, self.b)
+            for row in memories:
+                fresh._add(row)
+        except Exception:
+            with self._lock:
+                self._building = False
+                self._queued_events = []
+            raise
+        with self._lock:
+            for name in self._STATE:
+                setattr(self, name, getattr(fresh, name))
+            self._building = False
+            for event, memories in self._queued_events:
+                self._apply(event, memories)
+            self._queued_events = []
+            self.ready = True
+
+    def build_from_db(self):
+        start = time.time()
+        self.build(db.iter_all_memories())
+        print(f"[BM25] Indexed {self._live_docs} memories in {time.time() - start:.2f}s")
+
+    def build_in_background(self):
+        """Builds from the DB on a worker thread; retrieve_context uses the DB until ready."""
+        thread = threading.Thread(target=self._build_safely, name="bm25-build", daemon=True)
+        thread.start()
+        return thread
+
+    def _build_safely(self):
+        try:
+            self.build_from_db()
+        except Exception as e:
+            print(f"[BM25] Failed to build index: {e}")
+
+    def attach(self):
+        """Keeps the index in sync with memory writes made through brain.db / brain.async_db."""
+        db.add_memory_listener(self.on_memory_change)
+
+    def detach(self):
+        db.remove_memory_listener(self.on_memory_change)
+
+    # --- Incremental updates ---
+
+    def on_memory_change(self, event, memories):
+        with self._lock:
+            if self._building:
+                self._queued_events.append((event, memories))
+                return
+            self._apply(event, memories)
+
+    def _apply(self, event, memories):
+        for m in memories:
+            if event == "add":
+                self._add(m)
+            elif event == "delete":
+                self._remove(m['id'])
+        self._maybe_compact()
+
+    def _add(self, row):
+        if row['id'] in self._slot_of:
+            self._remove(row['id'])
+        tokens = self.tokenize(row['content'])
+        slot = len(self._rows)
+        self._rows.append(row)
+        self._doc_len.append(len(tokens))
+        self._alive.append(1)
+        self._slot_of[row['id']] = slot
+        self._live_docs += 1
+        self._total_len += len(tokens)
+
+        counts = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        for term, tf in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array('i'), array('i'))
+            postings[0].append(slot)
+            postings[1].append(tf)
+            self._df[term] = self._df.get(term, 0) + 1
+
+    def _remove(self, memory_id):
+        slot = self._slot_of.pop(memory_id, None)
+        if slot is None:
+            return
+        # Postings keep the dead slot until the next compaction
+        for term in set(self.tokenize(self._rows[slot]['content'])):
+            self._df[term] -= 1
+        self._alive[slot] = 0
+        self._rows[slot] = None
+        self._live_docs -= 1
+        self._total_len -= self._doc_len[slot]
+
+    def _maybe_compact(self):
+        dead = len(self._rows) - self._live_docs
+        if dead > 1000 and dead > self._live_docs // 4:
+            live_rows = [r for r in self._rows if r is not None]
+            self._reset()
+            for row in live_rows:
+                self._add(row)
+
+    # --- Querying ---
+
+    def search(self, query, k=5):
+        """Returns up to k memory rows ranked by BM25 score."""
+        terms = set(self.tokenize(query))
+        with self._lock:
+            if not terms or not self._live_docs:
+                return []
+            n = self._live_docs
+            avg_len = self._total_len / n
+            k1, b = self.k1, self.b
+            doc_len = np.frombuffer(self._doc_len, dtype=np.int32)
+            alive = np.frombuffer(self._alive, dtype=np.uint8)
+
+            scores = np.zeros(len(self._rows), dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                df = self._df.get(term, 0)
+                if postings is None or df <= 0:
+                    continue
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                slots = np.frombuffer(postings[0], dtype=np.int32)
+                tf = np.frombuffer(postings[1], dtype=np.int32).astype(np.float32)
+                # Slots are unique within a term's postings, so fancy-index += is safe
+                scores[slots] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len[slots] / avg_len))
+
+            scores *= alive
+            matched = np.flatnonzero(scores)
+            if not len(matched):
+                return []
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            # Ties go to the newest memory, like the DB search (id DESC)
+            top = sorted(matched.tolist(), key=lambda slot: (scores[slot], slot), reverse=True)
+            return [dict(self._rows[slot]) for slot in top]
+
+    def __len__(self):
+        return self._live_docs
@@ -1,7 +1,10 @@
 import psycopg2
 from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+import datetime
 import os
+import string
+import threading
 import time
 
 # PostgreSQL Credentials
@@ -11,25 +14,211 @@ DB_NAME = "antigravity"
 DB_USER = "postgres"
 DB_PASS = "root"
 
+# Pool Settings (overridable via environment)
+POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))            # seconds to wait for a free connection
+POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")) # recycle connections older than this
+POOL_PING_AFTER_IDLE = float(os.getenv("DB_POOL_PING_AFTER", "10"))  # pre-ping connections idle longer than this
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+class BoundedConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    getconn() blocks up to `timeout` seconds when all connections are in use
+    instead of raising immediately. Connections are pre-pinged after sitting
+    idle and recycled once they exceed `max_lifetime`. stats() exposes
+    checkout, wait-time and utilisation counters.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=POOL_TIMEOUT, max_lifetime=POOL_MAX_LIFETIME,
+                 ping_after_idle=POOL_PING_AFTER_IDLE, **conn_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after_idle = ping_after_idle
+        self._conn_kwargs = conn_kwargs
+        self._cond = threading.Condition()
+        self._idle = []          # list of (conn, returned_at), used LIFO
+        self._created_at = {}    # id(conn) -> creation time
+        self._in_use = set()
+        self._size = 0           # open connections plus ones being opened
+        self._closed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+        for _ in range(minconn):
+            conn = psycopg2.connect(**conn_kwargs)
+            self._created_at[id(conn)] = time.monotonic()
+            self._idle.append((conn, time.monotonic()))
+            self._size += 1
+
+    def _discard(self, conn):
+        """Closes a connection and frees its slot. Caller holds the lock."""
+        self._created_at.pop(id(conn), None)
+        self._in_use.discard(conn)
+        self._size -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._cond.notify()
+
+    def _reserve(self, deadline, timeout):
+        """
+        Waits for an idle connection or a free slot.
+        Returns (conn, returned_at), or (None, None) when a new slot was reserved.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(conn)
+                    return conn, returned_at
+                if self._size < self.maxconn:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"no connection available after {timeout:.1f}s "
+                        f"({len(self._in_use)}/{self.maxconn} in use)")
+                self._cond.wait(remaining)
+
+    def _check_stale(self, conn, returned_at):
+        """Returns why an idle connection can't be reused, or None if it is healthy."""
+        if conn.closed:
+            return "closed"
+        now = time.monotonic()
+        if self.max_lifetime and now - self._created_at.get(id(conn), now) > self.max_lifetime:
+            return "recycled"
+        if now - returned_at > self.ping_after_idle:
+            try:
+                c = conn.cursor()
+                c.execute("SELECT 1")
+                c.close()
+                conn.rollback()
+            except Exception:
+                return "ping_failed"
+        return None
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            conn, returned_at = self._reserve(deadline, timeout)
+
+            if conn is None:
+                try:
+                    conn = psycopg2.connect(**self._conn_kwargs)
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created_at[id(conn)] = time.monotonic()
+                    self._in_use.add(conn)
+                    self._record_checkout(start)
+                return conn
+
+            # Validate outside the lock so a slow ping doesn't stall other threads
+            stale = self._check_stale(conn, returned_at)
+            with self._cond:
+                if stale is None:
+                    self._record_checkout(start)
+                    return conn
+                if stale == "recycled":
+                    self._recycled += 1
+                elif stale == "ping_failed":
+                    self._ping_failures += 1
+                self._discard(conn)
+
+    def _record_checkout(self, start):
+        waited = time.monotonic() - start
+        self._checkouts += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+
+    def putconn(self, conn, close=False):
+        with self._cond:
+            if conn not in self._in_use:
+                return
+            if close or self._closed or conn.closed:
+                self._discard(conn)
+                return
+            try:
+                # Never hand out a connection stuck in an open/failed transaction
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except Exception:
+                self._discard(conn)
+                return
+            self._in_use.discard(conn)
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            for conn in list(self._in_use):
+                self._discard(conn)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self.maxconn,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "ping_failures": self._ping_failures,
+                "avg_wait_ms": (self._total_wait / self._checkouts * 1000) if self._checkouts else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+            }
+
 # Global Connection Pool
 connection_pool = None
+_init_lock = threading.Lock()
 
 def init_pool():
     global connection_pool
     if connection_pool:
         return
-    try:
-        connection_pool = psycopg2.pool.SimpleConnectionPool(
-            1, 20,
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS
-        )
-        print("Database connection pool initialized.")
-    except Exception as e:
-        print(f"Error initializing connection pool: {e}")
+    with _init_lock:
+        if connection_pool:
+            return
+        try:
+            connection_pool = BoundedConnectionPool(
+                POOL_MIN_CONN, POOL_MAX_CONN,
+                host=DB_HOST,
+                port=DB_PORT,
+                dbname=DB_NAME,
+                user=DB_USER,
+                password=DB_PASS
+            )
+            print("Database connection pool initialized.")
+        except Exception as e:
+            print(f"Error initializing connection pool: {e}")
 
 def get_db_connection():
     global connection_pool
@@ -41,6 +230,9 @@ def get_db_connection():
         
     try:
         return connection_pool.getconn()
+    except PoolTimeout as e:
+        print(f"[DB] Connection pool exhausted: {e}")
+        return None
     except Exception as e:
         print(f"Error getting connection from pool: {e}")
         return None
@@ -50,8 +242,16 @@ def return_connection(conn):
         connection_pool.putconn(conn)
 
 def close_pool():
+    global connection_pool
     if connection_pool:
         connection_pool.closeall()
+        connection_pool = None
+
+def pool_stats():
+    """Returns connection pool counters (empty if the pool is not initialized)."""
+    if not connection_pool:
+        return {}
+    return connection_pool.stats()
 
 def init_db():
     conn = get_db_connection()
@@ -109,6 +309,19 @@ def init_db():
             c.execute('CREATE INDEX IF NOT EXISTS idx_memory_content ON long_term_memory USING GIN (content gin_trgm_ops);')
         except Exception:
             pass
+
+        # Maintained tsvector column + GIN index for ranked full-text search (mode="fts")
+        c.execute('SAVEPOINT fts_setup')
+        try:
+            c.execute(f'''
+                ALTER TABLE long_term_memory ADD COLUMN IF NOT EXISTS content_tsv tsvector
+                GENERATED ALWAYS AS (to_tsvector('{FTS_CONFIG}', content)) STORED
+            ''')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_memory_tsv ON long_term_memory USING GIN (content_tsv);')
+            c.execute('RELEASE SAVEPOINT fts_setup')
+        except Exception as e:
+            print(f"Warning: Could not set up full-text search column. FTS mode will fall back to ILIKE. Error: {e}")
+            c.execute('ROLLBACK TO SAVEPOINT fts_setup')
         
         # 4. Conversation Logs
         c.execute('''
@@ -130,6 +343,49 @@ def init_db():
         return_connection(conn)
         
     ensure_default_identity()
+    # The pgvector column is added by PgVectorStore, which knows its embedder's dimension
+
+def init_vector_schema(dim=None, index_type=None):
+    """
+    Adds the pgvector embedding column and ANN index to long_term_memory.
+    dim must match the embedder; an existing column of another size is
+    reported and left alone rather than failing every later insert.
+    index_type: "hnsw" (default) or "ivfflat". Returns True on success.
+    """
+    dim = dim or EMBEDDING_DIM
+    index_type = index_type or VECTOR_INDEX
+    if index_type not in ("hnsw", "ivfflat"):
+        raise ValueError(f"Unknown vector index '{index_type}', expected 'hnsw' or 'ivfflat'")
+
+    conn = get_db_connection()
+    if not conn: return False
+    c = None
+    try:
+        c = conn.cursor()
+        c.execute('CREATE EXTENSION IF NOT EXISTS vector;')
+        # pgvector stores a vector column's dimension as its type modifier
+        c.execute("SELECT atttypmod FROM pg_attribute WHERE attrelid = 'long_term_memory'::regclass "
+                  "AND attname = 'embedding' AND NOT attisdropped")
+        existing = c.fetchone()
+        if existing and existing[0] != int(dim):
+            print(f"Warning: long_term_memory.embedding is vector({existing[0]}) but the embedder produces "
+                  f"{int(dim)} dims. Semantic DB search unavailable until the column is dropped or "
+                  f"the embedder matches.")
+            conn.rollback()
+            return False
+        c.execute(f'ALTER TABLE long_term_memory ADD COLUMN IF NOT EXISTS embedding vector({int(dim)})')
+        index_options = " WITH (lists = 100)" if index_type == "ivfflat" else ""
+        c.execute(f'CREATE INDEX IF NOT EXISTS idx_memory_embedding ON long_term_memory '
+                  f'USING {index_type} (embedding vector_cosine_ops){index_options};')
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Warning: Could not set up pgvector. Semantic DB search unavailable. Error: {e}")
+        conn.rollback()
+        return False
+    finally:
+        if c: c.close()
+        return_connection(conn)
 
 def ensure_default_identity():
     conn = get_db_connection()
@@ -166,6 +422,34 @@ def ensure_default_identity():
         if c: c.close()
         return_connection(conn)
 
+# --- Change Listeners ---
+# In-process indexes and caches subscribe here to stay in sync with writes.
+# Listeners are called as listener(event, memories) after the write commits:
+# event "add" passes full memory rows, event "delete" passes rows with only 'id'.
+_memory_listeners = []
+
+def add_memory_listener(listener):
+    if listener not in _memory_listeners:
+        _memory_listeners.append(listener)
+
+def remove_memory_listener(listener):
+    if listener in _memory_listeners:
+        _memory_listeners.remove(listener)
+
+def notify_memory_change(event, memories):
+    for listener in list(_memory_listeners):
+        try:
+            listener(event, memories)
+        except Exception as e:
+            print(f"[DB] Memory listener error: {e}")
+
+def memory_row(memory_id, category, content, confidence=1.0, source="user_interaction"):
+    """Builds the row dict listeners receive for a freshly inserted memory."""
+    now = datetime.datetime.now()
+    return {'id': memory_id, 'category': category, 'content': content,
+            'confidence_score': confidence, 'source': source,
+            'created_at': now, 'last_accessed': now}
+
 # --- Memory Access ---
 
 def add_memory(category, content, confidence=1.0, source="user_interaction"):
@@ -181,6 +465,7 @@ def add_memory(category, content, confidence=1.0, source="user_interaction"):
         ''', (category, content, confidence, source))
         memory_id = c.fetchone()[0]
         conn.commit()
+        notify_memory_change("add", [memory_row(memory_id, category, content, confidence, source)])
         return memory_id
     except Exception as e:
         print(f"Error adding memory: {e}")
@@ -189,13 +474,106 @@ def add_memory(category, content, confidence=1.0, source="user_interaction"):
         if c: c.close()
         return_connection(conn)
 
+BULK_BATCH_SIZE = 1000
+
+def normalize_memory_row(item, default_source="bulk_import"):
+    """
+    Converts a bulk-ingest item into a (category, content, confidence, source) tuple.
+    Accepts a plain string, a dict with at least 'content', or a tuple/list
+    in (category, content[, confidence[, source]]) order.
+    Raises ValueError (or TypeError for unsupported item types) on bad input.
+    """
+    if isinstance(item, str):
+        category, content, confidence, source = "FACT", item, 1.0, default_source
+    elif isinstance(item, dict):
+        category = item.get('category') or "FACT"
+        content = item.get('content')
+        confidence = item.get('confidence', item.get('confidence_score', 1.0))
+        source = item.get('source') or default_source
+    else:
+        category, content, *rest = item
+        confidence = rest[0] if len(rest) > 0 else 1.0
+        source = rest[1] if len(rest) > 1 else default_source
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("memory 'content' must be a non-empty string")
+    if not isinstance(category, str) or not isinstance(source, str):
+        raise ValueError("memory 'category' and 'source' must be strings")
+    return (category, content, float(confidence), source)
+
+def iter_batches(items, batch_size=BULK_BATCH_SIZE):
+    """Yields lists of up to batch_size items without materializing the whole iterable."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def add_memories_bulk(memories, batch_size=BULK_BATCH_SIZE):
+    """
+    Inserts many memories in a single transaction using multi-row INSERTs.
+    `memories` may be any iterable (see normalize_memory_row); it is consumed
+    in batches so large imports don't need to fit in memory at once.
+    Returns the generated ids in input order, or [] if the import failed.
+    """
+    conn = get_db_connection()
+    if not conn: return []
+    c = None
+    try:
+        c = conn.cursor()
+        ids = []
+        inserted = []
+        for batch in iter_batches(memories, batch_size):
+            rows = [normalize_memory_row(item) for item in batch]
+            result = execute_values(c, '''
+                INSERT INTO long_term_memory (category, content, confidence_score, source, last_accessed)
+                VALUES %s
+                RETURNING id
+            ''', rows, template="(%s, %s, %s, %s, CURRENT_TIMESTAMP)", page_size=len(rows), fetch=True)
+            batch_ids = [row[0] for row in result]
+            ids.extend(batch_ids)
+            if _memory_listeners:
+                inserted.extend(memory_row(i, *row) for i, row in zip(batch_ids, rows))
+        conn.commit()
+        if inserted:
+            notify_memory_change("add", inserted)
+        return ids
+    except Exception as e:
+        print(f"Error adding memories in bulk: {e}")
+        conn.rollback()
+        return []
+    finally:
+        if c: c.close()
+        return_connection(conn)
+
+def iter_all_memories(batch_size=5000):
+    """
+    Streams every memory row through a server-side cursor, for building
+    in-process indexes at startup without loading the table at once.
+    """
+    conn = get_db_connection()
+    if not conn: return
+    c = None
+    try:
+        c = conn.cursor(name="iter_all_memories", cursor_factory=RealDictCursor)
+        c.itersize = batch_size
+        c.execute(f'SELECT {MEMORY_COLUMNS} FROM long_term_memory ORDER BY id')
+        for row in c:
+            yield dict(row)
+    finally:
+        if c: c.close()
+        conn.rollback()
+        return_connection(conn)
+
 def get_memories(limit=10):
     conn = get_db_connection()
     if not conn: return []
     c = None
     try:
         c = conn.cursor(cursor_factory=RealDictCursor)
-        c.execute('SELECT * FROM long_term_memory ORDER BY created_at DESC LIMIT %s', (limit,))
+        c.execute(f'SELECT {MEMORY_COLUMNS} FROM long_term_memory ORDER BY created_at DESC LIMIT %s', (limit,))
         memories = [dict(row) for row in c.fetchall()]
         # Convert timestamp to str for JSON serialization
         for m in memories:
@@ -214,50 +592,132 @@ def delete_memory(memory_id):
         c = conn.cursor()
         c.execute('DELETE FROM long_term_memory WHERE id = %s', (memory_id,))
         conn.commit()
+        notify_memory_change("delete", [{'id': memory_id}])
     finally:
         if c: c.close()
         return_connection(conn)
 
-def search_memories(query_text):
+# Columns returned for memory rows (excludes search-only columns like content_tsv)
+MEMORY_COLUMNS = "id, category, content, confidence_score, source, created_at, last_accessed"
+
+# Search Settings
+SEARCH_MODES = ("ilike", "fts", "trigram")
+SEARCH_MODE = os.getenv("MEMORY_SEARCH_MODE", "ilike")
+FTS_CONFIG = "english"
+TRIGRAM_THRESHOLD = float(os.getenv("MEMORY_TRIGRAM_THRESHOLD", "0.3"))  # pg_trgm word_similarity cutoff (0-1)
+
+# pgvector Settings (semantic search inside Postgres, shared by all API replicas)
+PGVECTOR_ENABLED = os.getenv("MEMORY_PGVECTOR", "0") == "1"
+EMBEDDING_DIM = int(os.getenv("MEMORY_EMBEDDING_DIM", "768"))   # nomic-embed-text produces 768 dims
+VECTOR_INDEX = os.getenv("MEMORY_VECTOR_INDEX", "hnsw")
+
+# Words ignored when turning a question into search keywords
+STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'were',
+              'when', 'what', 'where', 'who', 'how', 'do', 'did', 'does',
+              'i', 'my', 'me', 'you', 'your', 'did', 'get', 'got'}
+
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+def extract_keywords(query_text):
+    """
+    Splits a query into lowercase search keywords (punctuation and stop words removed).
+    """
+    clean_query_words = query_text.translate(_PUNCTUATION_TABLE).lower().split()
+    return [w for w in clean_query_words if w and w not in STOP_WORDS and len(w) > 1]
+
+def build_search_query(query_text, limit=5, mode=None):
+    """
+    Builds the search SQL for search_memories.
+    mode: "ilike" (substring keyword match), "fts" (ranked full-text search)
+    or "trigram" (fuzzy match, run search_setup_statements first);
+    defaults to SEARCH_MODE.
+    Returns (sql, params) using psycopg2 placeholders.
+    """
+    mode = mode or SEARCH_MODE
+    if mode == "fts":
+        return _build_fts_query(query_text, limit)
+    if mode == "trigram":
+        return _build_trigram_query(query_text, limit)
+    if mode != "ilike":
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+
+    words = extract_keywords(query_text)
+
+    if not words:
+        # Fallback to full string if no keywords left
+        return (f'SELECT DISTINCT {MEMORY_COLUMNS} FROM long_term_memory WHERE content ILIKE %s ORDER BY id DESC LIMIT %s',
+                (f"%{query_text}%", limit))
+
+    # Construct OR query with priority for multiple matches
+    conditions = []
+    params = []
+    for w in words:
+        conditions.append("content ILIKE %s")
+        params.append(f"%{w}%")
+
+    # Add query to search for whole phrases too
+    conditions.append("content ILIKE %s")
+    params.append(f"%{query_text}%")
+
+    sql = f"SELECT DISTINCT {MEMORY_COLUMNS}, " \
+          f"(CASE WHEN content ILIKE %s THEN 2 ELSE 1 END) as relevance " \
+          f"FROM long_term_memory WHERE {' OR '.join(conditions)} " \
+          f"ORDER BY relevance DESC, id DESC LIMIT %s"
+
+    return sql, tuple([f"%{query_text}%"] + params + [limit])
+
+def _build_fts_query(query_text, limit):
+    # Keywords are OR-ed so a memory doesn't need every word of the question;
+    # ts_rank_cd then prefers memories matching more (and closer) terms.
+    words = extract_keywords(query_text)
+    search_text = " or ".join(words) if words else query_text
+    sql = f"SELECT {MEMORY_COLUMNS}, ts_rank_cd(content_tsv, query) AS relevance " \
+          f"FROM long_term_memory, websearch_to_tsquery('{FTS_CONFIG}', %s) AS query " \
+          f"WHERE content_tsv @@ query " \
+          f"ORDER BY relevance DESC, id DESC LIMIT %s"
+    return sql, (search_text, limit)
+
+def _build_trigram_query(query_text, limit):
+    # Each keyword is matched with the word-similarity operator (<%) so the
+    # idx_memory_content trigram index is used and typos like "cofee" still hit.
+    # Memories matching more keywords, more closely, rank first.
+    words = extract_keywords(query_text) or [query_text.lower()]
+    conditions = " OR ".join(["%s <%% content"] * len(words))
+    relevance = " + ".join(["word_similarity(%s, content)"] * len(words))
+    sql = f"SELECT {MEMORY_COLUMNS}, ({relevance}) AS relevance " \
+          f"FROM long_term_memory WHERE {conditions} " \
+          f"ORDER BY relevance DESC, id DESC LIMIT %s"
+    return sql, tuple(words + words + [limit])
+
+def search_setup_statements(mode=None, threshold=None):
+    """
+    Statements to run in the same transaction before a search query.
+    Trigram mode sets the word_similarity threshold used by the <% operator.
+    """
+    if (mode or SEARCH_MODE) != "trigram":
+        return []
+    threshold = TRIGRAM_THRESHOLD if threshold is None else threshold
+    return [("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", (str(threshold),))]
+
+def search_memories(query_text, mode=None, limit=5, threshold=None):
     conn = get_db_connection()
     if not conn: return []
     c = None
     try:
         c = conn.cursor(cursor_factory=RealDictCursor)
         
-        # Enhanced Keyword Search
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 
-                      'when', 'what', 'where', 'who', 'how', 'do', 'did', 'does', 
-                      'i', 'my', 'me', 'you', 'your', 'did', 'get', 'got'}
-        # Clean punctuation from query for word extraction
-        import string
-        translator = str.maketrans('', '', string.punctuation)
-        clean_query_words = query_text.translate(translator).lower().split()
-        
-        words = [w for w in clean_query_words if w and w not in stop_words and len(w) > 1]
-        
-        if not words:
-            # Fallback to full string if no keywords left
-            c.execute('SELECT DISTINCT * FROM long_term_memory WHERE content ILIKE %s ORDER BY id DESC LIMIT 5', (f"%{query_text}%",))
-        else:
-            # Construct OR query with priority for multiple matches
-            conditions = []
-            params = []
-            for w in words:
-                conditions.append("content ILIKE %s")
-                params.append(f"%{w}%")
-            
-            # Add query to search for whole phrases too
-            conditions.append("content ILIKE %s")
-            params.append(f"%{query_text}%")
-            
-            sql = f"SELECT DISTINCT *, " \
-                  f"(CASE WHEN content ILIKE %s THEN 2 ELSE 1 END) as relevance " \
-                  f"FROM long_term_memory WHERE {' OR '.join(conditions)} " \
-                  f"ORDER BY relevance DESC, id DESC LIMIT 5"
-            
-            all_params = [f"%{query_text}%"] + params
-            c.execute(sql, tuple(all_params))
+        sql, params = build_search_query(query_text, limit, mode)
+        try:
+            for setup_sql, setup_params in search_setup_statements(mode, threshold):
+                c.execute(setup_sql, setup_params)
+            c.execute(sql, params)
+        except psycopg2.Error as e:
+            if (mode or SEARCH_MODE) == "ilike":
+                raise
+            # e.g. content_tsv missing on an old schema: degrade to keyword search
+            print(f"[DB] {mode or SEARCH_MODE} search failed, falling back to ILIKE: {e}")
+            conn.rollback()
+            c.execute(*build_search_query(query_text, limit, "ilike"))
             
         memories = [dict(row) for row in c.fetchall()]
         for m in memories:
@@ -267,6 +727,78 @@ def search_memories(query_text):
         if c: c.close()
         return_connection(conn)
 
+# --- Semantic Search (pgvector) ---
+
+def to_vector_literal(vector):
+    """Formats a sequence of floats as a pgvector text literal: '[0.1,0.2,...]'."""
+    return "[" + ",".join(f"{float(x):.7g}" for x in vector) + "]"
+
+def set_memory_embeddings(pairs):
+    """
+    Stores embeddings for existing memories. pairs: iterable of (memory_id, vector).
+    Returns the number of rows updated.
+    """
+    conn = get_db_connection()
+    if not conn: return 0
+    c = None
+    try:
+        c = conn.cursor()
+        updated = 0
+        for batch in iter_batches(pairs):
+            rows = [(memory_id, to_vector_literal(vector)) for memory_id, vector in batch]
+            execute_values(c, '''
+                UPDATE long_term_memory AS m SET embedding = v.embedding::vector
+                FROM (VALUES %s) AS v(id, embedding)
+                WHERE m.id = v.id
+            ''', rows, page_size=len(rows))
+            updated += c.rowcount
+        conn.commit()
+        return updated
+    except Exception as e:
+        print(f"Error storing embeddings: {e}")
+        conn.rollback()
+        return 0
+    finally:
+        if c: c.close()
+        return_connection(conn)
+
+def get_memories_without_embedding(limit=1000):
+    """Returns memories that still need an embedding (for backfilling)."""
+    conn = get_db_connection()
+    if not conn: return []
+    c = None
+    try:
+        c = conn.cursor(cursor_factory=RealDictCursor)
+        c.execute(f'SELECT {MEMORY_COLUMNS} FROM long_term_memory WHERE embedding IS NULL ORDER BY id LIMIT %s', (limit,))
+        return [dict(row) for row in c.fetchall()]
+    finally:
+        if c: c.close()
+        return_connection(conn)
+
+def build_semantic_query(query_vec, k=5):
+    """Returns (sql, params) for a cosine-distance ANN search over the embedding index."""
+    literal = to_vector_literal(query_vec)
+    sql = f"SELECT {MEMORY_COLUMNS}, 1 - (embedding <=> %s::text::vector) AS score " \
+          f"FROM long_term_memory WHERE embedding IS NOT NULL " \
+          f"ORDER BY embedding <=> %s::text::vector LIMIT %s"
+    return sql, (literal, literal, k)
+
+def search_memories_semantic(query_vec, k=5):
+    """Returns the k memories nearest to query_vec (cosine), each with a 'score'."""
+    conn = get_db_connection()
+    if not conn: return []
+    c = None
+    try:
+        c = conn.cursor(cursor_factory=RealDictCursor)
+        c.execute(*build_semantic_query(query_vec, k))
+        return [dict(row) for row in c.fetchall()]
+    except psycopg2.Error as e:
+        print(f"[DB] Semantic search failed: {e}")
+        return []
+    finally:
+        if c: c.close()
+        return_connection(conn)
+
 def log_conversation(input_text, response_text, model="unknown"):
     conn = get_db_connection()
     if not conn: return
@@ -282,6 +814,30 @@ def log_conversation(input_text, response_text, model="unknown"):
         if c: c.close()
         return_connection(conn)
 
+def log_conversations_bulk(rows):
+    """
+    Inserts many (input_text, response_text, model) rows in one transaction.
+    Returns True on success.
+    """
+    conn = get_db_connection()
+    if not conn: return False
+    c = None
+    try:
+        c = conn.cursor()
+        execute_values(c, '''
+            INSERT INTO conversation_logs (input_text, response_text, model_used)
+            VALUES %s
+        ''', list(rows))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error logging conversations: {e}")
+        conn.rollback()
+        return False
+    finally:
+        if c: c.close()
+        return_connection(conn)
+
 def get_identity():
     conn = get_db_connection()
     if not conn: return {}
@@ -0,0 +1,428 @@
+"""
+Semantic memory retrieval with all vectors in one contiguous NumPy matrix.
+
+EmbeddingStore keeps a normalized float32 matrix (one row per memory), so
+a query costs a single matrix-vector product plus an argpartition top-k.
+New memories are queued and embedded in batches. Two embedders are
+provided: OllamaEmbedder uses Ollama's embed endpoint, and
+HashingEmbedder is a deterministic local stand-in for tests and offline
+use. PgVectorStore offers the same interface backed by a pgvector index,
+so several API replicas can share one ANN index.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+from . import db
+from . import async_db
+
+EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+EMBED_BATCH_SIZE = 64
+# Longest a queued memory waits for the background flush
+FLUSH_INTERVAL = 0.5
+
+def normalize_rows(matrix):
+    """L2-normalizes each row in place (zero rows are left as zeros)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+class OllamaEmbedder:
+    def __init__(self, model=EMBED_MODEL, batch_size=EMBED_BATCH_SIZE, client=None):
+        import ollama
+        from .llm_interface import KEEP_ALIVE
+        self.keep_alive = KEEP_ALIVE
+        self.model = model
+        self.batch_size = batch_size
+        self.client = client or ollama.Client()
+        self.dim = None
+
+    def embed(self, texts):
+        """Embeds a list of texts, sending up to batch_size per request."""
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embed(model=self.model, input=texts[start:start + self.batch_size],
+                                         keep_alive=self.keep_alive)
+            vectors.extend(response['embeddings'])
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if len(matrix):
+            self.dim = matrix.shape[1]
+        return matrix
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder (signed feature hashing of keywords
+    and their character trigrams). No model or network needed.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _features(self, text):
+        for word in db.extract_keywords(text):
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                value = int.from_bytes(digest, 'little')
+                sign = 1.0 if value & 1 else -1.0
+                matrix[row, (value >> 1) % self.dim] += sign * weight
+        return matrix
+
+class _QueuedEmbeddings:
+    """
+    New memories from db's listeners are queued and embedded by a daemon
+    thread. Listeners also fire on the event loop (brain.async_db), where an
+    embed call would block every request, so they only ever enqueue. The
+    queue has its own lock, so enqueueing never waits for a search.
+    Subclasses store each embedded batch in _embed_rows(rows).
+    """
+
+    def __init__(self, embedder, batch_size):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._pending_lock = threading.Lock()
+        self._pending = []               # rows waiting to be embedded
+        self._wake = threading.Event()
+        self._worker = None
+
+    def _enqueue(self, memories):
+        with self._pending_lock:
+            self._pending.extend(memories)
+            full = len(self._pending) >= self.batch_size
+        self._start_worker()
+        if full:
+            self._wake.set()
+
+    def _start_worker(self):
+        with self._pending_lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run_worker, name="embedding-flush", daemon=True)
+            self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            if not self._pending:
+                continue
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[Embeddings] Background flush failed: {e}")
+
+    def flush(self):
+        """Embeds and stores any queued memories."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for batch in db.iter_batches(pending, self.batch_size):
+            self._embed_rows(batch)
+
+class EmbeddingStore(_QueuedEmbeddings):
+    def __init__(self, embedder, initial_capacity=1024, batch_size=EMBED_BATCH_SIZE):
+        super().__init__(embedder, batch_size)
+        self.ready = False
+        self._matrix = None              # (capacity, dim) float32, rows [0, _count) in use
+        self._capacity = initial_capacity
+        self._count = 0
+        self._alive = np.zeros(initial_capacity, dtype=bool)
+        self._rows = []                  # slot -> memory row (None once deleted)
+        self._slot_of = {}               # memory id -> slot
+        self._appending = 0              # flushes between embedding and inserting
+        self._deleted = set()            # ids deleted while a flush was embedding them
+        self._building = False           # guarded by _pending_lock, like the queue
+        self._queued_events = []         # changes that arrive while a build is running
+
+    # --- Building ---
+
+    _STATE = ('_matrix', '_capacity', '_count', '_alive', '_rows', '_slot_of')
+
+    def build(self, memories):
+        """
+        Embeds and loads an iterable of memory rows. The new matrix is built
+        off to the side; changes that arrive during the build are replayed
+        before the swap, so a delete racing the startup snapshot sticks.
+        """
+        with self._pending_lock:
+            self._building = True
+            self._queued_events = []
+        try:
+            fresh = EmbeddingStore(self.embedder, self._capacity, self.batch_size)
+            for batch in db.iter_batches(memories, self.batch_size):
+                fresh._embed_rows(batch)
+        except Exception:
+            with self._pending_lock:
+                self._building = False
+                self._queued_events = []
+            raise
+        with self._lock:
+            for name in self._STATE:
+                setattr(self, name, getattr(fresh, name))
+            # Replay until nothing is left, then let listeners through in the same step
+            while True:
+                with self._pending_lock:
+                    events, self._queued_events = self._queued_events, []
+                    if not events:
+                        self._building = False
+                        break
+                for event, memories in events:
+                    self._apply(event, memories)
+            self.ready = True
+
+    def build_from_db(self):
+        start = time.time()
+        self.build(db.iter_all_memories())
+        print(f"[Embeddings] Embedded {len(self)} memories in {time.time() - start:.2f}s")
+
+    def build_in_background(self):
+        thread = threading.Thread(target=self._build_safely, name="embedding-build", daemon=True)
+        thread.start()
+        return thread
+
+    def _build_safely(self):
+        try:
+            self.build_from_db()
+        except Exception as e:
+            print(f"[Embeddings] Failed to build store: {e}")
+
+    def attach(self):
+        db.add_memory_listener(self.on_memory_change)
+
+    def detach(self):
+        db.remove_memory_listener(self.on_memory_change)
+
+    # --- Incremental updates ---
+
+    def on_memory_change(self, event, memories):
+        if event == "add":
+            # Adds only take the queue lock, never the one a search holds
+            with self._pending_lock:
+                if self._building:
+                    self._queued_events.append((event, memories))
+                    return
+            self._enqueue(memories)
+            return
+        with self._lock:
+            with self._pending_lock:
+                if self._building:
+                    self._queued_events.append((event, memories))
+                    return
+            self._apply(event, memories)
+
+    def _apply(self, event, memories):
+        if event == "add":
+            # Embedding is deferred so bursts of writes share one embed call
+            self._enqueue(memories)
+        elif event == "delete":
+            with self._lock:
+                ids = {m['id'] for m in memories}
+                with self._pending_lock:
+                    self._pending = [m for m in self._pending if m['id'] not in ids]
+                if self._appending:
+                    self._deleted |= ids
+                for memory_id in ids:
+                    self._remove(memory_id)
+                self._maybe_compact()
+
+    def _embed_rows(self, rows):
+        with self._lock:
+            self._appending += 1
+        try:
+            vectors = normalize_rows(self.embedder.embed([r['content'] for r in rows]))
+            with self._lock:
+                # A delete that landed while these rows were being embedded wins
+                keep = [i for i, row in enumerate(rows) if row['id'] not in self._deleted]
+                if len(keep) < len(rows):
+                    rows, vectors = [rows[i] for i in keep], vectors[keep]
+                self._insert(rows, vectors)
+        finally:
+            with self._lock:
+                self._appending -= 1
+                if not self._appending:
+                    self._deleted.clear()
+
+    def _insert(self, rows, vectors):
+        if not rows:
+            return
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self._capacity, vectors.shape[1]), dtype=np.float32)
+            for row in rows:
+                if row['id'] in self._slot_of:
+                    self._remove(row['id'])
+            needed = self._count + len(rows)
+            if needed > self._capacity:
+                self._grow(needed)
+            end = self._count + len(rows)
+            self._matrix[self._count:end] = vectors
+            self._alive[self._count:end] = True
+            for offset, row in enumerate(rows):
+                self._slot_of[row['id']] = self._count + offset
+                self._rows.append(row)
+            self._count = end
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[:self._count] = self._matrix[:self._count]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._count] = self._alive[:self._count]
+        self._matrix, self._alive, self._capacity = matrix, alive, capacity
+
+    def _remove(self, memory_id):
+        slot = self._slot_of.pop(memory_id, None)
+        if slot is None:
+            return
+        self._alive[slot] = False
+        self._matrix[slot] = 0.0
+        self._rows[slot] = None
+
+    def _maybe_compact(self):
+        dead = self._count - len(self._slot_of)
+        if dead > 1000 and dead > len(self._slot_of) // 4:
+            self._compact()
+
+    def _compact(self):
+        """Moves live rows to the front of the matrix, reclaiming deleted slots."""
+        live = np.flatnonzero(self._alive[:self._count])
+        self._matrix[:len(live)] = self._matrix[live]
+        self._matrix[len(live):self._count] = 0.0
+        self._alive[:] = False
+        self._alive[:len(live)] = True
+        self._rows = [self._rows[slot] for slot in live]
+        self._slot_of = {row['id']: slot for slot, row in enumerate(self._rows)}
+        self._count = len(live)
+
+    # --- Querying ---
+
+    def search(self, query, k=5):
+        """Returns up to k memory rows most similar to the query, best first."""
+        return self.search_batch([query], k)[0]
+
+    async def asearch(self, query, k=5):
+        # Embedding may be an HTTP call to Ollama, so keep it off the event loop
+        return await asyncio.to_thread(self.search, query, k)
+
+    def search_batch(self, queries, k=5):
+        """Scores several queries with one matrix product; returns a list of result lists."""
+        if self._pending:
+            self.flush()
+        query_vectors = normalize_rows(self.embedder.embed(list(queries)))
+        with self._lock:
+            if not self._count:
+                return [[] for _ in queries]
+            matrix = self._matrix[:self._count]
+            scores = query_vectors @ matrix.T
+            scores[:, ~self._alive[:self._count]] = -np.inf
+
+            k = min(k, self._count)
+            results = []
+            for row_scores in scores:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+                top = top[np.argsort(-row_scores[top])]
+                results.append([dict(self._rows[slot], score=float(row_scores[slot]))
+                                for slot in top if np.isfinite(row_scores[slot]) and row_scores[slot] > 0])
+            return results
+
+    def __len__(self):
+        return len(self._slot_of)
+
+class PgVectorStore(_QueuedEmbeddings):
+    """
+    Semantic search through the pgvector index on long_term_memory.embedding
+    (see db.init_vector_schema). Vectors live in Postgres instead of each
+    worker's RAM; this object only embeds queries and new memories. It is
+    ready once the vector schema has been set up.
+    """
+
+    def __init__(self, embedder, batch_size=EMBED_BATCH_SIZE):
+        super().__init__(embedder, batch_size)
+        self.ready = False
+
+    def attach(self):
+        db.add_memory_listener(self.on_memory_change)
+
+    def detach(self):
+        db.remove_memory_listener(self.on_memory_change)
+
+    def on_memory_change(self, event, memories):
+        # Deleted rows take their embedding with them; only adds need work
+        if event == "add":
+            self._enqueue(memories)
+
+    def _embed_rows(self, rows):
+        vectors = normalize_rows(self.embedder.embed([r['content'] for r in rows]))
+        return db.set_memory_embeddings(zip([r['id'] for r in rows], vectors))
+
+    def backfill(self, batch_size=None):
+        """Embeds every memory that has no embedding yet. Returns the number stored."""
+        batch_size = batch_size or self.batch_size
+        total = 0
+        while True:
+            rows = db.get_memories_without_embedding(limit=batch_size)
+            if not rows:
+                return total
+            stored = self._embed_rows(rows)
+            total += stored
+            if not stored:
+                return total
+
+    def build_in_background(self):
+        thread = threading.Thread(target=self._backfill_safely, name="pgvector-backfill", daemon=True)
+        thread.start()
+        return thread
+
+    def _backfill_safely(self):
+        try:
+            if not db.init_vector_schema(dim=self._embedding_dim()):
+                print("[Embeddings] pgvector schema unavailable; semantic search disabled")
+                return
+            self.ready = True
+            count = self.backfill()
+            if count:
+                print(f"[Embeddings] Backfilled {count} pgvector embeddings")
+        except Exception as e:
+            print(f"[Embeddings] pgvector backfill failed: {e}")
+
+    def _embedding_dim(self):
+        # OllamaEmbedder only learns its size from a first embed call
+        return self.embedder.dim or self.embedder.embed(["dimension probe"]).shape[1]
+
+    def _query_vector(self, query):
+        if self._pending:
+            self.flush()
+        return normalize_rows(self.embedder.embed([query]))[0]
+
+    def search(self, query, k=5):
+        return db.search_memories_semantic(self._query_vector(query), k)
+
+    async def asearch(self, query, k=5):
+        query_vec = await asyncio.to_thread(self._query_vector, query)
+        return await async_db.search_memories_semantic(query_vec, k)
+
+def create_embedder(kind=None):
+    """
+    Builds the embedder selected by DIGITAL_SELF_EMBEDDINGS
+    ("ollama", "hashing", or "off"/unset for none).
+    """
+    kind = kind or os.getenv("DIGITAL_SELF_EMBEDDINGS", "off")
+    if kind == "ollama":
+        return OllamaEmbedder()
+    if kind == "hashing":
+        return HashingEmbedder()
+    return None
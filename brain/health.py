@@ -0,0 +1,120 @@
+"""
+Cached Ollama health state.
+
+A background thread probes Ollama every `interval` seconds, and callers
+read the cached result instead of paying for an ollama.list() round trip
+on every message. Real request failures mark the backend unhealthy right
+away. Listeners are told about state changes, for example to re-warm
+models after Ollama restarts.
+"""
+import os
+import threading
+import time
+
+import ollama
+
+# A probe against a hung Ollama must fail, not block its caller
+PROBE_TIMEOUT = float(os.getenv("OLLAMA_HEALTH_TIMEOUT", "3.0"))
+
+class OllamaHealthMonitor:
+    def __init__(self, client=None, interval=5.0, ttl=15.0):
+        """
+        interval: seconds between background probes.
+        ttl: how long a cached state is trusted if the background thread stalls;
+             after that is_healthy() probes inline.
+        """
+        self.client = client or ollama.Client(timeout=PROBE_TIMEOUT)
+        self.interval = interval
+        self.ttl = ttl
+        self.healthy = None          # None until the first probe
+        self.checked_at = 0.0
+        self.last_error = None
+        self.consecutive_failures = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def add_listener(self, listener):
+        """listener(healthy: bool) is called whenever the state flips."""
+        self._listeners.append(listener)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+
+    def probe(self):
+        try:
+            self.client.list()
+            self.mark_success()
+        except Exception as e:
+            self.mark_failure(e)
+        return self.healthy
+
+    def is_healthy(self):
+        """Returns the cached state, probing inline only if it is missing or stale."""
+        if self.healthy is None or time.monotonic() - self.checked_at > self.ttl:
+            return self.probe()
+        return self.healthy
+
+    def last_known_healthy(self):
+        """
+        Cached state without ever probing, for async code. Unknown (no probe
+        yet) counts as healthy; the request itself will report a failure.
+        """
+        return self.healthy is not False
+
+    def mark_success(self):
+        self._set(True, None)
+
+    def mark_failure(self, error=None):
+        self._set(False, error)
+
+    def _set(self, healthy, error):
+        with self._lock:
+            previous = self.healthy
+            self.healthy = healthy
+            self.checked_at = time.monotonic()
+            if healthy:
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+                self.last_error = str(error) if error else None
+        if previous is not None and previous != healthy:
+            print(f"[Health] Ollama is now {'healthy' if healthy else 'unreachable'}.")
+            for listener in list(self._listeners):
+                try:
+                    listener(healthy)
+                except Exception as e:
+                    print(f"[Health] Listener error: {e}")
+
+    def state(self):
+        return {
+            "healthy": self.healthy,
+            "checked_ago_s": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+_default_monitor = None
+_default_lock = threading.Lock()
+
+def default_monitor():
+    """Process-wide monitor for the default Ollama host, started on first use."""
+    global _default_monitor
+    with _default_lock:
+        if _default_monitor is None:
+            _default_monitor = OllamaHealthMonitor().start()
+        return _default_monitor
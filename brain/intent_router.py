@@ -0,0 +1,117 @@
+"""
+Single-pass classification of incoming messages.
+
+Every message used to go through a series of startswith/find loops for
+memory commands and several `keyword in text` scans for user-service
+intents. classify() does one anchored match for the memory-command
+prefixes and one scan of the lowercased message with a single
+precompiled alternation of every intent keyword, so the cost is
+O(len(message)). The keyword alternation is plain literals (no groups or
+leading assertions) so the regex engine can skip ahead to positions that
+start with one of the keywords' first letters; the matched keyword is
+mapped back to its intent with a dict lookup.
+
+Priorities follow the original order of checks: a memory command wins,
+then recognition, recognition history, list users and get user.
+Everything else goes to the LLM.
+"""
+import re
+
+MEMORY_COMMAND = "memory_command"
+RECOGNITION = "recognition"
+HISTORY = "history"
+LIST_USERS = "list_users"
+GET_USER = "get_user"
+LLM = "llm"
+
+# Explicit command prefixes, longest/most specific first (alternation order is match order)
+COMMAND_PREFIXES = [
+    "remember that", "remember:", "learn that", "store this:",
+    "can you remember", "please remember", "could you remember",
+    "i want you to remember", "make a note that",
+]
+
+# Filler stripped from the front of a remembered fact, applied in this order
+FILLER_PREFIXES = [
+    "just remember", "ok remember", "okay remember", "please remember",
+    "remember that", "remember:", "remember",
+    "just", "ok", "okay", "please", "so", "well",
+]
+
+# Keyword -> intent for everything except memory commands
+KEYWORDS = {
+    "recognize": RECOGNITION, "recognise": RECOGNITION,
+    "how many recognition": HISTORY, "show my recognitions": HISTORY, "received recognition": HISTORY,
+    "get all users": LIST_USERS, "list users": LIST_USERS, "show participants": LIST_USERS,
+    "get user": GET_USER, "show user": GET_USER,
+}
+
+_PRIORITY = {kind: rank for rank, kind in enumerate([RECOGNITION, HISTORY, LIST_USERS, GET_USER])}
+
+def _alternation(phrases):
+    return "|".join(re.escape(p) for p in phrases)
+
+# Leading punctuation (not whitespace), then whitespace, is skipped before a command
+_COMMAND = re.compile(
+    r"[^a-z0-9\s]*\s*(?:(?P<explicit>" + _alternation(COMMAND_PREFIXES) + r")|(?P<bare>remember(?!ing)))",
+    re.IGNORECASE,
+)
+
+# Longest keywords first; "recognize" also needs a word boundary on the left, checked in classify()
+_KEYWORDS = re.compile(
+    _alternation(sorted((k for k in KEYWORDS if KEYWORDS[k] != RECOGNITION), key=len, reverse=True))
+    + r"|recogni[sz]e\b"
+)
+
+# Each optional group strips one filler prefix if present, in list order
+_FILLER = re.compile(
+    "^" + "".join(r"(?:" + re.escape(p) + r"\s*)?" for p in FILLER_PREFIXES),
+    re.IGNORECASE,
+)
+
+_CONTENT_LEAD = re.compile(r"^[\s,:]+")
+
+class Intent:
+    __slots__ = ("kind", "match", "explicit")
+
+    def __init__(self, kind, match=None, explicit=False):
+        self.kind = kind
+        self.match = match          # re.Match of the winning pattern, if any
+        self.explicit = explicit    # memory commands: an explicit prefix rather than a bare "remember"
+
+    def command_content(self, text):
+        """Text after a memory-command prefix, with leading separators removed."""
+        return _CONTENT_LEAD.sub("", text[self.match.end():].strip())
+
+    def __repr__(self):
+        return f"Intent({self.kind!r})"
+
+def _word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+def classify(text):
+    """
+    Classifies a message (already stripped) in one scan. Returns an Intent;
+    for keyword intents the match is against text.lower().
+    """
+    match = _COMMAND.match(text)
+    if match:
+        return Intent(MEMORY_COMMAND, match, explicit=match.lastgroup == "explicit")
+
+    lower = text.lower()
+    best, best_rank = None, None
+    for match in _KEYWORDS.finditer(lower):
+        kind = KEYWORDS[match.group()]
+        if kind == RECOGNITION:
+            if match.start() and _word_char(lower[match.start() - 1]):
+                continue
+            return Intent(RECOGNITION, match)
+        rank = _PRIORITY[kind]
+        if best is None or rank < best_rank:
+            best, best_rank = match, rank
+    if best is None:
+        return Intent(LLM)
+    return Intent(KEYWORDS[best.group()], best)
+
+def strip_filler(text):
+    return text[_FILLER.match(text).end():]
@@ -1,13 +1,50 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import OrderedDict, deque
+
+import httpx
 import ollama
 
+from .health import default_monitor
+from .prompt_builder import PromptBuilder
+
+# Ollama on CPU only serves a few generations well at once; the rest wait in line
+MAX_IN_FLIGHT = int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "4"))
+MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "64"))
+
+# How long Ollama keeps a model loaded after a request; -1 pins it until Ollama restarts
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "-1")
+if KEEP_ALIVE.lstrip("-").isdigit():
+    KEEP_ALIVE = int(KEEP_ALIVE)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Generation settings shared by the sync and async interfaces
+GENERATION_OPTIONS = {
+    "num_ctx": 1024,       # Reduced context for speed
+    "num_predict": 70,     # HARD LIMIT: Stop generating after ~50 words.
+    "num_gpu": 1,
+    "temperature": 0.7,
+    "stop": ["User:", "System:"] # Early stopping
+}
+
 class LLMInterface:
-    def __init__(self, model_name="llama3.2:1b", system_prompt="You are a digital clone of the user."):
+    def __init__(self, model_name="llama3.2:1b", system_prompt="You are a digital clone of the user.", health=None,
+                 prompt_builder=None):
         self.model_name = model_name
-        self.system_prompt = system_prompt
+        # The builder's prefix is the system prompt; it stays byte-identical so Ollama can reuse its KV cache
+        self.prompt_builder = prompt_builder or PromptBuilder(system_prompt)
+        self.system_prompt = self.prompt_builder.prefix
+        # Cached health state: avoids an ollama.list() round trip before every generation
+        self.health = health or default_monitor()
 
-    def chat(self, prompt: str, stream: bool = False, model: str = None):
+    def chat(self, prompt: str, stream: bool = False, model: str = None, memories=None):
         """
-        Generates a response from the LLM.
+        Generates a response from the LLM. memories are rendered into the
+        prompt by the prompt builder.
         """
         if not self.is_ollama_connected():
             return "Error: Could not connect to Ollama. Make sure it is running."
@@ -17,23 +54,21 @@ class LLMInterface:
             target_model = model if model else self.model_name
             print(f"[LLM] Requesting model: {target_model}")
             
+            messages = self.prompt_builder.build(prompt, memories)
             response = ollama.chat(
                 model=target_model,
-                messages=[
-                    {'role': 'system', 'content': self.system_prompt},
-                    {'role': 'user', 'content': prompt},
-                ],
+                messages=messages,
                 stream=stream,
-                options={
-                    "num_ctx": 1024,       # Reduced context for speed
-                    "num_predict": 70,     # HARD LIMIT: Stop generating after ~50 words.
-                    "num_gpu": 1, 
-                    "temperature": 0.7,
-                    "stop": ["User:", "System:"] # Early stopping
-                }
+                options=GENERATION_OPTIONS,
+                keep_alive=KEEP_ALIVE
             )
+            if stream:
+                return self._track_stream(response)
+            self.health.mark_success()
+            self.prompt_builder.stats.record(response.prompt_eval_count)
             return response
         except Exception as e:
+            self._record_failure(e)
             error_msg = f"Error generating response: {e}"
             # If streaming, we must return a generator that yields the error
             if stream:
@@ -42,13 +77,260 @@ class LLMInterface:
                 return error_gen()
             return error_msg
 
+    def _track_stream(self, stream):
+        # The HTTP request only happens once the stream is consumed
+        try:
+            for chunk in stream:
+                if chunk.done:
+                    self.prompt_builder.stats.record(chunk.prompt_eval_count)
+                yield chunk
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        self.health.mark_success()
+
+    def _record_failure(self, error):
+        # Only transport errors mean Ollama is down; a bad model name is a normal error response
+        if not isinstance(error, ollama.ResponseError):
+            self.health.mark_failure(error)
+
     def is_ollama_connected(self):
+        return self.health.is_healthy()
+
+    def update_system_prompt(self, new_prompt):
+        self.prompt_builder = PromptBuilder(new_prompt, stats=self.prompt_builder.stats)
+        self.system_prompt = self.prompt_builder.prefix
+
+
+class QueueFullError(Exception):
+    """Raised when the generation queue is full. retry_after is in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Generation queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class GenerationScheduler:
+    """
+    Admission control for Ollama generations.
+
+    At most max_in_flight generations run at once. Further requests wait in
+    a bounded queue; when it is full, acquire() raises QueueFullError so the
+    caller can shed load instead of piling onto Ollama. Waiters are served
+    by priority (lower first) and, within a priority, round-robin across
+    users so one chatty user can't starve everyone else.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue=MAX_QUEUE):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters = OrderedDict()    # user key -> deque of (priority, seq, future), in rotation order
+        self._queued = 0
+        self._seq = itertools.count()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self._wait_times = deque(maxlen=1000)   # seconds, most recent admissions
+        self._service_times = deque(maxlen=100)
+
+    # --- Admission ---
+
+    def check_capacity(self):
+        """Raises QueueFullError if a new request would be rejected right now."""
+        if self.in_flight >= self.max_in_flight and self._queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+    async def acquire(self, user_id=None, priority=PRIORITY_INTERACTIVE):
+        """Waits for a generation slot. Pair every successful call with release()."""
+        start = time.monotonic()
+        if self.in_flight < self.max_in_flight and not self._queued:
+            self.in_flight += 1
+            self._admit(start)
+            return
+        self.check_capacity()
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        self._waiters.setdefault(user_id, deque()).append(entry)
+        self._queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release()
+            else:
+                self._discard(user_id, entry)
+            raise
+        self._admit(start)
+
+    def release(self, service_time=None):
+        if service_time is not None:
+            self._service_times.append(service_time)
+        self.completed += 1
+        self.in_flight -= 1
+        self._wake_next()
+
+    def _admit(self, start):
+        self.admitted += 1
+        self._wait_times.append(time.monotonic() - start)
+
+    def _wake_next(self):
+        while self.in_flight < self.max_in_flight and self._queued:
+            user_id = self._pick_user()
+            queue = self._waiters[user_id]
+            _, _, future = queue.popleft()
+            self._queued -= 1
+            # Served users go to the back of the rotation
+            del self._waiters[user_id]
+            if queue:
+                self._waiters[user_id] = queue
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _pick_user(self):
+        """First user in rotation order whose head waiter has the best priority."""
+        best_user, best_priority = None, None
+        for user_id, queue in self._waiters.items():
+            priority = queue[0][0]
+            if best_priority is None or priority < best_priority:
+                best_user, best_priority = user_id, priority
+        return best_user
+
+    def _discard(self, user_id, entry):
+        queue = self._waiters.get(user_id)
+        if queue and entry in queue:
+            queue.remove(entry)
+            self._queued -= 1
+            if not queue:
+                del self._waiters[user_id]
+
+    # --- Metrics ---
+
+    def retry_after(self):
+        """Rough seconds until a queue slot frees up, from recent generation times."""
+        average = sum(self._service_times) / len(self._service_times) if self._service_times else 5.0
+        return max(1, round(average * (self._queued + 1) / self.max_in_flight))
+
+    def stats(self):
+        waits = sorted(self._wait_times)
+
+        def percentile(p):
+            return round(waits[min(int(len(waits) * p), len(waits) - 1)] * 1000, 1) if waits else 0.0
+
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "queued_users": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "queue_wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99)},
+        }
+
+class AsyncLLMInterface:
+    """
+    Async counterpart of LLMInterface for the API. One long-lived
+    ollama.AsyncClient (httpx, keep-alive pool) is shared by all streams,
+    so concurrent generations don't each need a worker thread. With an
+    LLMPool, streams are balanced across several Ollama hosts instead.
+    """
+
+    def __init__(self, model_name="llama3.2:1b", system_prompt="You are a digital clone of the user.",
+                 health=None, host=None, max_connections=200, scheduler=None, prompt_builder=None,
+                 pool=None):
+        self.model_name = model_name
+        self.prompt_builder = prompt_builder or PromptBuilder(system_prompt)
+        self.system_prompt = self.prompt_builder.prefix
+        self.health = health or default_monitor()
+        self.pool = pool
+        hosts = len(pool.backends) if pool else 1
+        self.scheduler = scheduler or GenerationScheduler(max_in_flight=MAX_IN_FLIGHT * hosts)
+        self.cancelled_streams = 0
+        self.cancelled_tokens_saved = 0
+        self.client = ollama.AsyncClient(
+            host=host,
+            timeout=httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=30.0),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=60.0),
+        )
+
+    async def stream(self, prompt: str, model: str = None, user_id=None, priority=PRIORITY_INTERACTIVE,
+                     memories=None, outcome=None):
+        """
+        Async iterator of response text chunks. Waits for a scheduler slot
+        first (QueueFullError if the queue is full). Closing it early
+        (aclose) closes the upstream HTTP stream and frees the slot.
+        Errors are yielded as text, possibly after some tokens; pass an
+        `outcome` dict to learn whether the reply is complete:
+        outcome["completed"] is True only once Ollama reported done.
+        """
+        if outcome is not None:
+            outcome["completed"] = False
+        # Cached state only: an inline probe would block the event loop
+        if not (self.pool.is_healthy() if self.pool else self.health.last_known_healthy()):
+            yield "Error: Could not connect to Ollama. Make sure it is running."
+            return
+
+        await self.scheduler.acquire(user_id, priority)
+        started = time.monotonic()
+        response = None
+        tokens = 0
+        finished = False
         try:
-            ollama.list()
-            return True
-        except:
-            return False
+            target_model = model if model else self.model_name
+            print(f"[LLM] Requesting model: {target_model}")
+            try:
+                messages = self.prompt_builder.build(prompt, memories)
+                request = dict(messages=messages, options=GENERATION_OPTIONS, keep_alive=KEEP_ALIVE)
+                if self.pool:
+                    # The pool picks the host and tracks each host's health itself
+                    response = self.pool.chat_stream(target_model, **request)
+                else:
+                    response = await self.client.chat(model=target_model, stream=True, **request)
+                async for chunk in response:
+                    if chunk.done:
+                        finished = True
+                        self.prompt_builder.stats.record(chunk.prompt_eval_count)
+                        if outcome is not None:
+                            outcome["completed"] = True
+                    tokens += 1
+                    yield chunk.message.content or ""
+            except Exception as e:
+                finished = True
+                if outcome is not None:
+                    outcome["completed"] = False
+                if not self.pool and not isinstance(e, ollama.ResponseError):
+                    self.health.mark_failure(e)
+                yield f"Error generating response: {e}"
+                return
+            if not self.pool:
+                self.health.mark_success()
+        finally:
+            if response is not None:
+                # Closing the HTTP stream makes Ollama stop generating
+                await response.aclose()
+                if not finished:
+                    self.cancelled_streams += 1
+                    # Upper bound: generation would have run to num_predict at most
+                    self.cancelled_tokens_saved += max(GENERATION_OPTIONS["num_predict"] - tokens, 0)
+            self.scheduler.release(time.monotonic() - started)
 
     def update_system_prompt(self, new_prompt):
-        self.system_prompt = new_prompt
+        self.prompt_builder = PromptBuilder(new_prompt, stats=self.prompt_builder.stats)
+        self.system_prompt = self.prompt_builder.prefix
+
+    def cancellation_stats(self):
+        return {"cancelled_streams": self.cancelled_streams,
+                "cancelled_tokens_saved": self.cancelled_tokens_saved}
 
+    async def aclose(self):
+        await self.client.close()
+        if self.pool:
+            await self.pool.aclose()
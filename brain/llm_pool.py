@@ -0,0 +1,241 @@
+"""
+Load-balanced pool of Ollama hosts.
+
+Set OLLAMA_HOSTS to a comma-separated list of Ollama URLs to spread
+generations across several nodes. Each stream goes to a healthy host
+chosen by:
+
+1. Model affinity: prefer hosts that already have the model loaded
+   (refreshed from ollama.ps() in the background), so nobody pays a load.
+2. Least outstanding requests among those.
+
+Each host has its own OllamaHealthMonitor. A transport error ejects the
+host until its monitor sees it answer again, and the stream fails over
+to the next host if no output has been sent yet. With OLLAMA_HEDGE_MS
+set, a stream whose first token hasn't arrived within that many
+milliseconds is also started on a second host, and whichever answers
+first wins; the loser is closed.
+"""
+import asyncio
+import os
+import threading
+
+import httpx
+import ollama
+
+from .health import OllamaHealthMonitor, PROBE_TIMEOUT
+
+HOSTS = [h.strip() for h in os.getenv("OLLAMA_HOSTS", "").split(",") if h.strip()]
+HEDGE_AFTER_MS = int(os.getenv("OLLAMA_HEDGE_MS", "0"))   # 0 disables hedging
+MODEL_REFRESH_INTERVAL = 10.0
+
+class OllamaBackend:
+    def __init__(self, host, max_connections=200):
+        self.host = host
+        self.client = ollama.AsyncClient(
+            host=host,
+            timeout=httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=30.0),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=60.0),
+        )
+        # Model loads (warm-up) can take a while; health probes and ps() must not
+        self.sync_client = ollama.Client(
+            host=host, timeout=httpx.Timeout(connect=5.0, read=120.0, write=30.0, pool=30.0))
+        self.control_client = ollama.Client(host=host, timeout=PROBE_TIMEOUT)
+        self.health = OllamaHealthMonitor(client=self.control_client)
+        self.outstanding = 0
+        self.loaded_models = set()
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def available(self):
+        # Cached state only: picking a host must not block on a probe
+        return self.health.healthy is not False
+
+    def refresh_models(self):
+        response = self.control_client.ps()
+        self.loaded_models = {m.model for m in response.models} | {m.name for m in response.models}
+
+    def stats(self):
+        return {
+            "host": self.host,
+            "healthy": self.health.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded_models),
+        }
+
+class LLMPool:
+    def __init__(self, hosts, hedge_after_ms=HEDGE_AFTER_MS, refresh_interval=MODEL_REFRESH_INTERVAL):
+        if not hosts:
+            raise ValueError("LLMPool needs at least one host")
+        self.backends = [OllamaBackend(host) for host in hosts]
+        self.hedge_after = hedge_after_ms / 1000 if hedge_after_ms else None
+        self.refresh_interval = refresh_interval
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """Returns a started pool if OLLAMA_HOSTS is set, otherwise None."""
+        return cls(HOSTS).start() if HOSTS else None
+
+    def start(self):
+        for backend in self.backends:
+            backend.health.start()
+        self._thread = threading.Thread(target=self._refresh_loop, name="llm-pool-models", daemon=True)
+        self._thread.start()
+        return self
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            for backend in self.backends:
+                if not backend.available:
+                    continue
+                try:
+                    backend.refresh_models()
+                except Exception as e:
+                    print(f"[LLMPool] Could not list models on {backend.host}: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    def is_healthy(self):
+        return any(backend.available for backend in self.backends)
+
+    # --- Balancing ---
+
+    def pick(self, model, exclude=()):
+        """Healthy host with the model loaded and the fewest outstanding requests."""
+        candidates = [b for b in self.backends if b not in exclude and b.available]
+        if not candidates:
+            # Everyone looks down; trying beats failing without a request
+            candidates = [b for b in self.backends if b not in exclude]
+        if not candidates:
+            return None
+        warm = [b for b in candidates if model in b.loaded_models]
+        return min(warm or candidates, key=lambda b: b.outstanding)
+
+    # --- Streaming ---
+
+    async def chat_stream(self, model, **kwargs):
+        """
+        Async iterator of ChatResponse chunks from the chosen host. Raises
+        the last error if every host failed before producing output.
+        """
+        tried = set()
+        last_error = None
+        while True:
+            primary = self.pick(model, exclude=tried)
+            if primary is None:
+                raise last_error or ConnectionError("No Ollama hosts available")
+            tried.add(primary)
+            try:
+                backend, chunks, first = await self._race(primary, model, kwargs, tried)
+                break
+            except ollama.ResponseError:
+                # The host answered; a bad model name won't work anywhere else either
+                raise
+            except Exception as e:
+                last_error = e
+                self.failovers += 1
+                print(f"[LLMPool] {primary.host} failed, trying another host: {e}")
+
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+            backend.health.mark_success()
+        except ollama.ResponseError:
+            raise
+        except Exception as e:
+            self._failed(backend, e)
+            raise
+        finally:
+            await chunks.aclose()
+            backend.outstanding -= 1
+
+    async def _race(self, primary, model, kwargs, tried):
+        """Starts the primary (and a hedge if it is slow); returns the first to produce a chunk."""
+        tasks = {asyncio.create_task(self._open(primary, model, kwargs))}
+        done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+        if not done:
+            secondary = self.pick(model, exclude=tried)
+            if secondary:
+                tried.add(secondary)
+                self.hedged += 1
+                tasks.add(asyncio.create_task(self._open(secondary, model, kwargs)))
+
+        pending = set(tasks)
+        winner = error = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        # Both finished in the same tick; keep one
+                        pending.add(task)
+            if winner is None:
+                raise error
+            backend, _, _ = winner.result()
+            if backend is not primary:
+                self.hedge_wins += 1
+            return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                await self._discard(task)
+
+    async def _open(self, backend, model, kwargs):
+        backend.outstanding += 1
+        backend.requests += 1
+        chunks = None
+        try:
+            chunks = await backend.client.chat(model=model, stream=True, **kwargs)
+            first = await chunks.__anext__()
+            return backend, chunks, first
+        except BaseException as e:
+            if chunks is not None:
+                await chunks.aclose()
+            backend.outstanding -= 1
+            if isinstance(e, Exception) and not isinstance(e, ollama.ResponseError):
+                self._failed(backend, e)
+            raise
+
+    async def _discard(self, task):
+        # A losing hedge: if it connected before being cancelled, close its stream
+        try:
+            backend, chunks, _ = await task
+        except BaseException:
+            return
+        await chunks.aclose()
+        backend.outstanding -= 1
+
+    def _failed(self, backend, error):
+        backend.failures += 1
+        backend.health.mark_failure(error)
+
+    # --- Lifecycle ---
+
+    async def aclose(self):
+        self._stop.set()
+        for backend in self.backends:
+            backend.health.stop()
+            await backend.client.close()
+
+    def stats(self):
+        return {
+            "hosts": [backend.stats() for backend in self.backends],
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+        }
@@ -1,8 +1,27 @@
 from . import db
-import re
+from . import async_db
+from .write_behind import MEMORY
+from .retrieval import HybridRetriever
+from .prompt_builder import PromptBuilder
+from .intent_router import classify, strip_filler, MEMORY_COMMAND
 
 class MemoryController:
-    def __init__(self):
+    def __init__(self, writer=None, local_index=None, embedding_store=None, cache=None):
+        # Optional WriteBehindQueue: implicit observations are buffered instead of written inline
+        self.writer = writer
+        # Optional in-process BM25Index: answers retrieval without a DB round trip once built
+        self.local_index = local_index
+        # Optional EmbeddingStore / PgVectorStore: semantic retrieval
+        self.embedding_store = embedding_store
+        # Optional RetrievalCache: repeat questions skip the search entirely
+        self.cache = cache
+        # With a semantic store, keyword and semantic results are fused (RRF + recency/confidence)
+        self.retriever = None
+        if embedding_store:
+            self.retriever = HybridRetriever(
+                legs={"keyword": self._keyword_search, "semantic": self._semantic_search},
+                async_legs={"keyword": self._akeyword_search, "semantic": self._asemantic_search},
+            )
         # We could initialize an LLM here for classification if we wanted strictly local-first neural classification
         # For now, we'll use rule-based + fallback to default category
         self.categories = ["FACT", "PREFERENCE", "BELIEF", "IDEOLOGY", "SKILL", "PERSONAL_CONTEXT"]
@@ -11,21 +30,9 @@ class MemoryController:
         """
         Extracts the core fact from user input by removing filler words and command prefixes.
         """
-        cleaned = text.strip()
-        lower_text = cleaned.lower()
-        
         # Remove common filler/command words from the beginning
-        filler_prefixes = [
-            "just remember", "ok remember", "okay remember", "please remember",
-            "remember that", "remember:", "remember",
-            "just", "ok", "okay", "please", "so", "well"
-        ]
-        
-        for prefix in filler_prefixes:
-            if lower_text.startswith(prefix):
-                # Remove the prefix and any following whitespace
-                cleaned = cleaned[len(prefix):].strip()
-                lower_text = cleaned.lower()
+        cleaned = strip_filler(text.strip())
+        lower_text = cleaned.lower()
         
         # Normalize common patterns
         # "my X was Y" -> "X is Y"
@@ -41,62 +48,55 @@ class MemoryController:
         
         return cleaned.strip()
 
-    def process_input(self, user_input: str):
+    def process_input(self, user_input: str, intent=None):
         """
-        Analyzes input for memory commands.
+        Analyzes input for memory commands. intent is an optional
+        pre-computed intent_router.classify() result.
         Returns: (is_command, response_message)
         """
+        is_command, fact, category, response = self._match_command(user_input, intent)
+        if fact:
+            db.add_memory(category, fact)
+        return is_command, response
+
+    async def aprocess_input(self, user_input: str, intent=None):
+        """
+        Async variant of process_input that stores through the async DB pool.
+        """
+        is_command, fact, category, response = self._match_command(user_input, intent)
+        if fact:
+            await async_db.add_memory(category, fact)
+        return is_command, response
+
+    def _match_command(self, user_input: str, intent=None):
+        """
+        Parses a memory command without touching the database.
+        Returns: (is_command, fact_to_store, category, response_message)
+        """
         normalized = user_input.strip()
-        lower_input = normalized.lower()
-        
-        # 1. Clean starting punctuation like "Remember," -> "remember"
-        # We want to check prefixes against a version that has no leading non-alphanumeric chars (except space)
-        clean_start = re.sub(r'^[^a-zA-Z0-9\s]+', '', lower_input).strip()
-        
-        # Explicit command prefixes
-        command_prefixes = [
-            "remember that", "remember:", "learn that", "store this:", 
-            "can you remember", "please remember", "could you remember",
-            "i want you to remember", "make a note that"
-        ]
-        
-        # Check explicit long prefixes first
-        for prefix in command_prefixes:
-            if clean_start.startswith(prefix):
-                 # Find approximate location in original string to preserve case in content
-                 # We look for the prefix in the lower_input
-                 idx = lower_input.find(prefix)
-                 if idx == -1: continue # Should not happen if startswith matches, unless punctuation logic differs
-                 
-                 content = normalized[idx + len(prefix):].strip()
-                 # Clean leading punctuation from content like ": " or ", " or " that"
-                 content = re.sub(r'^[\s,:]+', '', content)
-                 
-                 if not content:
-                     return True, "I need something to remember."
-                 
-                 # Extract clean fact
-                 fact = self._extract_fact(content)
-                 category = self._classify(fact)
-                 db.add_memory(category, fact)
-                 return True, f"I have stored that in my memory as a {category}."
-        
-        # Catch basic "Remember X" if not caught above
-        if clean_start.startswith("remember") and not clean_start.startswith("remembering"):
-             idx = lower_input.find("remember")
-             if idx != -1:
-                 content = normalized[idx + 8:].strip()
-                 content = re.sub(r'^[\s,:]+', '', content)
-                 
-                 if content:
-                     fact = self._extract_fact(content)
-                     category = self._classify(fact)
-                     db.add_memory(category, fact)
-                     return True, f"I have put '{fact}' into long-term memory."
-
-        return False, None
-
-    def store_observation(self, content: str):
+        # One compiled scan recognizes the explicit prefixes ("remember that", "make a note that", ...)
+        # and a bare leading "remember", after any leading punctuation like "Remember,"
+        intent = intent or classify(normalized)
+        if intent.kind != MEMORY_COMMAND:
+            return False, None, None, None
+
+        content = intent.command_content(normalized)
+        if intent.explicit:
+            if not content:
+                return True, None, None, "I need something to remember."
+            fact = self._extract_fact(content)
+            category = self._classify(fact)
+            return True, fact, category, f"I have stored that in my memory as a {category}."
+
+        # Bare "Remember X"
+        if content:
+            fact = self._extract_fact(content)
+            category = self._classify(fact)
+            return True, fact, category, f"I have put '{fact}' into long-term memory."
+
+        return False, None, None, None
+
+    def store_observation(self, content: str, session_id=None):
         """
         Implicitly stores an observation/fact from the user.
         We only store if it looks informative (simple heuristic).
@@ -118,7 +118,10 @@ class MemoryController:
             return  # Skip if extraction results in too short content
         
         category = self._classify(fact)
-        db.add_memory(category, fact)
+        if self.writer:
+            self.writer.add_memory(category, fact, session_id=session_id)
+        else:
+            db.add_memory(category, fact)
 
     def _classify(self, content: str) -> str:
         """
@@ -136,19 +139,89 @@ class MemoryController:
         
         return "FACT" # Default
 
-    def retrieve_context(self, query: str) -> str:
+    def retrieve_context(self, query: str, session_id=None) -> str:
         """
         Retrieves relevant memories for a prompt.
         """
-        memories = db.search_memories(query)
-        if not memories:
-            return ""
-        
-        context_lines = ["Relevant Memories:"]
-        for m in memories:
-            context_lines.append(f"- [{m['category']}] {m['content']}")
-        
-        return "\n".join(context_lines)
+        return self._format_context(self.retrieve_memories(query, session_id))
+
+    async def aretrieve_context(self, query: str, session_id=None) -> str:
+        """
+        Async variant of retrieve_context backed by the async DB pool.
+        """
+        return self._format_context(await self.aretrieve_memories(query, session_id))
+
+    def retrieve_memories(self, query: str, session_id=None, k=5):
+        key = version = memories = None
+        if self.cache:
+            key = self.cache.make_key(query, k)
+            memories, version = self.cache.get(key)
+        if memories is None:
+            if self.retriever:
+                memories = self.retriever.retrieve(query, k)
+            else:
+                memories = self._keyword_search(query, k)
+            if self.cache:
+                self.cache.put(key, memories, version)
+        return self._pending_matches(query, session_id) + memories
+
+    async def aretrieve_memories(self, query: str, session_id=None, k=5):
+        key = version = memories = None
+        if self.cache:
+            key = self.cache.make_key(query, k)
+            memories, version = self.cache.get(key)
+        if memories is None:
+            if self.retriever:
+                memories = await self.retriever.aretrieve(query, k)
+            else:
+                memories = await self._akeyword_search(query, k)
+            if self.cache:
+                self.cache.put(key, memories, version)
+        return self._pending_matches(query, session_id) + memories
+
+    # --- Retrieval legs ---
+
+    def _keyword_search(self, query: str, k=5):
+        # The in-process BM25 index answers without a DB round trip once built
+        if self.local_index and self.local_index.ready:
+            return self.local_index.search(query, k)
+        return db.search_memories(query, limit=k)
+
+    async def _akeyword_search(self, query: str, k=5):
+        if self.local_index and self.local_index.ready:
+            return self.local_index.search(query, k)
+        return await async_db.search_memories(query, limit=k)
+
+    def _semantic_search(self, query: str, k=5):
+        if self.embedding_store and self.embedding_store.ready:
+            return self.embedding_store.search(query, k)
+        return []
+
+    async def _asemantic_search(self, query: str, k=5):
+        if self.embedding_store and self.embedding_store.ready:
+            return await self.embedding_store.asearch(query, k)
+        return []
+
+    def _pending_matches(self, query: str, session_id=None):
+        """
+        Observations this session queued in the write-behind buffer that match
+        the query, so they are visible before the background flush lands.
+        """
+        if not self.writer:
+            return []
+        keywords = db.extract_keywords(query) or [query.lower()]
+        matches = []
+        for category, content, _, _ in self.writer.pending(session_id, kind=MEMORY):
+            content_lower = content.lower()
+            if any(w in content_lower for w in keywords):
+                matches.append({'category': category, 'content': content})
+        return matches
+
+    def _format_context(self, memories) -> str:
+        return PromptBuilder.format_memories(memories)
 
     def get_all_memories(self):
         return db.get_memories(limit=100) # limit for safety
+
+    async def aget_all_memories(self):
+        return await async_db.get_memories(limit=100)
@@ -0,0 +1,88 @@
+"""
+Routes simple turns to a small, fast model.
+
+Greetings, thanks, yes/no answers and other short conversational turns
+don't need the model the UI asked for. ModelRouter sends them to
+fast_model and escalates to the requested model only when a cheap
+heuristic says the turn needs it: it is long, it asks for reasoning or
+writing, or it comes with memories the answer has to use.
+"""
+import os
+import re
+import threading
+from collections import deque
+
+FAST_MODEL = os.getenv("OLLAMA_FAST_MODEL", "llama3.2:1b")
+FAST_MAX_WORDS = int(os.getenv("OLLAMA_FAST_MAX_WORDS", "8"))
+
+FAST = "fast"
+REQUESTED = "requested"
+
+_SMALL_TALK = re.compile(
+    r"^(hi|hello|hey|yo|hiya|good (morning|afternoon|evening|night)|thanks|thank you|thx|cheers|"
+    r"bye|goodbye|see you|ok|okay|cool|nice|great|yes|yeah|yep|sure|no|nope|nah|lol|haha)\b"
+)
+_NEEDS_REASONING = re.compile(
+    r"\b(why|how|explain|compare|describe|write|code|summari[sz]e|analy[sz]e|plan|translate|"
+    r"calculate|difference|pros|cons|story|poem|essay|list)\b"
+)
+
+class ModelRouter:
+    def __init__(self, fast_model=FAST_MODEL, max_fast_words=FAST_MAX_WORDS):
+        self.fast_model = fast_model
+        self.max_fast_words = max_fast_words
+        self._lock = threading.Lock()
+        self._latency = {FAST: _RouteStats(), REQUESTED: _RouteStats()}
+
+    def classify(self, user_input, memories=None):
+        """Returns FAST if the turn is simple enough for the small model."""
+        text = user_input.strip().lower()
+        words = text.split()
+        if not words or _NEEDS_REASONING.search(text):
+            return REQUESTED
+        if _SMALL_TALK.match(text) and len(words) <= self.max_fast_words:
+            return FAST
+        # Short statements are fine too, unless the answer must draw on recalled memories
+        if len(words) <= self.max_fast_words // 2 and not memories:
+            return FAST
+        return REQUESTED
+
+    def route(self, user_input, requested_model, memories=None):
+        """Returns (model, route) for a turn."""
+        if not requested_model or requested_model == self.fast_model:
+            return requested_model or self.fast_model, REQUESTED
+        route = self.classify(user_input, memories)
+        return (self.fast_model if route == FAST else requested_model), route
+
+    def record(self, route, first_token_s, total_s):
+        with self._lock:
+            self._latency[route].add(first_token_s, total_s)
+
+    def stats(self):
+        with self._lock:
+            return {"fast_model": self.fast_model,
+                    "routes": {name: s.summary() for name, s in self._latency.items()}}
+
+class _RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.first_token = deque(maxlen=500)
+        self.total = deque(maxlen=500)
+
+    def add(self, first_token_s, total_s):
+        self.count += 1
+        if first_token_s is not None:
+            self.first_token.append(first_token_s)
+        self.total.append(total_s)
+
+    def summary(self):
+        return {"count": self.count,
+                "first_token_ms": _percentiles(self.first_token),
+                "total_ms": _percentiles(self.total)}
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0}
+    ordered = sorted(samples)
+    pick = lambda p: round(ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000, 1)
+    return {"p50": pick(0.5), "p95": pick(0.95)}
@@ -0,0 +1,196 @@
+"""
+Local, indexed copy of the user service's participant list.
+
+The recognition intent needs to find a participant by name in free text
+("recognize neeli kumar for the demo"). Instead of downloading every
+participant per message, ParticipantDirectory keeps the list in memory,
+refreshes it in the background (a conditional GET with the last ETag, so
+an unchanged list costs a 304), and indexes it two ways:
+
+- an exact phrase index of full names, usernames and first names, so the
+  names in a message are found with a few dict lookups;
+- a trigram index of names for typos ("neet" -> "neeli").
+"""
+import re
+import string
+import threading
+import time
+
+MAX_NAME_WORDS = 4
+FUZZY_THRESHOLD = 0.3
+
+_WORD = re.compile(r"\S+")
+
+def _tokens(text):
+    """
+    (word, start, end) for each word in text, with surrounding punctuation
+    ("rao," / "(asha)") trimmed off. Inner punctuation stays, so usernames
+    like "asha.r" still match.
+    """
+    tokens = []
+    for match in _WORD.finditer(text):
+        raw = match.group()
+        word = raw.strip(string.punctuation)
+        if word:
+            start = match.start() + len(raw) - len(raw.lstrip(string.punctuation))
+            tokens.append((word, start, start + len(word)))
+    return tokens
+
+def _trigrams(word):
+    padded = f"$${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _Index:
+    """Immutable snapshot of the participant indexes; swapped whole on refresh."""
+
+    def __init__(self, users):
+        self.users = users
+        self.phrases = {}      # normalized name phrase -> (priority, user)
+        self.trigrams = {}     # trigram -> set of single-word names
+        self.words = {}        # single-word name -> user
+        self.max_words = 1
+        for user in users:
+            full_name = (user.get('fullName') or '').lower().strip()
+            user_name = (user.get('userName') or '').lower().strip()
+            first_name = full_name.split()[0] if full_name else ''
+            # Full names beat usernames beat first names when the same phrase is ambiguous
+            self._add_phrase(full_name, 0, user)
+            self._add_phrase(user_name, 1, user)
+            if len(first_name) > 3:
+                self._add_phrase(first_name, 2, user)
+            for word in {first_name, user_name}:
+                if len(word) > 3 and ' ' not in word:
+                    self.words.setdefault(word, user)
+                    for gram in _trigrams(word):
+                        self.trigrams.setdefault(gram, set()).add(word)
+
+    def _add_phrase(self, phrase, priority, user):
+        phrase = " ".join(phrase.split())
+        if not phrase:
+            return
+        current = self.phrases.get(phrase)
+        if current is None or priority < current[0]:
+            self.phrases[phrase] = (priority, user)
+        self.max_words = min(max(self.max_words, len(phrase.split())), MAX_NAME_WORDS)
+
+class ParticipantDirectory:
+    def __init__(self, user_service, ttl=60.0):
+        self.user_service = user_service
+        self.ttl = ttl
+        self._index = _Index([])
+        self._etag = None
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.refreshes = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    # --- Refreshing ---
+
+    def start(self):
+        """Loads the directory and keeps it fresh on a background thread."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="participant-directory", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.ttl)
+
+    def refresh(self):
+        """Fetches the participant list unless the service says it is unchanged."""
+        with self._refresh_lock:
+            try:
+                users, etag = self.user_service.get_all_users_if_changed(self._etag)
+            except Exception as e:
+                self.errors += 1
+                print(f"[Participants] Refresh failed: {e}")
+                return False
+            if users is None:
+                self.not_modified += 1
+            else:
+                self._index = _Index(list(users))
+                self.refreshes += 1
+            self._etag = etag
+            self._loaded_at = time.monotonic()
+            return True
+
+    def _ensure_loaded(self):
+        # Before the first background load lands (or if it failed), load inline once
+        if not self._loaded_at:
+            self.refresh()
+
+    # --- Lookup ---
+
+    def users(self):
+        self._ensure_loaded()
+        return list(self._index.users)
+
+    def resolve(self, text):
+        """
+        Finds the participant named in text. Returns (user, matched_text) or
+        None. Exact names win (longest phrase first, earliest position); if
+        none occurs, the first word is matched fuzzily against first names
+        and usernames.
+        """
+        self._ensure_loaded()
+        index = self._index
+        lower = text.lower()
+        tokens = _tokens(lower)
+        if not tokens:
+            return None
+        words = [word for word, _, _ in tokens]
+
+        best = None
+        for length in range(min(index.max_words, len(words)), 0, -1):
+            for start in range(len(words) - length + 1):
+                phrase = " ".join(words[start:start + length])
+                hit = index.phrases.get(phrase)
+                if hit and (best is None or hit[0] < best[0]):
+                    # matched_text is the span as written, so callers can cut it out of text
+                    best = (hit[0], hit[1], lower[tokens[start][1]:tokens[start + length - 1][2]])
+                    if hit[0] == 0:
+                        break
+            if best:
+                return best[1], best[2]
+
+        return self._fuzzy(index, words[0])
+
+    def _fuzzy(self, index, word):
+        if len(word) <= 3:
+            return None
+        grams = _trigrams(word)
+        candidates = set()
+        for gram in grams:
+            candidates |= index.trigrams.get(gram, set())
+        best_name, best_score = None, 0.0
+        for name in candidates:
+            name_grams = _trigrams(name)
+            score = len(grams & name_grams) / len(grams | name_grams)
+            # Same first three letters (the old prefix rule) counts as a match on its own
+            if name[:3] == word[:3]:
+                score = max(score, FUZZY_THRESHOLD)
+            if score > best_score:
+                best_name, best_score = name, score
+        if best_name is None or best_score < FUZZY_THRESHOLD:
+            return None
+        return index.words[best_name], word
+
+    def stats(self):
+        return {
+            "participants": len(self._index.users),
+            "age_s": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+        }
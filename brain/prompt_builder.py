@@ -0,0 +1,74 @@
+"""
+Prompt assembly that keeps Ollama's KV cache warm.
+
+Ollama reuses the evaluated tokens of the longest prefix a prompt shares
+with the previous one, and on CPU prompt evaluation is most of a short
+turn's latency. PromptBuilder therefore renders each turn as separate
+messages, least volatile first:
+
+1. A fixed prefix (identity + instructions) as the system message. It is
+   frozen at construction, so it is byte-identical on every turn.
+2. The relevant memories as their own system message, in a stable order
+   (by id, not by retrieval score, so the same memories render the same
+   bytes whichever leg ranked them first). Consecutive turns about the
+   same topic retrieve the same memories, so this message stays in the
+   cached prefix too.
+3. The user's text last, as the only user message.
+
+PromptStats records the prompt_eval_count Ollama reports for each turn,
+i.e. the prompt tokens it actually had to evaluate. A warm cache shows up
+as that count staying close to the size of the new user message.
+"""
+import threading
+
+class PromptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.evaluated_tokens = 0    # sum of prompt_eval_count reported by Ollama
+        self.last_turn = None
+
+    def record(self, prompt_eval_count):
+        if prompt_eval_count is None:
+            return
+        with self._lock:
+            self.turns += 1
+            self.evaluated_tokens += prompt_eval_count
+            self.last_turn = prompt_eval_count
+
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "prompt_eval_tokens": self.evaluated_tokens,
+                "prompt_eval_tokens_per_turn": round(self.evaluated_tokens / self.turns, 1) if self.turns else 0.0,
+                "last_turn_prompt_eval_tokens": self.last_turn,
+            }
+
+class PromptBuilder:
+    def __init__(self, prefix, stats=None):
+        self.prefix = str(prefix)
+        self.stats = stats or PromptStats()
+
+    def build(self, user_input, memories=()):
+        """Returns the chat messages for a turn."""
+        messages = [{'role': 'system', 'content': self.prefix}]
+        memory_block = self.format_memories(memories)
+        if memory_block:
+            messages.append({'role': 'system', 'content': memory_block})
+        messages.append({'role': 'user', 'content': user_input})
+        return messages
+
+    @staticmethod
+    def format_memories(memories):
+        if not memories:
+            return ""
+        unique = {}
+        for m in memories:
+            # A just-flushed observation can briefly show up both as pending and stored
+            unique.setdefault(m['content'], m)
+        # Stored memories by id, then not-yet-flushed ones (no id) by content
+        ordered = sorted(unique.values(), key=lambda m: (m.get('id') is None, m.get('id') or 0, m['content']))
+        lines = ["Relevant Memories:"]
+        lines.extend(f"- [{m['category']}] {m['content']}" for m in ordered)
+        return "\n".join(lines)
@@ -0,0 +1,167 @@
+"""
+Cache of complete LLM responses for repeated prompts.
+
+Entries are keyed by (model, normalized prompt, ids of the retrieved
+memories). The key is computed after retrieval, so a new memory that is
+relevant to a prompt changes its retrieved ids and naturally misses; a
+deleted memory evicts every entry that was generated from it (via db's
+memory listeners).
+
+With an embedder, a prompt that misses exactly can still hit an entry for
+the same model and memories whose prompt embedding has cosine similarity
+>= similarity ("what's your name" vs "what is your name?").
+
+Hits are replayed as a stream so callers don't care where the text came
+from. Prompts about the current time, date, weather or news are never
+cached.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from . import db
+
+_VOLATILE = re.compile(r"\b(time|today|tonight|tomorrow|yesterday|now|date|weather|latest|news)\b")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+def normalize_prompt(prompt):
+    return " ".join(_PUNCTUATION.sub(" ", prompt.lower()).split())
+
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl=3600.0, embedder=None, similarity=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = embedder
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, response, vector)
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(model, prompt, memories=()):
+        """Returns the cache key, or None if the turn shouldn't be cached."""
+        normalized = normalize_prompt(prompt)
+        if not normalized or _VOLATILE.search(normalized):
+            return None
+        # Not-yet-flushed memories have no id; their content identifies them
+        memory_ids = tuple(sorted(str(m.get('id') or m['content']) for m in memories or ()))
+        return (model, normalized, memory_ids)
+
+    def attach(self):
+        db.add_memory_listener(self.on_memory_change)
+
+    def detach(self):
+        db.remove_memory_listener(self.on_memory_change)
+
+    # --- Lookup ---
+
+    def get(self, key):
+        """Returns the cached response text, or None."""
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+        if self.embedder:
+            response = self._similar(key, now)
+            if response is not None:
+                return response
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def aget(self, key):
+        if self.embedder:
+            # The embedder may call Ollama
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    def _similar(self, key, now):
+        model, normalized, memory_ids = key
+        with self._lock:
+            candidates = [(k, entry) for k, entry in self._entries.items()
+                          if k[0] == model and k[2] == memory_ids and entry[0] > now and entry[2] is not None]
+        if not candidates:
+            return None
+        query = self._embed(normalized)
+        scores = np.stack([entry[2] for _, entry in candidates]) @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        with self._lock:
+            self.hits += 1
+            self.semantic_hits += 1
+        return candidates[best][1][1]
+
+    def _embed(self, text):
+        vector = self.embedder.embed([text])[0].astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def put(self, key, response):
+        if key is None or not response:
+            return
+        vector = self._embed(key[1]) if self.embedder else None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def aput(self, key, response):
+        if self.embedder:
+            await asyncio.to_thread(self.put, key, response)
+        else:
+            self.put(key, response)
+
+    @staticmethod
+    async def replay(response, chunk_words=4):
+        """Yields a cached response in small chunks, like a live stream."""
+        words = response.split(" ")
+        for start in range(0, len(words), chunk_words):
+            chunk = " ".join(words[start:start + chunk_words])
+            yield chunk if start + chunk_words >= len(words) else chunk + " "
+
+    # --- Invalidation ---
+
+    def on_memory_change(self, event, memories):
+        # Adds change what retrieval returns, and so the key; only deletes leave stale entries
+        if event != "delete":
+            return
+        ids = {str(m['id']) for m in memories}
+        with self._lock:
+            stale = [key for key in self._entries if ids.intersection(key[2])]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def invalidate_all(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,151 @@
+"""
+Hybrid memory retrieval: keyword and semantic searches fused with
+reciprocal rank fusion (RRF), then re-weighted by recency and confidence.
+
+The legs run concurrently (worker threads for the sync path, asyncio tasks
+for the async path), so retrieval takes as long as the slowest leg rather
+than the sum of all legs.
+
+Semantic legs always return their nearest neighbours, however distant, so
+hits found only by a semantic leg must reach MIN_SIMILARITY (cosine) to be
+fused; otherwise unrelated memories would end up in nearly every prompt.
+"""
+import asyncio
+import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared by every retriever; legs are short I/O-bound calls
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+MIN_SIMILARITY = float(os.getenv("MEMORY_MIN_SIMILARITY", "0.35"))
+
+class HybridRetriever:
+    def __init__(self, legs, async_legs=None, leg_k=20, rrf_k=60,
+                 recency_weight=0.3, recency_half_life_days=30.0, confidence_weight=0.5,
+                 similarity_legs=("semantic",), min_similarity=MIN_SIMILARITY):
+        """
+        legs: dict of name -> search(query, k) returning ranked memory rows.
+        async_legs: optional dict of name -> async search(query, k) used by aretrieve.
+        leg_k: how many candidates each leg contributes to the fusion.
+        similarity_legs: legs whose rows carry a cosine 'score'; their hits that no
+            other leg found are dropped below min_similarity.
+        """
+        self.legs = legs
+        self.async_legs = async_legs or {}
+        self.leg_k = leg_k
+        self.similarity_legs = similarity_legs
+        self.min_similarity = min_similarity
+        self.rrf_k = rrf_k
+        self.recency_weight = recency_weight
+        self.recency_half_life_days = recency_half_life_days
+        self.confidence_weight = confidence_weight
+        self.leg_latency = {name: 0.0 for name in legs}   # last latency per leg, seconds
+
+    # --- Running the legs ---
+
+    def _timed(self, name, search, query):
+        start = time.perf_counter()
+        try:
+            return search(query, self.leg_k)
+        except Exception as e:
+            print(f"[Retrieval] {name} search failed: {e}")
+            return []
+        finally:
+            self.leg_latency[name] = time.perf_counter() - start
+
+    async def _atimed(self, name, search, query):
+        start = time.perf_counter()
+        try:
+            return await search(query, self.leg_k)
+        except Exception as e:
+            print(f"[Retrieval] {name} search failed: {e}")
+            return []
+        finally:
+            self.leg_latency[name] = time.perf_counter() - start
+
+    def retrieve(self, query, k=5):
+        futures = {name: _executor.submit(self._timed, name, search, query)
+                   for name, search in self.legs.items()}
+        return self.fuse({name: f.result() for name, f in futures.items()}, k)
+
+    async def aretrieve(self, query, k=5):
+        tasks = {}
+        for name, search in self.legs.items():
+            if name in self.async_legs:
+                tasks[name] = self._atimed(name, self.async_legs[name], query)
+            else:
+                tasks[name] = asyncio.to_thread(self._timed, name, search, query)
+        results = await asyncio.gather(*tasks.values())
+        return self.fuse(dict(zip(tasks.keys(), results)), k)
+
+    # --- Fusion ---
+
+    def fuse(self, ranked_lists, k=5, now=None):
+        """
+        ranked_lists: dict of leg name -> ranked memory rows.
+        Returns the top k rows by RRF score x recency x confidence.
+        """
+        now = now or datetime.datetime.now()
+        ranked_lists = self._drop_weak_semantic_hits(ranked_lists)
+        scores = {}
+        rows = {}
+        for results in ranked_lists.values():
+            for rank, row in enumerate(results):
+                key = _key(row)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                rows.setdefault(key, row)
+
+        weighted = [(score * self._recency_factor(rows[key], now) * self._confidence_factor(rows[key]), key)
+                    for key, score in scores.items()]
+        weighted.sort(key=lambda item: item[0], reverse=True)
+        return [rows[key] for _, key in weighted[:k]]
+
+    def _drop_weak_semantic_hits(self, ranked_lists):
+        if not self.min_similarity:
+            return ranked_lists
+        found_elsewhere = {_key(row) for name, results in ranked_lists.items()
+                           if name not in self.similarity_legs for row in results}
+        filtered = {}
+        for name, results in ranked_lists.items():
+            if name in self.similarity_legs:
+                # Ranks are taken after filtering, so survivors keep their relative order
+                results = [row for row in results
+                           if row.get('score', 1.0) >= self.min_similarity or _key(row) in found_elsewhere]
+            filtered[name] = results
+        return filtered
+
+    def _recency_factor(self, row, now):
+        """1 + weight * 2^(-age / half_life), using the later of created_at / last_accessed."""
+        if not self.recency_weight:
+            return 1.0
+        stamps = [_parse_timestamp(row.get(field)) for field in ('created_at', 'last_accessed')]
+        stamps = [s for s in stamps if s]
+        if not stamps:
+            return 1.0
+        age_days = max((now - max(stamps)).total_seconds(), 0.0) / 86400
+        return 1.0 + self.recency_weight * 0.5 ** (age_days / self.recency_half_life_days)
+
+    def _confidence_factor(self, row):
+        confidence = row.get('confidence_score')
+        if confidence is None:
+            return 1.0
+        confidence = min(max(float(confidence), 0.0), 1.0)
+        return 1.0 - self.confidence_weight + self.confidence_weight * confidence
+
+def _key(row):
+    return row.get('id', row['content'])
+
+def _parse_timestamp(value):
+    if value is None:
+        return None
+    if not isinstance(value, datetime.datetime):
+        try:
+            value = datetime.datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    # Memory timestamps are naive local time; normalize aware values to match
+    if value.tzinfo:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
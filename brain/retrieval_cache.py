@@ -0,0 +1,119 @@
+"""
+LRU/TTL cache for memory retrieval results.
+
+Entries are keyed by the normalized keyword set that db.extract_keywords
+pulls out of a question, so "Do you remember my name?" and "my name??"
+share an entry. The cache subscribes to db's memory listeners:
+
+- "keywords" invalidation evicts only entries whose keywords occur in a
+  newly added memory. This is exact for substring/token matching (ILIKE,
+  BM25).
+- "generation" invalidation drops everything on any add. Use it when
+  matching is fuzzy (FTS stemming, trigram, semantic), where a keyword
+  check could miss an affected entry.
+
+A delete evicts the entries whose cached results contain the deleted id.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from . import db
+
+class RetrievalCache:
+    def __init__(self, max_entries=1024, ttl=300.0, invalidation="keywords"):
+        if invalidation not in ("keywords", "generation"):
+            raise ValueError("invalidation must be 'keywords' or 'generation'")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.invalidation = invalidation
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, memories)
+        self._version = 0               # bumped on every invalidation, guards racing puts
+        self.generation = 0             # bumped on full invalidation
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query, k=5):
+        keywords = db.extract_keywords(query)
+        if keywords:
+            return (tuple(sorted(set(keywords))), k)
+        # No keywords: the DB falls back to matching the whole string
+        return ((query.strip().lower(),), k)
+
+    def attach(self):
+        db.add_memory_listener(self.on_memory_change)
+
+    def detach(self):
+        db.remove_memory_listener(self.on_memory_change)
+
+    # --- Lookup ---
+
+    def get(self, key):
+        """Returns (memories, version). memories is None on a miss; pass version to put()."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return [dict(m) for m in entry[1]], self._version
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None, self._version
+
+    def put(self, key, memories, version):
+        """Stores results unless an invalidation happened since the matching get()."""
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, [dict(m) for m in memories])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # --- Invalidation ---
+
+    def invalidate_all(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self._version += 1
+            self.invalidations += 1
+
+    def on_memory_change(self, event, memories):
+        if event == "add" and self.invalidation == "generation":
+            self.invalidate_all()
+            return
+        with self._lock:
+            self._version += 1
+            if event == "add":
+                contents = [m['content'].lower() for m in memories]
+                stale = [key for key in self._entries
+                         if any(word in content for word in key[0] for content in contents)]
+            else:
+                ids = {m['id'] for m in memories}
+                stale = [key for key, (_, cached) in self._entries.items()
+                         if any(m.get('id') in ids for m in cached)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "generation": self.generation,
+            }
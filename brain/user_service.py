@@ -1,22 +1,212 @@
-import requests
+"""
+Client for the Java user service (participants, recognitions, comm-log).
+
+All calls share one keep-alive requests.Session, so a chat turn reuses a
+pooled connection instead of opening a new one per call. Every call has
+a connect timeout and an overall deadline; reads are retried a bounded
+number of times with jittered backoff. A CircuitBreaker fails calls fast
+while the service is down instead of letting each one wait out its
+timeout.
+
+AsyncUserServiceConnector is the httpx-based counterpart for the async
+chat path. It applies the same policy (and can share the breaker), and
+coalesces concurrent identical lookups into one request.
+"""
+import asyncio
 import os
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.getenv("USER_SERVICE_CONNECT_TIMEOUT", "1.0"))
+# Overall budget for one call, retries included
+DEADLINE = float(os.getenv("USER_SERVICE_DEADLINE", "4.0"))
+MAX_RETRIES = int(os.getenv("USER_SERVICE_RETRIES", "2"))
+BACKOFF = 0.1          # base delay before the first retry, doubled per attempt
+POOL_SIZE = int(os.getenv("USER_SERVICE_POOL_SIZE", "20"))
+
+BREAKER_THRESHOLD = int(os.getenv("USER_SERVICE_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("USER_SERVICE_BREAKER_RESET", "15.0"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling the service while the breaker is open."""
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. While open, calls
+    fail immediately; after `reset_timeout` seconds one trial call is let
+    through (half-open) and its outcome closes or re-opens the breaker. A
+    trial that ends without an outcome is released, and one that has not
+    reported back within `reset_timeout` is replaced by a new trial.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_started = 0.0
+        self.rejected = 0
+        self.opens = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return True
+            if (self.state == OPEN and now - self.opened_at >= self.reset_timeout) or \
+                    (self.state == HALF_OPEN and now - self.trial_started >= self.reset_timeout):
+                self.state = HALF_OPEN
+                self.trial_started = now
+                return True
+            # Open, or half-open with the trial call still in flight
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """A call ended without an outcome (e.g. cancelled): frees the half-open trial."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print("[UserService] Circuit closed.")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                    print(f"[UserService] Circuit open for {self.reset_timeout}s after "
+                          f"{self.consecutive_failures} failure(s).")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opens": self.opens,
+            "rejected": self.rejected,
+        }
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, BACKOFF * (2 ** attempt))
 
 class UserServiceConnector:
-    def __init__(self, base_url="http://localhost:8089/empengagement"):
+    def __init__(self, base_url="http://localhost:8089/empengagement", breaker=None,
+                 deadline=DEADLINE, max_retries=MAX_RETRIES):
         self.base_url = base_url
+        self.breaker = breaker or CircuitBreaker()
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _request(self, method, path, idempotent=True, deadline=None, **kwargs):
+        """
+        Sends one call with the deadline, retry and breaker policy. Returns the
+        response (any status below 500); raises RequestException otherwise.
+        Non-idempotent calls are only retried when the connection was never made.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"user service circuit open ({method} {path})")
+        settled = False
+        try:
+            give_up_at = time.monotonic() + (deadline or self.deadline)
+            attempt = 0
+            while True:
+                remaining = max(give_up_at - time.monotonic(), 0.01)
+                self.requests += 1
+                try:
+                    response = self.session.request(
+                        method, f"{self.base_url}{path}",
+                        timeout=(min(CONNECT_TIMEOUT, remaining), remaining), **kwargs)
+                    if response.status_code < 500:
+                        settled = True
+                        self.breaker.record_success()
+                        return response
+                    response.close()
+                    error = requests.exceptions.HTTPError(
+                        f"{response.status_code} from {method} {path}", response=response)
+                    retriable = idempotent
+                except requests.exceptions.ConnectTimeout as e:
+                    error, retriable = e, True
+                except requests.exceptions.RequestException as e:
+                    error, retriable = e, idempotent
+
+                delay = backoff_delay(attempt)
+                if not retriable or attempt >= self.max_retries or time.monotonic() + delay >= give_up_at:
+                    self.failures += 1
+                    settled = True
+                    self.breaker.record_failure()
+                    raise error
+                attempt += 1
+                self.retries += 1
+                time.sleep(delay)
+        finally:
+            # Anything else (not a service failure) must not leave a half-open trial hanging
+            if not settled:
+                self.breaker.release()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "breaker": self.breaker.stats(),
+        }
+
+    def close(self):
+        self.session.close()
 
     def get_all_users(self):
         """Fetches all participants from the user service."""
         try:
-            response = requests.get(f"{self.base_url}/participants")
+            response = self._request("GET", "/participants")
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"[UserService] Error fetching users: {e}")
             return []
 
+    def get_all_users_if_changed(self, etag=None):
+        """
+        Conditional fetch of all participants. Returns (users, etag); users is
+        None when the list is unchanged since etag. Raises on request errors.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self._request("GET", "/participants", headers=headers)
+        if response.status_code == 304:
+            return None, etag
+        response.raise_for_status()
+        return response.json(), response.headers.get("ETag")
+
     def log_message(self, user_id, user_name, role, content):
-        """Logs a message to the user service."""
+        """Logs a message to the user service. Returns True if it was stored."""
         try:
             payload = {
                 "userId": user_id,
@@ -24,9 +214,14 @@ class UserServiceConnector:
                 "role": role,
                 "content": content
             }
-            requests.post(f"{self.base_url}/comm-log", json=payload)
+            # Short deadline: a stalled comm-log must not hold up a chat worker
+            response = self._request("POST", "/comm-log", idempotent=False,
+                                     deadline=min(self.deadline, 2.0), json=payload)
+            response.raise_for_status()
+            return True
         except Exception as e:
             print(f"[UserService] Error logging message: {e}")
+            return False
 
     def recognize(self, sender_id, receiver_username, comment):
         """Triggers a recognition event."""
@@ -36,7 +231,7 @@ class UserServiceConnector:
                 "receiverUsername": receiver_username,
                 "comment": comment
             }
-            response = requests.post(f"{self.base_url}/recognize", json=payload)
+            response = self._request("POST", "/recognize", idempotent=False, json=payload)
             response.raise_for_status()
             return response.text
         except Exception as e:
@@ -45,7 +240,7 @@ class UserServiceConnector:
     def get_recognition_history(self, user_id):
         """Fetches recognition history for a user."""
         try:
-            response = requests.get(f"{self.base_url}/recognize/received/{user_id}")
+            response = self._request("GET", f"/recognize/received/{user_id}")
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -55,7 +250,7 @@ class UserServiceConnector:
     def get_user_by_id(self, user_id):
         """Fetches a specific participant by ID."""
         try:
-            response = requests.get(f"{self.base_url}/participants/{user_id}")
+            response = self._request("GET", f"/participants/{user_id}")
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -65,7 +260,7 @@ class UserServiceConnector:
     def create_user(self, user_data):
         """Creates a new participant."""
         try:
-            response = requests.post(f"{self.base_url}/createpax", json=user_data)
+            response = self._request("POST", "/createpax", idempotent=False, json=user_data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -75,7 +270,7 @@ class UserServiceConnector:
     def update_user(self, user_id, user_data):
         """Updates an existing participant."""
         try:
-            response = requests.put(f"{self.base_url}/participants/{user_id}", json=user_data)
+            response = self._request("PUT", f"/participants/{user_id}", json=user_data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -85,9 +280,164 @@ class UserServiceConnector:
     def delete_user(self, user_id):
         """Deletes a participant."""
         try:
-            response = requests.delete(f"{self.base_url}/participants/{user_id}")
+            response = self._request("DELETE", f"/participants/{user_id}")
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
             print(f"[UserService] Error deleting user {user_id}: {e}")
             return False
+
+class AsyncUserServiceConnector:
+    """
+    Awaitable user service calls over one pooled httpx.AsyncClient. Concurrent
+    lookups of the same resource (e.g. many chat turns for one user id) share
+    a single in-flight request.
+    """
+
+    def __init__(self, base_url="http://localhost:8089/empengagement", breaker=None,
+                 deadline=DEADLINE, max_retries=MAX_RETRIES, client=None):
+        self.base_url = base_url
+        self.breaker = breaker or CircuitBreaker()
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.client = client or httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE))
+        self._inflight = {}    # coalescing key -> task of the shared lookup
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.coalesced = 0
+
+    async def _request(self, method, path, idempotent=True, deadline=None, **kwargs):
+        """Async version of UserServiceConnector._request; raises httpx.HTTPError or CircuitOpenError."""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"user service circuit open ({method} {path})")
+        settled = False
+        try:
+            give_up_at = time.monotonic() + (deadline or self.deadline)
+            attempt = 0
+            while True:
+                remaining = max(give_up_at - time.monotonic(), 0.01)
+                self.requests += 1
+                try:
+                    response = await self.client.request(
+                        method, f"{self.base_url}{path}",
+                        timeout=httpx.Timeout(remaining, connect=min(CONNECT_TIMEOUT, remaining)), **kwargs)
+                    if response.status_code < 500:
+                        settled = True
+                        self.breaker.record_success()
+                        return response
+                    error = httpx.HTTPStatusError(
+                        f"{response.status_code} from {method} {path}", request=response.request, response=response)
+                    retriable = idempotent
+                except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                    error, retriable = e, True
+                except httpx.HTTPError as e:
+                    error, retriable = e, idempotent
+
+                delay = backoff_delay(attempt)
+                if not retriable or attempt >= self.max_retries or time.monotonic() + delay >= give_up_at:
+                    self.failures += 1
+                    settled = True
+                    self.breaker.record_failure()
+                    raise error
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+        finally:
+            # Cancellation (client disconnect, /chat cancel) or an unexpected error: no verdict,
+            # so free the half-open trial slot before the exception propagates
+            if not settled:
+                self.breaker.release()
+
+    async def _get_json(self, path):
+        """GET path and return its JSON, sharing the request with concurrent callers for the same path."""
+        task = self._inflight.get(path)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_json(path))
+            self._inflight[path] = task
+            task.add_done_callback(lambda done: self._forget(path, done))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the lookup the others are waiting on
+        return await asyncio.shield(task)
+
+    def _forget(self, path, task):
+        self._inflight.pop(path, None)
+        # Mark the error as seen even if every caller was cancelled before it arrived
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_json(self, path):
+        response = await self._request("GET", path)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_all_users(self):
+        """Fetches all participants from the user service."""
+        try:
+            return await self._get_json("/participants")
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            print(f"[UserService] Error fetching users: {e}")
+            return []
+
+    async def get_user_by_id(self, user_id):
+        """Fetches a specific participant by ID."""
+        try:
+            return await self._get_json(f"/participants/{user_id}")
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            print(f"[UserService] Error fetching user {user_id}: {e}")
+            return None
+
+    async def get_recognition_history(self, user_id):
+        """Fetches recognition history for a user."""
+        try:
+            return await self._get_json(f"/recognize/received/{user_id}")
+        except Exception as e:
+            print(f"[UserService] Error fetching history: {e}")
+            return []
+
+    async def recognize(self, sender_id, receiver_username, comment):
+        """Triggers a recognition event."""
+        try:
+            payload = {
+                "senderId": sender_id,
+                "receiverUsername": receiver_username,
+                "comment": comment
+            }
+            response = await self._request("POST", "/recognize", idempotent=False, json=payload)
+            response.raise_for_status()
+            return response.text
+        except Exception as e:
+            return f"Error: {e}"
+
+    async def log_message(self, user_id, user_name, role, content):
+        """Logs a message to the user service. Returns True if it was stored."""
+        try:
+            payload = {
+                "userId": user_id,
+                "userName": user_name,
+                "role": role,
+                "content": content
+            }
+            response = await self._request("POST", "/comm-log", idempotent=False,
+                                           deadline=min(self.deadline, 2.0), json=payload)
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            print(f"[UserService] Error logging message: {e}")
+            return False
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "in_flight_lookups": len(self._inflight),
+            "breaker": self.breaker.stats(),
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
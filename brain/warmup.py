@@ -0,0 +1,76 @@
+"""
+Model warm-up and keep_alive pinning.
+
+Ollama loads a model on its first request and unloads it after keep_alive
+(5 minutes by default), so the first chat after boot or an idle spell pays
+the full load time. ModelWarmer loads the configured chat and embedding
+models at startup with an empty request, pins them with KEEP_ALIVE, and
+re-warms them when the health monitor sees Ollama come back after a
+restart.
+"""
+import threading
+import time
+
+import ollama
+
+from .llm_interface import KEEP_ALIVE
+
+class ModelWarmer:
+    def __init__(self, chat_models, embed_models=(), keep_alive=KEEP_ALIVE, client=None):
+        self.chat_models = [m for m in chat_models if m]
+        self.embed_models = [m for m in embed_models if m]
+        self.keep_alive = keep_alive
+        self.client = client or ollama.Client()
+        self.load_times = {}     # model -> seconds taken by the last warm-up
+        self.warmups = 0
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """Loads every configured model. Returns the models that failed to load."""
+        # One warm-up at a time; a re-warm racing the startup one is redundant
+        if not self._lock.acquire(blocking=False):
+            return []
+        try:
+            failed = []
+            for model in self.chat_models:
+                if not self._load(model, lambda: self.client.generate(model=model, prompt="", keep_alive=self.keep_alive)):
+                    failed.append(model)
+            for model in self.embed_models:
+                if not self._load(model, lambda: self.client.embed(model=model, input="warm up", keep_alive=self.keep_alive)):
+                    failed.append(model)
+            self.warmups += 1
+            return failed
+        finally:
+            self._lock.release()
+
+    def _load(self, model, request):
+        start = time.time()
+        try:
+            request()
+        except Exception as e:
+            print(f"[Warmup] Could not load {model}: {e}")
+            return False
+        self.load_times[model] = time.time() - start
+        print(f"[Warmup] {model} ready in {self.load_times[model]:.2f}s (keep_alive={self.keep_alive})")
+        return True
+
+    def warm_in_background(self):
+        thread = threading.Thread(target=self.warm, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def attach(self, health):
+        """Re-warms whenever the health monitor sees Ollama recover."""
+        health.add_listener(self.on_health_change)
+
+    def on_health_change(self, healthy):
+        if healthy:
+            self.warm_in_background()
+
+    def stats(self):
+        return {
+            "models": self.chat_models + self.embed_models,
+            "keep_alive": self.keep_alive,
+            "warmups": self.warmups,
+            "load_time_s": {model: round(t, 2) for model, t in self.load_times.items()},
+        }
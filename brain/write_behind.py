@@ -0,0 +1,158 @@
+"""
+Write-behind stage for writes that don't need to block a chat turn.
+
+Conversation logs, implicit observations and comm-log messages are
+buffered in memory and flushed by a background thread in batches, either
+when `max_batch` items are waiting or every `flush_interval` seconds.
+Buffered writes stay visible through pending() until they are persisted,
+so a session can read its own writes before the flush happens.
+"""
+import atexit
+import threading
+import time
+import weakref
+
+from . import db
+
+CONVERSATION = "conversation"
+MEMORY = "memory"
+COMM_LOG = "comm_log"
+
+# One exit hook drains every queue still open; the set doesn't keep closed queues alive
+_open_queues = weakref.WeakSet()
+
+@atexit.register
+def _close_open_queues():
+    for queue in list(_open_queues):
+        queue.close()
+
+class WriteBehindQueue:
+    def __init__(self, user_service=None, max_batch=100, flush_interval=0.5, max_pending=10000):
+        self.user_service = user_service
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._cond = threading.Condition()
+        self._buffer = []      # list of (kind, session_id, payload)
+        self._inflight = []    # batch currently being written
+        self._closed = False
+        self._flushing = False
+
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        _open_queues.add(self)
+
+    # --- Producers ---
+
+    def log_conversation(self, input_text, response_text, model="unknown", session_id=None):
+        self._enqueue(CONVERSATION, session_id, (input_text, response_text, model))
+
+    def add_memory(self, category, content, confidence=1.0, source="user_interaction", session_id=None):
+        self._enqueue(MEMORY, session_id, (category, content, confidence, source))
+
+    def log_message(self, user_id, user_name, role, content):
+        self._enqueue(COMM_LOG, user_id, (user_id, user_name, role, content))
+
+    def _enqueue(self, kind, session_id, payload):
+        with self._cond:
+            # Shutting down or overloaded: fall back to a direct write
+            direct = self._closed or len(self._buffer) >= self.max_pending
+            if not direct:
+                self._buffer.append((kind, session_id, payload))
+                if len(self._buffer) >= self.max_batch:
+                    self._cond.notify()
+        if direct:
+            self._write([(kind, session_id, payload)])
+
+    # --- Read-your-writes ---
+
+    def pending(self, session_id, kind=None):
+        """
+        Returns payloads for `session_id` that are queued or being written but
+        not yet persisted, oldest first.
+        """
+        with self._cond:
+            items = self._inflight + self._buffer
+            return [payload for k, s, payload in items
+                    if s == session_id and (kind is None or k == kind)]
+
+    # --- Flushing ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._buffer) < self.max_batch and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if not self._buffer:
+                    if self._closed:
+                        return
+                    continue
+                self._inflight = self._buffer[:self.max_batch]
+                self._buffer = self._buffer[self.max_batch:]
+                self._flushing = True
+                batch = self._inflight
+
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"[WriteBehind] Error flushing batch: {e}")
+
+            with self._cond:
+                self._inflight = []
+                self._flushing = False
+                self._cond.notify_all()
+
+    def _write(self, batch):
+        conversations = [p for k, _, p in batch if k == CONVERSATION]
+        memories = [p for k, _, p in batch if k == MEMORY]
+        messages = [p for k, _, p in batch if k == COMM_LOG]
+
+        if conversations:
+            self._record(len(conversations), db.log_conversations_bulk(conversations))
+        if memories:
+            self._record(len(memories), len(db.add_memories_bulk(memories)) == len(memories))
+        for message in messages:
+            # log_message has no batch endpoint on the Java side
+            self._record(1, bool(self.user_service and self.user_service.log_message(*message)))
+        self.batches += 1
+
+    def _record(self, count, ok):
+        if ok:
+            self.flushed += count
+        else:
+            self.failed += count
+            print(f"[WriteBehind] Failed to persist {count} item(s).")
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything queued so far has been written (or timeout)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+            while self._buffer or self._flushing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.notify()
+                self._cond.wait(min(remaining, self.flush_interval))
+        return True
+
+    def close(self, timeout=10.0):
+        """Drains the queue and stops the background thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        _open_queues.discard(self)
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            queued = len(self._buffer) + len(self._inflight)
+        return {"queued": queued, "flushed": self.flushed, "failed": self.failed, "batches": self.batches}
@@ -1,8 +1,84 @@
-from brain.llm_interface import LLMInterface
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from brain.llm_interface import LLMInterface, AsyncLLMInterface
 from brain.memory_controller import MemoryController
-from brain.user_service import UserServiceConnector
+from brain.user_service import UserServiceConnector, AsyncUserServiceConnector
+from brain.write_behind import WriteBehindQueue
+from brain.bm25_index import BM25Index
+from brain.embeddings import EmbeddingStore, PgVectorStore, create_embedder
+from brain.retrieval_cache import RetrievalCache
+from brain.response_cache import ResponseCache
+from brain.warmup import ModelWarmer
+from brain.prompt_builder import PromptBuilder
+from brain.model_router import ModelRouter
+from brain.llm_pool import LLMPool
+from brain.participant_directory import ParticipantDirectory
+from brain.intent_router import classify, RECOGNITION, HISTORY, LIST_USERS, GET_USER
 from brain import db
 
+def _chunk_text(chunk):
+    """Extracts the text content from an Ollama stream chunk."""
+    # Handle object (new ollama lib)
+    if hasattr(chunk, 'message'):
+        return chunk.message.content
+    # Handle dict (old ollama lib or fallback)
+    if isinstance(chunk, dict) and 'message' in chunk:
+        return chunk['message']['content']
+    if isinstance(chunk, str):
+        return chunk
+    return str(chunk)
+
+_COMMENT_LEAD = re.compile(r'^[\s,;:.!-]*(with|comment|comments|message|saying|for|along with)?\s*', re.IGNORECASE)
+_DIGITS = re.compile(r'\d+')
+
+NEED_USER_TO_RECOGNIZE = "I need to know who you are before you can recognize someone. Please select a user in the sidebar."
+WHO_TO_RECOGNIZE = "Who should I recognize? Please provide their full name or username."
+NEED_USER_FOR_HISTORY = "Please select a user in the sidebar to see recognition history."
+
+def _format_recognitions(recognitions):
+    if not recognitions:
+        return "You haven't received any recognitions yet."
+    response = "Here are the recognitions you've received:\n"
+    for rec in recognitions:
+        sender_name = rec.get('sender', {}).get('fullName', 'Someone')
+        response += f"- {rec.get('points')} pts from {sender_name}: \"{rec.get('comment')}\" ({rec.get('timestamp')[:10]})\n"
+    return response
+
+def _format_users(users):
+    if not users:
+        return "I couldn't find any users."
+    response = "Participants:\n"
+    for user in users:
+        response += f"- {user.get('fullName')} (@{user.get('userName')}) | Points: {user.get('points')}\n"
+    return response
+
+def _format_user(user, user_id):
+    if user:
+        return f"Found user: {user.get('fullName')} from {user.get('department')} department."
+    return f"I couldn't find a user with ID {user_id}."
+
+# Runs the independent pre-generation stages of the sync chat path
+_pipeline_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat-pipeline")
+
+def _cancel_tasks(*tasks):
+    """Cancels tasks whose result is no longer needed, without leaving their errors unretrieved."""
+    for task in tasks:
+        task.cancel()
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+# Fire-and-forget tasks (reply logging); the event loop only keeps weak references
+_background_tasks = set()
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 class DigitalSelf:
     def __init__(self):
         # Initialize DB if not exists
@@ -18,186 +94,358 @@ class DigitalSelf:
         identity_prompt += "\nINSTRUCTION: You are in 'Chat Mode'. Respond in 10-20 words MAX. match the user's length. Be casual."
         identity_prompt += "\nCRITICAL: If 'Relevant Memories' are provided, YOU MUST USE THEM. They are facts about the user. Do not hallucinate dates."
         
-        self.brain = LLMInterface(system_prompt=identity_prompt)
-        self.memory_controller = MemoryController()
+        # One builder for both interfaces: the identity prefix is byte-identical on every turn
+        self.prompt_builder = PromptBuilder(identity_prompt)
+        self.brain = LLMInterface(prompt_builder=self.prompt_builder)
+        # Streams for the async API share one keep-alive Ollama client
+        # OLLAMA_HOSTS=http://a:11434,http://b:11434 balances API generations across several hosts
+        self.llm_pool = LLMPool.from_env()
+        self.async_brain = AsyncLLMInterface(prompt_builder=self.prompt_builder, health=self.brain.health,
+                                             pool=self.llm_pool)
         self.user_service = UserServiceConnector()
+        # The async chat path calls the user service without a worker thread; both share one breaker
+        self.async_user_service = AsyncUserServiceConnector(breaker=self.user_service.breaker)
+        # Participant names for the recognition intent, refreshed in the background
+        self.participants = ParticipantDirectory(self.user_service).start()
+        # Comm-log messages, conversation logs and observations are written in the background
+        self.writer = WriteBehindQueue(user_service=self.user_service)
+        # Optional in-process BM25 index for single-box deployments (DIGITAL_SELF_LOCAL_INDEX=1)
+        self.local_index = None
+        if os.getenv("DIGITAL_SELF_LOCAL_INDEX", "0") == "1":
+            self.local_index = BM25Index()
+            self.local_index.attach()
+            self.local_index.build_in_background()
+        # Optional semantic retrieval (DIGITAL_SELF_EMBEDDINGS=ollama|hashing),
+        # in this process's RAM or in Postgres via pgvector (MEMORY_PGVECTOR=1)
+        self.embedding_store = None
+        embedder = create_embedder()
+        if embedder:
+            if db.PGVECTOR_ENABLED:
+                self.embedding_store = PgVectorStore(embedder)
+            else:
+                self.embedding_store = EmbeddingStore(embedder)
+            self.embedding_store.attach()
+            self.embedding_store.build_in_background()
+        # Retrieval result cache (DIGITAL_SELF_RETRIEVAL_CACHE=0 to disable). Keyword-precise
+        # invalidation is only exact for substring matching; fuzzy modes drop everything on write.
+        self.retrieval_cache = None
+        if os.getenv("DIGITAL_SELF_RETRIEVAL_CACHE", "1") == "1":
+            precise = self.embedding_store is None and db.SEARCH_MODE == "ilike"
+            self.retrieval_cache = RetrievalCache(invalidation="keywords" if precise else "generation")
+            self.retrieval_cache.attach()
+        self.memory_controller = MemoryController(writer=self.writer, local_index=self.local_index,
+                                                  embedding_store=self.embedding_store,
+                                                  cache=self.retrieval_cache)
+        # Complete responses for repeated prompts (DIGITAL_SELF_RESPONSE_CACHE=0 to disable). With an
+        # embedder, DIGITAL_SELF_RESPONSE_CACHE_SIMILARITY=0.95 also matches near-identical prompts.
+        self.response_cache = None
+        if os.getenv("DIGITAL_SELF_RESPONSE_CACHE", "1") == "1":
+            similarity = float(os.getenv("DIGITAL_SELF_RESPONSE_CACHE_SIMILARITY", "0"))
+            self.response_cache = ResponseCache(embedder=embedder if similarity else None,
+                                                similarity=similarity)
+            self.response_cache.attach()
+        # Simple turns go to the small model (DIGITAL_SELF_MODEL_ROUTER=0 to always use the requested one)
+        self.router = ModelRouter() if os.getenv("DIGITAL_SELF_MODEL_ROUTER", "1") == "1" else None
+        # Preload and pin models so the first chat doesn't pay the load (OLLAMA_WARM_MODELS=a,b to override)
+        default_warm = {self.brain.model_name, self.router.fast_model} if self.router else {self.brain.model_name}
+        warm_models = [m.strip() for m in os.getenv("OLLAMA_WARM_MODELS", ",".join(sorted(default_warm))).split(",")]
+        embed_models = [getattr(embedder, 'model', None)]
+        # Every pool host is warmed (and re-warmed on recovery) on its own; embeddings stay on the default host
+        if self.llm_pool:
+            targets = [(b.sync_client, b.health, warm_models, []) for b in self.llm_pool.backends]
+            targets.append((None, self.brain.health, [], embed_models))
+        else:
+            targets = [(None, self.brain.health, warm_models, embed_models)]
+        self.warmers = []
+        for client, health, chat_models, embeds in targets:
+            warmer = ModelWarmer(chat_models=chat_models, embed_models=embeds, client=client)
+            warmer.attach(health)
+            warmer.warm_in_background()
+            self.warmers.append(warmer)
 
     def chat(self, user_input: str, model: str = None, user_id=None):
         """
         Main chat interface.
         """
-        # Get user info if ID provided
-        current_user = None
         # Normalize user_id: handle empty strings or JS null/undefined strings
-        if user_id and str(user_id).lower() not in ["", "null", "undefined"]:
-            current_user = self.user_service.get_user_by_id(user_id)
-            user_name = current_user.get('userName', 'Unknown') if current_user else 'Unknown'
-            # Log User Message
-            self.user_service.log_message(user_id, user_name, 'user', user_input)
-        else:
-            # Important to clear it if it was something else, though user_id is the source of truth
+        if not (user_id and str(user_id).lower() not in ["", "null", "undefined"]):
             user_id = None
 
-        # 1. Check for Memory Command
-        is_command, response = self.memory_controller.process_input(user_input)
-        if is_command:
-            if user_id: self.user_service.log_message(user_id, current_user.get('userName'), 'assistant', response)
-            def confirmation_gen(): yield response
-            return confirmation_gen()
+        # Independent pre-generation work runs concurrently: the user lookup (+ inbound log)
+        # and memory retrieval go to worker threads while commands/intents are checked here.
+        user_future = _pipeline_executor.submit(self._log_inbound, user_id, user_input) if user_id else None
+        retrieval_future = _pipeline_executor.submit(self.memory_controller.retrieve_memories, user_input, user_id)
 
-        # 1b. Check for User Service Intent
-        print(f"[DEBUG] Processing intents for: '{user_input}' | UserID: {user_id}")
-        user_intent_detected, user_response = self._process_user_intents(user_input, user_id)
-        if user_intent_detected:
-            print(f"[DEBUG] Intent detected: {user_response}")
-            if user_id: self.user_service.log_message(user_id, current_user.get('userName'), 'assistant', user_response)
-            def user_gen(): yield user_response
-            return user_gen()
+        def log_reply(reply):
+            if user_future:
+                self.writer.log_message(user_id, user_future.result(), 'assistant', reply)
+
+        # 1. Memory command or user-service intent: answered without the LLM
+        try:
+            direct_response = self._direct_response(user_input, user_id)
+        except Exception:
+            retrieval_future.cancel()
+            raise
+        if direct_response is not None:
+            retrieval_future.cancel()
+            log_reply(direct_response)
+            def direct_gen(): yield direct_response
+            return direct_gen()
         print("[DEBUG] No intent detected, falling through to LLM.")
 
         # 2. Retrieve Context
-        context_str = self.memory_controller.retrieve_context(user_input)
+        memories = retrieval_future.result()
         
-        # 3. Inject context into message
-        full_input = f"{context_str}\nUser: {user_input}"
-        
-        # 4. Chat with Streaming
-        generator = self.brain.chat(full_input, stream=True, model=model)
+        # 3. Chat with Streaming (the prompt builder renders memories after the fixed prefix)
+        model, route = self._route(user_input, model, memories)
+        started = time.perf_counter()
+        generator = self.brain.chat(user_input, stream=True, model=model, memories=memories)
         
         # Wrap generator to log response once finished
         def log_wrapper():
             full_response = ""
+            first_token = None
             for chunk in generator:
                 try:
-                    # Handle object (new ollama lib)
-                    if hasattr(chunk, 'message'):
-                        content = chunk.message.content
-                    # Handle dict (old ollama lib or fallback)
-                    elif isinstance(chunk, dict) and 'message' in chunk:
-                        content = chunk['message']['content']
-                    elif isinstance(chunk, str):
-                        content = chunk
-                    else:
-                        content = str(chunk)
-                    
+                    content = _chunk_text(chunk)
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
                     full_response += content
                     yield content
                 except Exception as e:
                     print(f"[DEBUG] Error extracting content: {e}")
                     yield ""
             
-            if user_id:
-                self.user_service.log_message(user_id, current_user.get('userName'), 'assistant', full_response)
+            self._record_route(route, first_token, started)
+            log_reply(full_response)
+            self.writer.log_conversation(user_input, full_response, model, session_id=user_id)
         
         return log_wrapper()
 
-    def _process_user_intents(self, user_input: str, user_id=None):
+    async def achat(self, user_input: str, model: str = None, user_id=None):
+        """
+        Async chat interface for the API. Database work goes through the async
+        pool and user service calls through the async connector, so neither
+        ties up a worker thread.
+        Returns an async generator of text chunks. Raises QueueFullError
+        when the generation queue is full.
+        """
+        # Shed load before doing any retrieval work for a request that would be rejected
+        self.async_brain.scheduler.check_capacity()
+
+        if not (user_id and str(user_id).lower() not in ["", "null", "undefined"]):
+            user_id = None
+
+        # Pre-generation stages run concurrently, so the first token waits for the slowest
+        # of them rather than their sum. Retrieval is speculative: it is cancelled if the
+        # turn turns out to be a memory command or user-service intent.
+        user_task = asyncio.create_task(self._alog_inbound(user_id, user_input)) if user_id else None
+        retrieval_task = asyncio.create_task(self.memory_controller.aretrieve_memories(user_input, session_id=user_id))
+
+        async def write_reply_log(reply):
+            try:
+                self.writer.log_message(user_id, await user_task, 'assistant', reply)
+            except Exception as e:
+                print(f"[Chat] Could not log reply: {e}")
+
+        def log_reply(reply):
+            # Logged in the background once the user lookup is done; the reply never waits for it
+            if user_task:
+                _spawn(write_reply_log(reply))
+
+        # 1. Memory command or user-service intent: answered without the LLM
+        try:
+            direct_response = await self._adirect_response(user_input, user_id)
+        except BaseException:
+            _cancel_tasks(retrieval_task)
+            raise
+        if direct_response is not None:
+            _cancel_tasks(retrieval_task)
+            log_reply(direct_response)
+            async def direct_gen(): yield direct_response
+            return direct_gen()
+
+        # 2. Retrieve Context
+        memories = await retrieval_task
+
+        # 3. Replay a cached response for a repeated prompt with the same memories
+        model, route = self._route(user_input, model, memories)
+        cache_key = None
+        if self.response_cache:
+            cache_key = self.response_cache.make_key(model, user_input, memories)
+            cached = await self.response_cache.aget(cache_key)
+            if cached is not None:
+                log_reply(cached)
+                self.writer.log_conversation(user_input, cached, model, session_id=user_id)
+                return self.response_cache.replay(cached)
+
+        # 4. Chat with Streaming
+        started = time.perf_counter()
+        outcome = {}
+        token_stream = self.async_brain.stream(user_input, model=model, user_id=user_id, memories=memories,
+                                               outcome=outcome)
+
+        async def log_wrapper():
+            full_response = ""
+            first_token = None
+            try:
+                async for content in token_stream:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    full_response += content
+                    yield content
+            finally:
+                await token_stream.aclose()
+
+            self._record_route(route, first_token, started)
+            log_reply(full_response)
+            self.writer.log_conversation(user_input, full_response, model, session_id=user_id)
+            # An error can arrive after some tokens, so only a generation Ollama finished is cached
+            if cache_key and outcome.get("completed"):
+                await self.response_cache.aput(cache_key, full_response)
+
+        return log_wrapper()
+
+    def _log_inbound(self, user_id, user_input):
+        """Looks up the user, logs their message and returns their user name."""
+        current_user = self.user_service.get_user_by_id(user_id)
+        user_name = current_user.get('userName', 'Unknown') if current_user else 'Unknown'
+        self.writer.log_message(user_id, user_name, 'user', user_input)
+        return user_name
+
+    async def _alog_inbound(self, user_id, user_input):
+        current_user = await self.async_user_service.get_user_by_id(user_id)
+        user_name = current_user.get('userName', 'Unknown') if current_user else 'Unknown'
+        self.writer.log_message(user_id, user_name, 'user', user_input)
+        return user_name
+
+    def _direct_response(self, user_input, user_id):
+        """Reply for a memory command or user-service intent, or None if the LLM should answer."""
+        intent = classify(user_input.strip())
+        is_command, response = self.memory_controller.process_input(user_input, intent)
+        if is_command:
+            return response
+        print(f"[DEBUG] Processing intents for: '{user_input}' | UserID: {user_id}")
+        detected, response = self._process_user_intents(user_input, user_id, intent)
+        if detected:
+            print(f"[DEBUG] Intent detected: {response}")
+            return response
+        return None
+
+    async def _adirect_response(self, user_input, user_id):
+        intent = classify(user_input.strip())
+        is_command, response = await self.memory_controller.aprocess_input(user_input, intent)
+        if is_command:
+            return response
+        detected, response = await self._aprocess_user_intents(user_input, user_id, intent)
+        return response if detected else None
+
+    def _route(self, user_input, model, memories):
+        """Picks the model for an LLM turn. Returns (model, route)."""
+        model = model or self.brain.model_name
+        if not self.router:
+            return model, None
+        routed, route = self.router.route(user_input, model, memories)
+        if routed != model:
+            print(f"[Router] Simple turn: {routed} instead of {model}")
+        return routed, route
+
+    def _record_route(self, route, first_token, started):
+        if self.router and route:
+            self.router.record(route, first_token, time.perf_counter() - started)
+
+    def _process_user_intents(self, user_input: str, user_id=None, intent=None):
         """
         Detects if the user is asking for user-related data (including recognitions).
+        intent is an optional pre-computed intent_router.classify() result.
         """
-        input_lower = user_input.lower()
+        intent = intent or classify(user_input.strip())
         
         # 1. Recognize Intent: "recognize/recognise [name] [comment]"
-        import re
-        rec_match = re.search(r"\brecogni[sz]e\b", input_lower)
-        if rec_match:
+        if intent.kind == RECOGNITION:
             print(f"[DEBUG] Recognition Keyword matched. UserID: {user_id}")
             if not user_id:
-                return True, "I need to know who you are before you can recognize someone. Please select a user in the sidebar."
-            
-            # Much more flexible regex: recognize followed by a name (can be multiple words) and then a comment
-            users = self.user_service.get_all_users()
-            target_username = None
-            comment = "Excellent work!"
-            
-            # Extract text after the keyword
-            text_after_recognize = input_lower[rec_match.end():].strip()
-            
-            for u in users:
-                full_name = u.get('fullName', '').lower()
-                u_name = u.get('userName', '').lower()
-                
-                # Check for exact Match or partial match
-                # Use first word of full name if it's long
-                first_name = full_name.split()[0] if full_name else ""
-                
-                # Logic: Is the full name, username, or first name present after 'recognize'?
-                # Or is the text after 'recognize' STARTING with something similar?
-                if (full_name and full_name in text_after_recognize) or \
-                   (u_name and u_name in text_after_recognize) or \
-                   (first_name and len(first_name) > 3 and first_name in text_after_recognize):
-                    
-                    target_username = u.get('userName')
-                    # Find which one matched to extract comment
-                    match_str = full_name if full_name in text_after_recognize else \
-                                (u_name if u_name in text_after_recognize else first_name)
-                    
-                    comment_area = text_after_recognize.replace(match_str, "", 1).strip()
-                    if comment_area:
-                        # Handle "120 points" logic - the user said "120 points"
-                        # My backend currently doesn't support variable points in this call (fixed at 100)
-                        # but I should at least save it in the comment or log it.
-                        comment = re.sub(r'^(with|comment|comments|message|saying|for|along with)?\s*', '', comment_area, flags=re.IGNORECASE).strip()
-                    break
-                
-                # Handling typos like "NEET" for "Neeli"
-                # If the first word of text_after_recognize is very similar to first_name
-                words_after = text_after_recognize.split()
-                if words_after and first_name:
-                    first_word_input = words_after[0]
-                    # Simple similarity: if they share 3+ characters and are same length-ish
-                    if len(first_word_input) > 3 and first_word_input[:3] == first_name[:3]:
-                        target_username = u.get('userName')
-                        comment_area = " ".join(words_after[1:])
-                        comment = re.sub(r'^(with|comment|comments|message|saying|for|along with)?\s*', '', comment_area, flags=re.IGNORECASE).strip() or "Excellent work!"
-                        break
-
+                return True, NEED_USER_TO_RECOGNIZE
+            target_username, comment = self._recognition_target(user_input, intent)
             if target_username:
                 result = self.user_service.recognize(user_id, target_username, comment)
                 return True, result
-            
-            return True, "Who should I recognize? Please provide their full name or username."
+            return True, WHO_TO_RECOGNIZE
 
         # 2. Recognition History Intent
-        if any(keyword in input_lower for keyword in ["how many recognition", "show my recognitions", "received recognition"]):
+        if intent.kind == HISTORY:
             if not user_id:
-                return True, "Please select a user in the sidebar to see recognition history."
-            
-            recognitions = self.user_service.get_recognition_history(user_id)
-            if not recognitions:
-                return True, "You haven't received any recognitions yet."
-            
-            response = "Here are the recognitions you've received:\n"
-            for rec in recognitions:
-                sender_name = rec.get('sender', {}).get('fullName', 'Someone')
-                response += f"- {rec.get('points')} pts from {sender_name}: \"{rec.get('comment')}\" ({rec.get('timestamp')[:10]})\n"
-            return True, response
+                return True, NEED_USER_FOR_HISTORY
+            return True, _format_recognitions(self.user_service.get_recognition_history(user_id))
 
         # 3. List Users
-        if any(keyword in input_lower for keyword in ["get all users", "list users", "show participants"]):
-            users = self.user_service.get_all_users()
-            if not users: return True, "I couldn't find any users."
-            
-            response = "Participants:\n"
-            for user in users:
-                response += f"- {user.get('fullName')} (@{user.get('userName')}) | Points: {user.get('points')}\n"
-            return True, response
+        if intent.kind == LIST_USERS:
+            return True, _format_users(self.user_service.get_all_users())
         
-        if "get user" in input_lower or "show user" in input_lower:
+        if intent.kind == GET_USER:
             # Try to extract an ID
-            import re
-            match = re.search(r'\d+', user_input)
+            match = _DIGITS.search(user_input)
+            if match:
+                user_id = match.group()
+                return True, _format_user(self.user_service.get_user_by_id(user_id), user_id)
+            return True, "Which user ID should I look for?"
+
+        return False, None
+
+    async def _aprocess_user_intents(self, user_input: str, user_id=None, intent=None):
+        """_process_user_intents for the async path: user service calls don't hold a worker thread."""
+        intent = intent or classify(user_input.strip())
+        service = self.async_user_service
+
+        if intent.kind == RECOGNITION:
+            print(f"[DEBUG] Recognition Keyword matched. UserID: {user_id}")
+            if not user_id:
+                return True, NEED_USER_TO_RECOGNIZE
+            # resolve() may load the directory inline (blocking HTTP) before the first refresh lands
+            target_username, comment = await asyncio.to_thread(self._recognition_target, user_input, intent)
+            if target_username:
+                return True, await service.recognize(user_id, target_username, comment)
+            return True, WHO_TO_RECOGNIZE
+
+        if intent.kind == HISTORY:
+            if not user_id:
+                return True, NEED_USER_FOR_HISTORY
+            return True, _format_recognitions(await service.get_recognition_history(user_id))
+
+        if intent.kind == LIST_USERS:
+            return True, _format_users(await service.get_all_users())
+
+        if intent.kind == GET_USER:
+            match = _DIGITS.search(user_input)
             if match:
                 user_id = match.group()
-                user = self.user_service.get_user_by_id(user_id)
-                if user:
-                    return True, f"Found user: {user.get('fullName')} from {user.get('department')} department."
-                else:
-                    return True, f"I couldn't find a user with ID {user_id}."
+                return True, _format_user(await service.get_user_by_id(user_id), user_id)
             return True, "Which user ID should I look for?"
 
         return False, None
 
+    def _recognition_target(self, user_input, intent):
+        """Returns (target username or None, comment) for a recognition request."""
+        input_lower = user_input.strip().lower()
+        target_username = None
+        comment = "Excellent work!"
+
+        # Extract text after the keyword
+        text_after_recognize = input_lower[intent.match.end():].strip()
+
+        # Indexed lookup: exact full name / username / first name, else a fuzzy first-name match
+        match = self.participants.resolve(text_after_recognize)
+        if match:
+            target_user, match_str = match
+            target_username = target_user.get('userName')
+            comment_area = text_after_recognize.replace(match_str, "", 1).strip()
+            if comment_area:
+                # Handle "120 points" logic - the user said "120 points"
+                # My backend currently doesn't support variable points in this call (fixed at 100)
+                # but I should at least save it in the comment or log it.
+                comment = _COMMENT_LEAD.sub('', comment_area).strip() or comment
+        return target_username, comment
+
     def list_users(self):
         """Direct access to user list for API endpoints."""
         return self.user_service.get_all_users()
@@ -0,0 +1,104 @@
+"""
+Tests for the asyncpg-backed db layer (fake pool, no Postgres needed)
+"""
+import asyncio
+import re
+
+import asyncpg
+
+from brain import async_db, db
+from brain.async_db import to_asyncpg_sql
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.in_transaction = True
+
+    async def __aexit__(self, *exc):
+        self.conn.in_transaction = False
+
+class FakeAcquire:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        pass
+
+class FakePool:
+    """Records statements; fails fetches whose SQL contains `fail_on`."""
+    def __init__(self, rows=(), fail_on=None):
+        self.rows = list(rows)
+        self.fail_on = fail_on
+        self.in_transaction = False
+        self.calls = []
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def execute(self, sql, *args):
+        self.calls.append(("execute", sql, args, self.in_transaction))
+
+    async def fetch(self, sql, *args):
+        self.calls.append(("fetch", sql, args, self.in_transaction))
+        if self.fail_on and self.fail_on in sql:
+            raise asyncpg.PostgresError("column content_tsv does not exist")
+        return [dict(row) for row in self.rows]
+
+def _run_with_pool(pool, coro_fn):
+    original = async_db.connection_pool
+    async_db.connection_pool = pool
+    try:
+        return asyncio.run(coro_fn())
+    finally:
+        async_db.connection_pool = original
+
+def _placeholders(sql):
+    return sorted({int(n) for n in re.findall(r'\$(\d+)', sql)})
+
+def test_placeholders_are_numbered_in_order():
+    assert to_asyncpg_sql("SELECT * FROM t WHERE a = %s AND b = %s LIMIT %s") == \
+        "SELECT * FROM t WHERE a = $1 AND b = $2 LIMIT $3"
+    assert to_asyncpg_sql("SELECT 1") == "SELECT 1"
+
+def test_escaped_percent_is_unescaped_not_numbered():
+    assert to_asyncpg_sql("SELECT %s <%% content, '100%%'") == "SELECT $1 <% content, '100%'"
+
+def test_every_search_mode_converts_with_matching_params():
+    for mode in db.SEARCH_MODES:
+        sql, params = db.build_search_query("when is my coffee order?", 5, mode)
+        converted = to_asyncpg_sql(sql)
+        assert "%s" not in converted
+        assert _placeholders(converted) == list(range(1, len(params) + 1)), mode
+    setup_sql, setup_params = db.search_setup_statements("trigram")[0]
+    assert _placeholders(to_asyncpg_sql(setup_sql)) == list(range(1, len(setup_params) + 1))
+
+def test_setup_statements_run_in_the_search_transaction():
+    pool = FakePool(rows=[{'id': 1, 'content': 'likes coffee', 'relevance': 0.9}])
+    memories = _run_with_pool(pool, lambda: async_db.search_memories("cofee", mode="trigram", threshold=0.4))
+    assert memories == [{'id': 1, 'content': 'likes coffee'}]
+    (kind, sql, args, in_tx), fetch = pool.calls
+    assert kind == "execute" and "set_config" in sql and args == ("0.4",) and in_tx
+    assert fetch[0] == "fetch" and "<% content" in fetch[1] and fetch[3]
+
+def test_failed_fts_search_falls_back_to_ilike():
+    pool = FakePool(rows=[{'id': 2, 'content': 'birthday is 27th December'}], fail_on="content_tsv")
+    memories = _run_with_pool(pool, lambda: async_db.search_memories("birthday", mode="fts"))
+    assert memories == [{'id': 2, 'content': 'birthday is 27th December'}]
+    assert [call[0] for call in pool.calls] == ["fetch", "fetch"]
+    assert "ILIKE $" in pool.calls[1][1]
+
+if __name__ == "__main__":
+    test_placeholders_are_numbered_in_order()
+    test_escaped_percent_is_unescaped_not_numbered()
+    test_every_search_mode_converts_with_matching_params()
+    test_setup_statements_run_in_the_search_transaction()
+    test_failed_fts_search_falls_back_to_ilike()
+    print("All async db tests passed.")
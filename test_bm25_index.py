@@ -0,0 +1,107 @@
+"""
+Tests for the in-process BM25 index (no Postgres needed)
+"""
+import math
+
+from brain.bm25_index import BM25Index
+from testutils import memory
+
+def _ids(rows):
+    return [row['id'] for row in rows]
+
+def _reference_scores(docs, query, k1=1.2, b=0.75):
+    """Plain-Python BM25 over {id: content}, for checking the array-based scoring."""
+    tokenized = {i: BM25Index.tokenize(text) for i, text in docs.items()}
+    n = len(tokenized)
+    avg_len = sum(len(t) for t in tokenized.values()) / n
+    scores = {}
+    for i, tokens in tokenized.items():
+        score = 0.0
+        for term in set(BM25Index.tokenize(query)):
+            df = sum(1 for t in tokenized.values() if term in t)
+            tf = tokens.count(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avg_len))
+        if score:
+            scores[i] = score
+    return scores
+
+def test_scores_match_reference_bm25():
+    docs = {1: "my dog is called Bruno", 2: "Bruno likes the park", 3: "coffee order is a flat white",
+            4: "dog food brand is Pedigree dog chow", 5: "the park near home is green"}
+    index = BM25Index()
+    index.build(memory(i, text) for i, text in docs.items())
+    for query in ("dog", "bruno park", "coffee", "green park dog"):
+        expected = _reference_scores(docs, query)
+        ranked = sorted(expected, key=lambda i: (expected[i], i), reverse=True)
+        assert _ids(index.search(query, k=10)) == ranked, query
+        assert _ids(index.search(query, k=2)) == ranked[:2], query
+    assert index.search("the") == []       # stop words only
+    assert index.search("unicorn") == []
+
+def test_updates_and_deletes_follow_memory_changes():
+    index = BM25Index()
+    index.build([memory(1, "likes tea"), memory(2, "likes green tea")])
+    index.on_memory_change("add", [memory(3, "drinks coffee daily")])
+    index.on_memory_change("delete", [{'id': 2}])
+    assert _ids(index.search("tea")) == [1]
+    assert _ids(index.search("coffee")) == [3]
+    # Re-adding an id replaces its old content
+    index.on_memory_change("add", [memory(1, "likes coffee now")])
+    assert index.search("tea") == [] and sorted(_ids(index.search("coffee"))) == [1, 3]
+    assert len(index) == 2
+
+def test_changes_during_build_are_replayed():
+    index = BM25Index()
+    index.build([memory(1, "old tea memory")])
+
+    def rows():
+        yield memory(2, "dog is Bruno")
+        # Writers keep going while the build runs
+        index.on_memory_change("add", [memory(3, "cat is Tom")])
+        index.on_memory_change("delete", [{'id': 2}])
+        yield memory(4, "dog food is chow")
+
+    index.build(rows())
+    assert index.ready
+    assert _ids(index.search("dog")) == [4]
+    assert _ids(index.search("cat")) == [3]
+    assert index.search("tea") == []     # the previous index was replaced
+    assert len(index) == 2
+
+def test_failed_build_keeps_the_old_index():
+    index = BM25Index()
+    index.build([memory(1, "likes tea")])
+
+    def broken():
+        yield memory(2, "dog is Bruno")
+        raise RuntimeError("connection lost")
+
+    try:
+        index.build(broken())
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    assert _ids(index.search("tea")) == [1] and index.search("dog") == []
+    # Listener events apply directly again once the build is over
+    index.on_memory_change("add", [memory(3, "dog is Max")])
+    assert _ids(index.search("dog")) == [3]
+
+def test_deleted_slots_are_compacted():
+    index = BM25Index()
+    index.build(memory(i, f"memory number {i} about tea") for i in range(2000))
+    index.on_memory_change("delete", [{'id': i} for i in range(1500)])
+    # 1500 dead slots > 1000 and > live // 4, so the index was rebuilt from live rows
+    assert len(index._rows) == 500 and len(index) == 500
+    assert index._df["tea"] == 500
+    assert sorted(_ids(index.search("tea", k=1000))) == list(range(1500, 2000))
+
+if __name__ == "__main__":
+    test_scores_match_reference_bm25()
+    test_updates_and_deletes_follow_memory_changes()
+    test_changes_during_build_are_replayed()
+    test_failed_build_keeps_the_old_index()
+    test_deleted_slots_are_compacted()
+    print("All BM25 index tests passed.")
@@ -0,0 +1,75 @@
+"""
+Tests for bulk memory ingest and the NDJSON /memories/bulk endpoint
+(fake bot and bulk insert, no Postgres needed)
+"""
+import json
+
+from fastapi.testclient import TestClient
+
+import backend.api_server as api
+from brain import db
+
+def _rejects(item):
+    try:
+        db.normalize_memory_row(item)
+    except (ValueError, TypeError):
+        return True
+    return False
+
+def test_normalize_accepts_supported_shapes():
+    assert db.normalize_memory_row("likes tea") == ("FACT", "likes tea", 1.0, "bulk_import")
+    assert db.normalize_memory_row({'content': "dog is Bruno", 'category': "PET", 'confidence': "0.5"},
+                                   default_source="bulk_api") == ("PET", "dog is Bruno", 0.5, "bulk_api")
+    assert db.normalize_memory_row(("PREFERENCE", "green sofa", 0.8, "csv")) == ("PREFERENCE", "green sofa", 0.8, "csv")
+
+def test_normalize_rejects_non_string_content():
+    for item in ({'content': 42}, {'content': ["a", "b"]}, {'content': None}, {'content': "   "},
+                 {}, ("FACT", 7), "", 42, None, {'content': "ok", 'category': 3}):
+        assert _rejects(item), item
+
+def _post(client, lines):
+    body = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+    return client.post("/memories/bulk", content=body.encode(), headers={"Content-Type": "application/x-ndjson"})
+
+def test_bulk_endpoint_inserts_ndjson_lines():
+    received = []
+
+    async def fake_bulk(memories):
+        received.extend(memories)
+        return list(range(1, len(memories) + 1))
+
+    bot, api.bot = api.bot, object()
+    original, api.async_db.add_memories_bulk = api.async_db.add_memories_bulk, fake_bulk
+    try:
+        client = TestClient(api.app)
+        response = _post(client, [{'content': "likes tea"}, "", {'content': "dog is Bruno", 'category': "PET"}])
+        assert response.status_code == 200
+        assert response.json() == {"inserted": 2, "ids": [1, 2]}
+        assert received == [("FACT", "likes tea", 1.0, "bulk_api"), ("PET", "dog is Bruno", 1.0, "bulk_api")]
+        assert _post(client, []).json() == {"inserted": 0, "ids": []}
+    finally:
+        api.bot = bot
+        api.async_db.add_memories_bulk = original
+
+def test_bulk_endpoint_rejects_bad_lines_with_400():
+    async def fake_bulk(memories):
+        raise AssertionError("nothing should be inserted")
+
+    bot, api.bot = api.bot, object()
+    original, api.async_db.add_memories_bulk = api.async_db.add_memories_bulk, fake_bulk
+    try:
+        client = TestClient(api.app)
+        for bad in ({'content': 42}, {'content': None}, {'content': ["a"]}, "{not json", "7"):
+            response = _post(client, [{'content': "fine"}, bad])
+            assert response.status_code == 400, bad
+            assert "line 2" in response.json()["detail"]
+    finally:
+        api.bot = bot
+        api.async_db.add_memories_bulk = original
+
+if __name__ == "__main__":
+    test_normalize_accepts_supported_shapes()
+    test_normalize_rejects_non_string_content()
+    test_bulk_endpoint_inserts_ndjson_lines()
+    test_bulk_endpoint_rejects_bad_lines_with_400()
+    print("All bulk ingest tests passed.")
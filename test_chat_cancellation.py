@@ -0,0 +1,103 @@
+"""
+Tests for cancelling in-flight generations (fake bot and Ollama client)
+"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import backend.api_server as api
+from brain.llm_interface import AsyncLLMInterface, GENERATION_OPTIONS
+
+class FakeOllama:
+    def __init__(self):
+        self.closed = False
+
+    async def chat(self, model, stream, **kwargs):
+        async def chunks():
+            try:
+                for i in range(50):
+                    await asyncio.sleep(0.01)
+                    yield SimpleNamespace(message=SimpleNamespace(content=f"t{i} "), done=False)
+            finally:
+                self.closed = True
+        return chunks()
+
+    async def close(self):
+        pass
+
+class FakeHealth:
+    def is_healthy(self):
+        return True
+
+    def last_known_healthy(self):
+        return True
+
+def test_closing_a_stream_closes_ollama_and_counts_tokens_saved():
+    llm = AsyncLLMInterface(health=FakeHealth())
+    llm.client = FakeOllama()
+
+    async def read_three():
+        stream = llm.stream("hi")
+        received = [await stream.__anext__() for _ in range(3)]
+        await stream.aclose()
+        return received
+
+    assert asyncio.run(read_three()) == ["t0 ", "t1 ", "t2 "]
+    assert llm.client.closed
+    assert llm.cancellation_stats() == {"cancelled_streams": 1,
+                                        "cancelled_tokens_saved": GENERATION_OPTIONS["num_predict"] - 3}
+    assert llm.scheduler.in_flight == 0
+
+class FakeBot:
+    def __init__(self):
+        self.async_brain = SimpleNamespace(cancellation_stats=lambda: {})
+        self.closed = False
+
+    async def achat(self, user_input, model=None, user_id=None):
+        async def tokens():
+            try:
+                for i in range(100):
+                    await asyncio.sleep(0.05)
+                    yield f"tok{i} "
+            finally:
+                self.closed = True
+        return tokens()
+
+def test_cancel_endpoint_stops_the_stream():
+    bot, api.bot = api.bot, FakeBot()
+    try:
+        client = TestClient(api.app)
+        body = {}
+
+        def stream():
+            # A client-supplied id is ignored; the server always assigns one
+            headers = {"X-Request-Id": "req-1", "X-User-Id": "7"}
+            with client.stream("POST", "/chat", json={"message": "hi"}, headers=headers) as r:
+                body["request_id"] = r.headers["x-request-id"]
+                body["text"] = "".join(r.iter_text())
+
+        reader = threading.Thread(target=stream)
+        reader.start()
+        time.sleep(0.3)
+        # The test client only exposes headers once the body is complete, so take the id from the server
+        (request_id,) = api.active_chats
+        assert request_id != "req-1"
+        # Only the user who started the stream can cancel it
+        assert client.post(f"/chat/{request_id}/cancel", headers={"X-User-Id": "8"}).status_code == 404
+        assert client.post(f"/chat/{request_id}/cancel", headers={"X-User-Id": "7"}).json()["cancelled"]
+        reader.join(5)
+
+        assert body["request_id"] == request_id
+        assert 0 < len(body["text"].split()) < 100
+        assert api.bot.closed and request_id not in api.active_chats
+        assert client.post(f"/chat/{request_id}/cancel", headers={"X-User-Id": "7"}).status_code == 404
+    finally:
+        api.bot = bot
+
+if __name__ == "__main__":
+    test_closing_a_stream_closes_ollama_and_counts_tokens_saved()
+    test_cancel_endpoint_stops_the_stream()
+    print("All cancellation tests passed.")
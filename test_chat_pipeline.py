@@ -0,0 +1,192 @@
+"""
+Tests for the concurrent pre-generation pipeline in DigitalSelf.achat
+(fake services, no Ollama or Postgres needed)
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from brain.health import OllamaHealthMonitor
+from brain.llm_interface import AsyncLLMInterface, GenerationScheduler
+from brain.participant_directory import ParticipantDirectory
+from brain.response_cache import ResponseCache
+from digital_self import DigitalSelf
+
+DELAY = 0.2
+
+class FakeUserService:
+    def get_user_by_id(self, user_id):
+        time.sleep(DELAY)
+        return {'userName': 'krishna'}
+
+class FakeAsyncUserService:
+    async def get_user_by_id(self, user_id):
+        await asyncio.sleep(DELAY)
+        return {'userName': 'krishna'}
+
+class FakeWriter:
+    def __init__(self):
+        self.messages = []
+
+    def log_message(self, user_id, user_name, role, text):
+        self.messages.append((user_name, role, text))
+
+    def log_conversation(self, *args, **kwargs):
+        pass
+
+class FakeMemoryController:
+    def __init__(self):
+        self.retrieval_finished = False
+
+    async def aprocess_input(self, user_input, intent=None):
+        if user_input.startswith("remember"):
+            return True, "Got it."
+        return False, None
+
+    async def aretrieve_memories(self, query, session_id=None):
+        await asyncio.sleep(DELAY)
+        self.retrieval_finished = True
+        return [{'id': 1, 'category': 'FACT', 'content': 'likes tea'}]
+
+class FakeAsyncBrain:
+    def __init__(self):
+        self.scheduler = GenerationScheduler()
+        self.memories = None
+
+    async def stream(self, prompt, model=None, user_id=None, memories=None, outcome=None):
+        self.memories = memories
+        yield "Hello"
+        if outcome is not None:
+            outcome["completed"] = True
+
+def _bot():
+    bot = DigitalSelf.__new__(DigitalSelf)
+    bot.user_service = FakeUserService()
+    bot.async_user_service = FakeAsyncUserService()
+    bot.writer = FakeWriter()
+    bot.memory_controller = FakeMemoryController()
+    bot.async_brain = FakeAsyncBrain()
+    bot.brain = SimpleNamespace(model_name="llama3.2:1b")
+    bot.router = None
+    bot.response_cache = None
+    return bot
+
+async def _chat(bot, text):
+    start = time.perf_counter()
+    stream = await bot.achat(text, user_id="7")
+    first = await stream.__anext__()
+    elapsed = time.perf_counter() - start
+    async for _ in stream:
+        pass
+    return first, elapsed
+
+def test_user_lookup_and_retrieval_overlap():
+    bot = _bot()
+    first, elapsed = asyncio.run(_chat(bot, "what do I like?"))
+    assert first == "Hello"
+    assert bot.async_brain.memories[0]['content'] == 'likes tea'
+    # Lookup and retrieval each take DELAY; run in sequence they would take twice that
+    assert elapsed < DELAY * 1.75
+    assert bot.writer.messages == [('krishna', 'user', 'what do I like?'), ('krishna', 'assistant', 'Hello')]
+
+class FlakyOllama:
+    """Streams a few tokens, then drops the connection on the first request only."""
+    def __init__(self):
+        self.requests = 0
+
+    async def chat(self, model, stream, **kwargs):
+        self.requests += 1
+        failing = self.requests == 1
+
+        async def chunks():
+            yield SimpleNamespace(message=SimpleNamespace(content="Sure, "), done=False)
+            if failing:
+                raise ConnectionResetError("connection reset")
+            yield SimpleNamespace(message=SimpleNamespace(content="tea."), done=True, prompt_eval_count=9)
+        return chunks()
+
+def test_mid_stream_error_is_not_cached():
+    bot = _bot()
+    health = OllamaHealthMonitor(client=SimpleNamespace(list=lambda: {}))
+    bot.async_brain = AsyncLLMInterface(health=health)
+    bot.async_brain.client = FlakyOllama()
+    bot.response_cache = ResponseCache()
+
+    async def reply():
+        return "".join([chunk async for chunk in await bot.achat("what do I like?")])
+
+    first = asyncio.run(reply())
+    assert first == "Sure, Error generating response: connection reset"
+    assert bot.response_cache.stats()["entries"] == 0
+    # The retry reaches Ollama again and its complete reply is cached
+    health.mark_success()
+    assert asyncio.run(reply()) == "Sure, tea."
+    assert bot.async_brain.client.requests == 2
+    assert asyncio.run(reply()) == "Sure, tea."
+    assert bot.async_brain.client.requests == 2
+
+def test_memory_command_cancels_speculative_retrieval():
+    bot = _bot()
+
+    async def run():
+        result = await _chat(bot, "remember I like tea")
+        await asyncio.sleep(DELAY * 1.5)
+        return result
+
+    first, elapsed = asyncio.run(run())
+    assert first == "Got it."
+    # The reply doesn't wait for the user lookup that its log entry needs
+    assert elapsed < DELAY / 2
+    assert not bot.memory_controller.retrieval_finished
+    assert bot.async_brain.memories is None
+    assert bot.writer.messages[-1] == ('krishna', 'assistant', 'Got it.')
+
+class SlowDirectoryService:
+    """Participant list behind a slow, blocking HTTP call."""
+
+    def get_all_users_if_changed(self, etag=None):
+        time.sleep(DELAY)
+        return [{'userName': 'asha.r', 'fullName': 'Asha Rao'}], '"v1"'
+
+class FakeAsyncRecognitions:
+    async def recognize(self, sender_id, receiver_username, comment):
+        return f"Recognized {receiver_username}: {comment}"
+
+def test_recognition_comment_excludes_name_and_punctuation():
+    bot = _bot()
+    bot.participants = ParticipantDirectory(SlowDirectoryService())
+    bot.async_user_service = FakeAsyncRecognitions()
+    detected, reply = asyncio.run(bot._aprocess_user_intents("recognize Asha Rao, great demo", "7"))
+    assert detected and reply == "Recognized asha.r: great demo"
+
+def test_cold_directory_does_not_block_event_loop():
+    bot = _bot()
+    bot.participants = ParticipantDirectory(SlowDirectoryService())
+    bot.async_user_service = FakeAsyncRecognitions()
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(DELAY / 10)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        reply = await bot._aprocess_user_intents("recognize asha rao for the demo", "7")
+        ticking.cancel()
+        return reply, ticks
+
+    (detected, reply), ticks = asyncio.run(run())
+    assert detected and reply == "Recognized asha.r: the demo"
+    # The inline directory load ran in a worker thread, so other coroutines kept running
+    assert ticks >= 5
+
+if __name__ == "__main__":
+    test_user_lookup_and_retrieval_overlap()
+    test_memory_command_cancels_speculative_retrieval()
+    test_mid_stream_error_is_not_cached()
+    test_cold_directory_does_not_block_event_loop()
+    test_recognition_comment_excludes_name_and_punctuation()
+    print("All chat pipeline tests passed.")
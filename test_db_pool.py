@@ -0,0 +1,160 @@
+"""
+Tests for the bounded psycopg2 connection pool (fake connections, no Postgres needed)
+"""
+import threading
+import time
+
+import psycopg2
+
+from brain import db
+from brain.db import BoundedConnectionPool, PoolTimeout
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.status = psycopg2.extensions.STATUS_READY
+        self.rollbacks = 0
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.STATUS_READY
+
+    def close(self):
+        self.closed = 1
+
+def _fake_connect():
+    """Patches psycopg2.connect to hand out FakeConnections; returns (opened, original)."""
+    opened = []
+    original = db.psycopg2.connect
+
+    def connect(**conn_kwargs):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    db.psycopg2.connect = connect
+    return opened, original
+
+def test_exhausted_pool_waits_then_times_out():
+    opened, original = _fake_connect()
+    try:
+        pool = BoundedConnectionPool(0, 1, timeout=0.1)
+        conn = pool.getconn()
+        start = time.monotonic()
+        try:
+            pool.getconn()
+            assert False, "expected PoolTimeout"
+        except PoolTimeout:
+            pass
+        assert time.monotonic() - start >= 0.1
+        stats = pool.stats()
+        assert stats["timeouts"] == 1 and stats["in_use"] == 1 and stats["size"] == 1
+        pool.putconn(conn)
+        assert len(opened) == 1
+    finally:
+        db.psycopg2.connect = original
+
+def test_waiter_gets_the_returned_connection():
+    opened, original = _fake_connect()
+    try:
+        pool = BoundedConnectionPool(0, 1, timeout=2)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+        assert pool.getconn() is conn
+        stats = pool.stats()
+        assert stats["checkouts"] == 2 and stats["max_wait_ms"] >= 40
+        assert len(opened) == 1
+    finally:
+        db.psycopg2.connect = original
+
+def test_old_connections_are_recycled():
+    opened, original = _fake_connect()
+    try:
+        pool = BoundedConnectionPool(1, 2, max_lifetime=0.01)
+        time.sleep(0.02)
+        assert pool.getconn() is opened[1] and opened[0].closed
+        assert pool.stats()["recycled"] == 1
+    finally:
+        db.psycopg2.connect = original
+
+def test_idle_connections_are_pinged_and_dead_ones_dropped():
+    opened, original = _fake_connect()
+    try:
+        pool = BoundedConnectionPool(1, 2, ping_after_idle=0)
+        opened[0].broken = True
+        assert pool.getconn() is opened[1] and opened[0].closed
+        stats = pool.stats()
+        assert stats["ping_failures"] == 1 and stats["size"] == 1
+    finally:
+        db.psycopg2.connect = original
+
+def test_connection_left_in_a_transaction_is_rolled_back():
+    opened, original = _fake_connect()
+    try:
+        pool = BoundedConnectionPool(0, 1)
+        conn = pool.getconn()
+        conn.status = psycopg2.extensions.STATUS_IN_TRANSACTION
+        pool.putconn(conn)
+        assert conn.rollbacks == 1 and pool.stats()["idle"] == 1
+    finally:
+        db.psycopg2.connect = original
+
+def test_failed_connect_frees_its_slot():
+    opened, original = _fake_connect()
+    try:
+        pool = BoundedConnectionPool(0, 1, timeout=0.1)
+        fake_connect = db.psycopg2.connect
+
+        def refuse(**kwargs):
+            raise psycopg2.OperationalError("connection refused")
+
+        db.psycopg2.connect = refuse
+        try:
+            pool.getconn()
+            assert False, "expected OperationalError"
+        except psycopg2.OperationalError:
+            pass
+        assert pool.stats()["size"] == 0
+        db.psycopg2.connect = fake_connect
+        assert pool.getconn() is opened[0]
+    finally:
+        db.psycopg2.connect = original
+
+def test_closed_pool_refuses_checkouts():
+    opened, original = _fake_connect()
+    try:
+        pool = BoundedConnectionPool(2, 2)
+        pool.closeall()
+        assert all(conn.closed for conn in opened)
+        try:
+            pool.getconn()
+            assert False, "expected PoolError"
+        except psycopg2.pool.PoolError:
+            pass
+    finally:
+        db.psycopg2.connect = original
+
+if __name__ == "__main__":
+    test_exhausted_pool_waits_then_times_out()
+    test_waiter_gets_the_returned_connection()
+    test_old_connections_are_recycled()
+    test_idle_connections_are_pinged_and_dead_ones_dropped()
+    test_connection_left_in_a_transaction_is_rolled_back()
+    test_failed_connect_frees_its_slot()
+    test_closed_pool_refuses_checkouts()
+    print("All connection pool tests passed.")
@@ -0,0 +1,210 @@
+"""
+Tests for the in-memory embedding store (no Ollama or Postgres needed)
+"""
+import threading
+import time
+
+from brain import db
+from brain import embeddings
+from brain.embeddings import EmbeddingStore, HashingEmbedder, PgVectorStore
+from testutils import memory, patch_db
+
+def test_hashing_embedder_is_deterministic():
+    embedder = HashingEmbedder(dim=64)
+    a = embedder.embed(["my favourite coffee is a latte"])
+    b = embedder.embed(["my favourite coffee is a latte"])
+    assert a.shape == (1, 64)
+    assert (a == b).all()
+
+def test_search_ranks_similar_memories_first():
+    store = EmbeddingStore(HashingEmbedder(), initial_capacity=2)
+    store.build([
+        memory(1, "birthday is 27th December"),
+        memory(2, "favourite coffee is a flat white"),
+        memory(3, "I play guitar on weekends"),
+    ])
+    results = store.search("when is my birthday?", k=2)
+    assert results[0]['id'] == 1
+    assert store.search("what coffee do I like", k=1)[0]['id'] == 2
+
+def test_incremental_add_and_delete():
+    store = EmbeddingStore(HashingEmbedder(), batch_size=8)
+    store.build([memory(1, "dog is called Bruno")])
+    store.on_memory_change("add", [memory(2, "cat is called Misty")])
+    assert store.search("cat name", k=1)[0]['id'] == 2
+
+    store.on_memory_change("delete", [{'id': 2}])
+    assert all(r['id'] != 2 for r in store.search("cat name", k=5))
+    assert len(store) == 1
+
+def test_search_batch_matches_single_queries():
+    store = EmbeddingStore(HashingEmbedder())
+    store.build([memory(i, f"note number {i} about topic{i}") for i in range(50)])
+    batch = store.search_batch(["topic7", "topic42"], k=1)
+    assert batch[0][0]['id'] == store.search("topic7", k=1)[0]['id'] == 7
+    assert batch[1][0]['id'] == 42
+
+class SlowEmbedder(HashingEmbedder):
+    """HashingEmbedder behind a slow "HTTP call"."""
+
+    def __init__(self, delay=0.2):
+        super().__init__()
+        self.delay = delay
+        self.started = threading.Event()
+
+    def embed(self, texts):
+        self.started.set()
+        time.sleep(self.delay)
+        return super().embed(texts)
+
+def test_listener_only_enqueues():
+    previous_interval, embeddings.FLUSH_INTERVAL = embeddings.FLUSH_INTERVAL, 0.05
+    try:
+        store = EmbeddingStore(SlowEmbedder(), batch_size=1)
+        start = time.perf_counter()
+        store.on_memory_change("add", [memory(1, "dog is called Bruno")])
+        assert time.perf_counter() - start < 0.05
+        # The background worker embeds it without any search forcing a flush
+        deadline = time.monotonic() + 2
+        while not len(store) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert len(store) == 1
+    finally:
+        embeddings.FLUSH_INTERVAL = previous_interval
+
+def test_add_does_not_wait_for_a_running_search():
+    store = EmbeddingStore(HashingEmbedder())
+    store.build([memory(1, "dog is called Bruno")])
+    searching, done = threading.Event(), threading.Event()
+
+    def long_search():
+        # Stands in for a large matrix product under the store lock
+        with store._lock:
+            searching.set()
+            done.wait(2)
+
+    searcher = threading.Thread(target=long_search)
+    searcher.start()
+    searching.wait()
+    start = time.perf_counter()
+    store.on_memory_change("add", [memory(2, "cat is called Misty")])
+    assert time.perf_counter() - start < 0.05
+    done.set()
+    searcher.join()
+    assert store.search("cat name", k=1)[0]['id'] == 2
+
+def test_delete_during_flush_is_not_resurrected():
+    store = EmbeddingStore(SlowEmbedder(), batch_size=8)
+    store._pending.append(memory(1, "dog is called Bruno"))
+    flushing = threading.Thread(target=store.flush)
+    flushing.start()
+    store.embedder.started.wait()
+    store.on_memory_change("delete", [{'id': 1}])
+    flushing.join()
+    assert len(store) == 0
+
+def test_delete_during_build_is_not_resurrected():
+    store = EmbeddingStore(HashingEmbedder(), batch_size=2)
+
+    def snapshot():
+        # The startup snapshot already holds memory 1 when it is deleted mid-build
+        yield memory(1, "dog is called Bruno")
+        store.on_memory_change("delete", [{'id': 1}])
+        store.on_memory_change("add", [memory(3, "cat is called Misty")])
+        yield memory(2, "bike is red")
+
+    store.build(snapshot())
+    store.flush()
+    assert store.ready
+    assert sorted(store._slot_of) == [2, 3]
+
+def test_deleted_slots_are_compacted():
+    store = EmbeddingStore(HashingEmbedder())
+    store.build([memory(i, f"note {i} about topic{i}") for i in range(1500)])
+    store.on_memory_change("delete", [{'id': i} for i in range(1200)])
+    assert len(store) == 300
+    assert store._count == 300  # slots reclaimed, not just marked dead
+    assert store.search("topic1234", k=1)[0]['id'] == 1234
+
+def test_pgvector_ready_only_after_schema_and_flushes_off_listener():
+    previous_interval, embeddings.FLUSH_INTERVAL = embeddings.FLUSH_INTERVAL, 0.05
+    stored = []
+    schema_dims = []
+    try:
+        with patch_db(init_vector_schema=lambda dim=None: schema_dims.append(dim) and False,
+                      get_memories_without_embedding=lambda limit: [],
+                      set_memory_embeddings=lambda pairs: stored.extend(pairs) or len(stored)):
+            store = PgVectorStore(SlowEmbedder(), batch_size=1)
+            store.build_in_background().join()
+            assert not store.ready
+
+            db.init_vector_schema = lambda dim=None: schema_dims.append(dim) or True
+            store.build_in_background().join()
+            assert store.ready
+            # The column is sized for the embedder, not the 768-dim default
+            assert schema_dims == [256, 256]
+
+            start = time.perf_counter()
+            store.on_memory_change("add", [memory(1, "dog is called Bruno")])
+            assert time.perf_counter() - start < 0.05 and not stored
+            deadline = time.monotonic() + 2
+            while not stored and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert stored[0][0] == 1
+    finally:
+        embeddings.FLUSH_INTERVAL = previous_interval
+
+class FakeSchemaCursor:
+    def __init__(self, existing_dim):
+        self.existing_dim = existing_dim
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return (self.existing_dim,) if self.existing_dim else None
+
+    def close(self):
+        pass
+
+class FakeSchemaConnection:
+    def __init__(self, existing_dim=None):
+        self.cursor_ = FakeSchemaCursor(existing_dim)
+        self.committed = False
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+def test_vector_column_of_another_size_is_refused():
+    conn = FakeSchemaConnection(existing_dim=768)
+    with patch_db(get_db_connection=lambda: conn, return_connection=lambda c: None):
+        assert db.init_vector_schema(dim=256) is False
+    assert not conn.committed
+    assert not any("ADD COLUMN" in sql for sql in conn.cursor_.executed)
+
+    conn = FakeSchemaConnection()
+    with patch_db(get_db_connection=lambda: conn, return_connection=lambda c: None):
+        assert db.init_vector_schema(dim=HashingEmbedder().dim) is True
+    assert conn.committed
+    assert any("embedding vector(256)" in sql for sql in conn.cursor_.executed)
+
+if __name__ == "__main__":
+    test_hashing_embedder_is_deterministic()
+    test_search_ranks_similar_memories_first()
+    test_incremental_add_and_delete()
+    test_search_batch_matches_single_queries()
+    test_listener_only_enqueues()
+    test_add_does_not_wait_for_a_running_search()
+    test_delete_during_flush_is_not_resurrected()
+    test_pgvector_ready_only_after_schema_and_flushes_off_listener()
+    test_delete_during_build_is_not_resurrected()
+    test_deleted_slots_are_compacted()
+    test_vector_column_of_another_size_is_refused()
+    print("All embedding store tests passed.")
@@ -0,0 +1,72 @@
+"""
+Tests for the Ollama generation scheduler (no Ollama needed)
+"""
+import asyncio
+
+from brain.llm_interface import GenerationScheduler, QueueFullError, PRIORITY_BACKGROUND
+
+async def _queue_up(scheduler, user_id, order, priority=0):
+    await scheduler.acquire(user_id, priority)
+    order.append(user_id)
+
+def test_limits_in_flight_and_rejects_when_full():
+    async def run():
+        scheduler = GenerationScheduler(max_in_flight=1, max_queue=1)
+        await scheduler.acquire("a")
+        waiter = asyncio.create_task(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        assert scheduler.stats()['queued'] == 1
+
+        try:
+            scheduler.check_capacity()
+            assert False, "expected QueueFullError"
+        except QueueFullError as e:
+            assert e.retry_after >= 1
+
+        scheduler.release(0.1)
+        await waiter
+        assert scheduler.in_flight == 1 and scheduler.stats()['rejected'] == 1
+    asyncio.run(run())
+
+def test_round_robin_across_users():
+    async def run():
+        scheduler = GenerationScheduler(max_in_flight=1, max_queue=10)
+        await scheduler.acquire("holder")
+        order = []
+        tasks = [asyncio.create_task(_queue_up(scheduler, user, order))
+                 for user in ("alice", "alice", "alice", "bob")]
+        await asyncio.sleep(0)
+        for _ in tasks:
+            scheduler.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        # Bob isn't stuck behind all of Alice's requests
+        assert order == ["alice", "bob", "alice", "alice"]
+    asyncio.run(run())
+
+def test_priority_and_cancellation():
+    async def run():
+        scheduler = GenerationScheduler(max_in_flight=1, max_queue=10)
+        await scheduler.acquire("holder")
+        order = []
+        background = asyncio.create_task(_queue_up(scheduler, "warmup", order, PRIORITY_BACKGROUND))
+        cancelled = asyncio.create_task(_queue_up(scheduler, "gone", order))
+        interactive = asyncio.create_task(_queue_up(scheduler, "user", order))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.stats()['queued'] == 2
+
+        scheduler.release()
+        await interactive
+        scheduler.release()
+        await background
+        assert order == ["user", "warmup"]
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_limits_in_flight_and_rejects_when_full()
+    test_round_robin_across_users()
+    test_priority_and_cancellation()
+    print("All generation scheduler tests passed.")
@@ -0,0 +1,94 @@
+"""
+Tests for the cached Ollama health monitor (fake clients, no Ollama needed)
+"""
+import os
+import socket
+import time
+
+from brain import health
+from brain.health import OllamaHealthMonitor
+
+class FakeClient:
+    def __init__(self):
+        self.up = True
+        self.calls = 0
+
+    def list(self):
+        self.calls += 1
+        if not self.up:
+            raise ConnectionError("connection refused")
+        return {"models": []}
+
+def test_is_healthy_uses_the_cache_until_it_is_stale():
+    client = FakeClient()
+    monitor = OllamaHealthMonitor(client=client, ttl=0.1)
+    assert monitor.is_healthy() and client.calls == 1     # first call probes
+    client.up = False
+    assert monitor.is_healthy() and client.calls == 1     # cached
+    time.sleep(0.15)
+    assert monitor.is_healthy() is False and client.calls == 2
+    assert monitor.state()["last_error"] == "connection refused"
+
+def test_last_known_healthy_never_probes():
+    client = FakeClient()
+    monitor = OllamaHealthMonitor(client=client)
+    assert monitor.last_known_healthy()      # unknown counts as healthy
+    monitor.mark_failure(ConnectionError("reset"))
+    assert not monitor.last_known_healthy()
+    assert client.calls == 0
+
+def test_listeners_hear_only_state_flips():
+    client = FakeClient()
+    monitor = OllamaHealthMonitor(client=client)
+    flips = []
+    monitor.add_listener(flips.append)
+    monitor.add_listener(lambda healthy: 1 / 0)   # a broken listener doesn't stop the others
+    monitor.probe()                  # first result is not a flip
+    monitor.mark_success()
+    monitor.mark_failure(RuntimeError("boom"))
+    monitor.mark_failure(RuntimeError("boom again"))
+    assert monitor.consecutive_failures == 2
+    monitor.probe()
+    assert flips == [False, True] and monitor.consecutive_failures == 0
+
+def test_background_thread_keeps_the_state_fresh():
+    client = FakeClient()
+    monitor = OllamaHealthMonitor(client=client, interval=0.02).start()
+    try:
+        time.sleep(0.1)
+        client.up = False
+        time.sleep(0.1)
+        assert monitor.healthy is False and client.calls >= 3
+    finally:
+        monitor.stop()
+
+def test_probe_times_out_against_a_hung_ollama():
+    # Accepts connections but never answers
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    host = f"http://127.0.0.1:{server.getsockname()[1]}"
+    previous_host, previous_timeout = os.environ.get("OLLAMA_HOST"), health.PROBE_TIMEOUT
+    os.environ["OLLAMA_HOST"] = host
+    health.PROBE_TIMEOUT = 0.2
+    try:
+        monitor = OllamaHealthMonitor()   # default client
+        start = time.perf_counter()
+        assert monitor.probe() is False
+        assert time.perf_counter() - start < 2
+        assert monitor.consecutive_failures == 1
+    finally:
+        server.close()
+        health.PROBE_TIMEOUT = previous_timeout
+        if previous_host is None:
+            os.environ.pop("OLLAMA_HOST")
+        else:
+            os.environ["OLLAMA_HOST"] = previous_host
+
+if __name__ == "__main__":
+    test_is_healthy_uses_the_cache_until_it_is_stale()
+    test_last_known_healthy_never_probes()
+    test_listeners_hear_only_state_flips()
+    test_background_thread_keeps_the_state_fresh()
+    test_probe_times_out_against_a_hung_ollama()
+    print("All health monitor tests passed.")
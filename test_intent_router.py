@@ -0,0 +1,49 @@
+"""
+Tests for the compiled intent router
+"""
+from brain.intent_router import (
+    classify, strip_filler, MEMORY_COMMAND, RECOGNITION, HISTORY, LIST_USERS, GET_USER, LLM,
+)
+
+def test_memory_commands():
+    intent = classify("Remember that my birthday is 27th December")
+    assert intent.kind == MEMORY_COMMAND and intent.explicit
+    assert intent.command_content("Remember that my birthday is 27th December") == "my birthday is 27th December"
+
+    text = "...remember, I like green tea"
+    intent = classify(text)
+    assert intent.kind == MEMORY_COMMAND and not intent.explicit
+    assert intent.command_content(text) == "I like green tea"
+
+    assert classify("remembering things is hard").kind == LLM
+    # Only a prefix counts: a command phrase later in the message does not
+    assert classify("did you remember that?").kind == LLM
+
+def test_intents_and_priority():
+    assert classify("recognize neeli for the demo").kind == RECOGNITION
+    assert classify("Please RECOGNISE asha").kind == RECOGNITION
+    assert classify("unrecognize this").kind == LLM
+    assert classify("how many recognitions have I received?").kind == HISTORY
+    assert classify("list users").kind == LIST_USERS
+    assert classify("show user 42").kind == GET_USER
+    assert classify("what is the weather?").kind == LLM
+    # Original check order wins regardless of position in the message
+    assert classify("show user 4 and list users").kind == LIST_USERS
+    assert classify("get user who received recognition, then recognize them").kind == RECOGNITION
+
+def test_recognition_match_is_on_lowercased_text():
+    text = "Please Recognize Neeli Kumar"
+    intent = classify(text)
+    assert text.lower()[intent.match.end():].strip() == "neeli kumar"
+
+def test_strip_filler():
+    assert strip_filler("just remember my birthday was 27th December") == "my birthday was 27th December"
+    assert strip_filler("ok so well I like tea") == "I like tea"
+    assert strip_filler("My sofa is green") == "My sofa is green"
+
+if __name__ == "__main__":
+    test_memory_commands()
+    test_intents_and_priority()
+    test_recognition_match_is_on_lowercased_text()
+    test_strip_filler()
+    print("All intent router tests passed.")
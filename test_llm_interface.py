@@ -0,0 +1,118 @@
+"""
+Tests for AsyncLLMInterface.stream (fake Ollama client, no Ollama needed)
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import ollama
+
+from brain.health import OllamaHealthMonitor
+from brain.llm_interface import AsyncLLMInterface
+
+def _chunk(content, done=False):
+    return SimpleNamespace(message=SimpleNamespace(content=content), done=done, prompt_eval_count=12)
+
+class FakeOllama:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.requests = []
+
+    async def chat(self, model, stream, **kwargs):
+        self.requests.append((model, kwargs))
+        if self.fail:
+            raise self.fail
+
+        async def chunks():
+            for text in ("Hello", " there"):
+                yield _chunk(text)
+            yield _chunk("", done=True)
+        return chunks()
+
+    async def close(self):
+        pass
+
+class FakeListClient:
+    def list(self):
+        return {"models": []}
+
+class HangingListClient:
+    """Sync client whose health probe hangs, like an Ollama that accepts but never answers."""
+
+    def __init__(self):
+        self.list_calls = 0
+
+    def list(self):
+        self.list_calls += 1
+        time.sleep(1.0)
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+def test_stream_never_probes_health_on_the_event_loop():
+    health = OllamaHealthMonitor(client=HangingListClient())   # never probed, state unknown
+    llm = AsyncLLMInterface(health=health)
+    llm.client = FakeOllama()
+
+    start = time.perf_counter()
+    assert "".join(asyncio.run(_collect(llm.stream("hi")))) == "Hello there"
+    assert time.perf_counter() - start < 0.5
+    assert health.client.list_calls == 0
+    # A completed stream is evidence enough that Ollama is up
+    assert health.healthy is True
+
+def test_stream_sends_built_messages_and_records_prompt_stats():
+    llm = AsyncLLMInterface(health=OllamaHealthMonitor(client=FakeListClient()))
+    llm.client = FakeOllama()
+    memories = [{'id': 1, 'category': 'FACT', 'content': "likes tea"}]
+    assert "".join(asyncio.run(_collect(llm.stream("what do I drink?", model="tiny", memories=memories)))) == "Hello there"
+    model, request = llm.client.requests[0]
+    assert model == "tiny"
+    assert request['messages'] == llm.prompt_builder.build("what do I drink?", memories)
+    assert llm.prompt_builder.stats.stats()["last_turn_prompt_eval_tokens"] == 12
+    stats = llm.scheduler.stats()
+    assert stats["in_flight"] == 0 and stats["completed"] == 1
+
+def test_transport_errors_mark_ollama_unhealthy_and_free_the_slot():
+    health = OllamaHealthMonitor(client=FakeListClient())
+    llm = AsyncLLMInterface(health=health)
+    llm.client = FakeOllama(fail=ConnectionError("connection refused"))
+    assert asyncio.run(_collect(llm.stream("hi"))) == ["Error generating response: connection refused"]
+    assert health.healthy is False
+    assert llm.scheduler.stats()["in_flight"] == 0
+
+    # Known down: answer right away without taking a slot or calling Ollama
+    llm.client = FakeOllama()
+    assert asyncio.run(_collect(llm.stream("hi"))) == ["Error: Could not connect to Ollama. Make sure it is running."]
+    assert llm.client.requests == [] and llm.scheduler.stats()["admitted"] == 1
+
+def test_model_errors_do_not_mark_ollama_unhealthy():
+    health = OllamaHealthMonitor(client=FakeListClient())
+    health.mark_success()
+    llm = AsyncLLMInterface(health=health)
+    llm.client = FakeOllama(fail=ollama.ResponseError("model 'nope' not found"))
+    (reply,) = asyncio.run(_collect(llm.stream("hi", model="nope")))
+    assert reply.startswith("Error generating response:") and "not found" in reply
+    assert health.healthy is True and llm.scheduler.stats()["in_flight"] == 0
+
+def test_closing_early_counts_a_cancelled_stream():
+    llm = AsyncLLMInterface(health=OllamaHealthMonitor(client=FakeListClient()))
+    llm.client = FakeOllama()
+
+    async def first_chunk_only():
+        stream = llm.stream("hi")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(first_chunk_only()) == "Hello"
+    assert llm.cancellation_stats()["cancelled_streams"] == 1
+    assert llm.scheduler.stats()["in_flight"] == 0
+
+if __name__ == "__main__":
+    test_stream_never_probes_health_on_the_event_loop()
+    test_stream_sends_built_messages_and_records_prompt_stats()
+    test_transport_errors_mark_ollama_unhealthy_and_free_the_slot()
+    test_model_errors_do_not_mark_ollama_unhealthy()
+    test_closing_early_counts_a_cancelled_stream()
+    print("All LLM interface tests passed.")
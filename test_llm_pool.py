@@ -0,0 +1,72 @@
+"""
+Tests for the multi-host Ollama pool (fake hosts, no Ollama needed)
+"""
+import asyncio
+from types import SimpleNamespace
+
+from brain.llm_pool import LLMPool
+
+class FakeAsyncClient:
+    def __init__(self, words, delay=0.0, fail=False):
+        self.words = words
+        self.delay = delay
+        self.fail = fail
+        self.closed_streams = 0
+
+    async def chat(self, model, stream, **kwargs):
+        async def chunks():
+            try:
+                await asyncio.sleep(self.delay)
+                if self.fail:
+                    raise ConnectionError("connection refused")
+                for i, word in enumerate(self.words):
+                    yield SimpleNamespace(message=SimpleNamespace(content=word), done=i == len(self.words) - 1)
+            finally:
+                self.closed_streams += 1
+        return chunks()
+
+    async def close(self):
+        pass
+
+def _pool(*clients, hedge_after_ms=0):
+    pool = LLMPool([f"http://host{i}:11434" for i in range(len(clients))], hedge_after_ms=hedge_after_ms)
+    for backend, client in zip(pool.backends, clients):
+        backend.client = client
+    return pool
+
+async def _collect(pool, model="llama3.2:1b"):
+    return [chunk.message.content async for chunk in pool.chat_stream(model, messages=[])]
+
+def test_prefers_warm_hosts_then_least_outstanding():
+    pool = _pool(FakeAsyncClient([]), FakeAsyncClient([]), FakeAsyncClient([]))
+    a, b, c = pool.backends
+    a.outstanding, b.outstanding, c.outstanding = 0, 3, 5
+    assert pool.pick("llama3.2:1b") is a
+    b.loaded_models = c.loaded_models = {"llama3.2:1b"}
+    assert pool.pick("llama3.2:1b") is b
+    b.health.mark_failure(ConnectionError("down"))
+    assert pool.pick("llama3.2:1b") is c
+
+def test_fails_over_and_ejects_a_dead_host():
+    dead, alive = FakeAsyncClient(["x"], fail=True), FakeAsyncClient(["hi", " there"])
+    pool = _pool(dead, alive)
+    assert asyncio.run(_collect(pool)) == ["hi", " there"]
+    assert pool.backends[0].health.healthy is False
+    assert pool.stats()["failovers"] == 1
+    assert [b.outstanding for b in pool.backends] == [0, 0]
+
+def test_hedged_request_uses_the_faster_host():
+    slow, fast = FakeAsyncClient(["slow"], delay=0.5), FakeAsyncClient(["fast"])
+    pool = _pool(slow, fast, hedge_after_ms=20)
+    assert asyncio.run(_collect(pool)) == ["fast"]
+    stats = pool.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    # The losing request was cancelled and its stream closed
+    assert slow.closed_streams == 1
+    assert [b.outstanding for b in pool.backends] == [0, 0]
+
+if __name__ == "__main__":
+    test_prefers_warm_hosts_then_least_outstanding()
+    test_fails_over_and_ejects_a_dead_host()
+    test_hedged_request_uses_the_faster_host()
+    print("All LLM pool tests passed.")
@@ -0,0 +1,38 @@
+"""
+Tests for the small-model fast path
+"""
+from brain.model_router import ModelRouter, FAST, REQUESTED
+
+def test_simple_turns_use_the_fast_model():
+    router = ModelRouter(fast_model="llama3.2:1b", max_fast_words=8)
+    for text in ("hi", "Thanks!", "yes", "good morning :)", "ok cool"):
+        assert router.route(text, "llama3.1:8b") == ("llama3.2:1b", FAST), text
+
+def test_escalates_when_the_turn_needs_it():
+    router = ModelRouter(fast_model="llama3.2:1b", max_fast_words=8)
+    assert router.route("why is the sky blue?", "llama3.1:8b") == ("llama3.1:8b", REQUESTED)
+    assert router.route("hey can you help me plan a trip to Japan next spring", "llama3.1:8b")[1] == REQUESTED
+    # Short, but the answer must use recalled memories
+    memories = [{'id': 1, 'category': 'FACT', 'content': 'birthday is 27th December'}]
+    assert router.route("my birthday?", "llama3.1:8b", memories)[1] == REQUESTED
+    assert router.route("my birthday?", "llama3.1:8b")[1] == FAST
+
+def test_requesting_the_fast_model_is_not_a_reroute():
+    router = ModelRouter(fast_model="llama3.2:1b")
+    assert router.route("explain transformers", "llama3.2:1b") == ("llama3.2:1b", REQUESTED)
+    assert router.route("hi", None) == ("llama3.2:1b", REQUESTED)
+
+def test_latency_stats_per_route():
+    router = ModelRouter()
+    router.record(FAST, 0.1, 0.5)
+    router.record(FAST, None, 0.2)
+    routes = router.stats()['routes']
+    assert routes[FAST]['count'] == 2 and routes[REQUESTED]['count'] == 0
+    assert routes[FAST]['first_token_ms']['p50'] == 100.0
+
+if __name__ == "__main__":
+    test_simple_turns_use_the_fast_model()
+    test_escalates_when_the_turn_needs_it()
+    test_requesting_the_fast_model_is_not_a_reroute()
+    test_latency_stats_per_route()
+    print("All model router tests passed.")
@@ -0,0 +1,76 @@
+"""
+Tests for the participant directory (fake user service, no HTTP)
+"""
+import time
+
+from brain.participant_directory import ParticipantDirectory
+
+USERS = [
+    {'userName': 'nkumar', 'fullName': 'Neeli Kumar'},
+    {'userName': 'asha.r', 'fullName': 'Asha Rao'},
+    {'userName': 'raj', 'fullName': 'Rajesh Iyer'},
+]
+
+class FakeUserService:
+    def __init__(self, users):
+        self.users = users
+        self.etag = '"v1"'
+        self.full_downloads = 0
+
+    def get_all_users_if_changed(self, etag=None):
+        if etag == self.etag:
+            return None, etag
+        self.full_downloads += 1
+        return self.users, self.etag
+
+def test_resolves_full_names_usernames_and_first_names():
+    directory = ParticipantDirectory(FakeUserService(USERS))
+    assert directory.resolve("neeli kumar for the demo") == (USERS[0], "neeli kumar")
+    assert directory.resolve("asha.r great job") == (USERS[1], "asha.r")
+    assert directory.resolve("rajesh with thanks") == (USERS[2], "rajesh")
+    # Whole words only: "raj" must not match inside another word
+    assert directory.resolve("the raju team") is None
+
+def test_punctuation_does_not_break_names():
+    directory = ParticipantDirectory(FakeUserService(USERS))
+    # The full name wins over the first name, and the span excludes the comma
+    assert directory.resolve("asha rao, great demo") == (USERS[1], "asha rao")
+    assert directory.resolve("(neeli kumar) thanks!") == (USERS[0], "neeli kumar")
+    assert directory.resolve("asha.r! thanks") == (USERS[1], "asha.r")
+
+def test_fuzzy_match_for_typos():
+    directory = ParticipantDirectory(FakeUserService(USERS))
+    assert directory.resolve("neet for the launch") == (USERS[0], "neet")
+    assert directory.resolve("ashaa thanks") == (USERS[1], "ashaa")
+    assert directory.resolve("someone else") is None
+
+def test_refresh_uses_etag():
+    service = FakeUserService(USERS)
+    directory = ParticipantDirectory(service)
+    directory.refresh()
+    directory.refresh()
+    assert service.full_downloads == 1
+    assert directory.stats()['not_modified'] == 1
+
+    service.users = USERS + [{'userName': 'zoe', 'fullName': 'Zoe Park'}]
+    service.etag = '"v2"'
+    directory.refresh()
+    assert directory.resolve("zoe park")[0]['userName'] == 'zoe'
+
+def test_resolves_quickly_with_thousands_of_participants():
+    users = [{'userName': f'user{i}', 'fullName': f'First{i} Last{i}'} for i in range(5000)]
+    directory = ParticipantDirectory(FakeUserService(users))
+    directory.refresh()
+    start = time.perf_counter()
+    for i in range(0, 5000, 50):
+        assert directory.resolve(f"first{i} last{i} for the release")[0]['userName'] == f'user{i}'
+    per_lookup = (time.perf_counter() - start) / 100
+    assert per_lookup < 0.001
+
+if __name__ == "__main__":
+    test_resolves_full_names_usernames_and_first_names()
+    test_punctuation_does_not_break_names()
+    test_fuzzy_match_for_typos()
+    test_refresh_uses_etag()
+    test_resolves_quickly_with_thousands_of_participants()
+    print("All participant directory tests passed.")
@@ -0,0 +1,49 @@
+"""
+Tests for prefix-stable prompt assembly
+"""
+from brain.prompt_builder import PromptBuilder, PromptStats
+from testutils import memory
+
+def test_prefix_is_identical_across_turns():
+    builder = PromptBuilder("You are Krishna.\nINSTRUCTION: Be brief.")
+    first = builder.build("hi", [memory(1, "likes tea")])
+    second = builder.build("what's my name?", [])
+    assert first[0] == second[0] == {'role': 'system', 'content': "You are Krishna.\nINSTRUCTION: Be brief."}
+    assert second[1] == {'role': 'user', 'content': "what's my name?"}
+
+def test_memories_render_in_a_stable_order():
+    builder = PromptBuilder("prefix")
+    a, b = memory(5, "birthday is 27th December"), memory(2, "name is Krishna")
+    pending = {'category': 'FACT', 'content': "just said this"}
+    one = builder.build("q", [a, b, pending, dict(b)])
+    two = builder.build("q", [pending, b, a])
+    assert one == two
+    assert one[1] == {'role': 'system', 'content': ("Relevant Memories:\n"
+                                                    "- [FACT] name is Krishna\n"
+                                                    "- [FACT] birthday is 27th December\n"
+                                                    "- [FACT] just said this")}
+    assert one[2] == {'role': 'user', 'content': "q"}
+
+def test_same_memories_keep_the_prefix_across_questions():
+    builder = PromptBuilder("prefix")
+    memories = [memory(1, "likes tea"), memory(2, "works on Atlas")]
+    first = builder.build("what do I drink?", memories)
+    second = builder.build("what do I work on?", list(reversed(memories)))
+    # Only the final user message differs, so Ollama can reuse everything before it
+    assert first[:-1] == second[:-1]
+    assert first[-1] != second[-1]
+
+def test_stats_report_raw_prompt_eval_counts():
+    stats = PromptStats()
+    stats.record(100)
+    stats.record(30)
+    stats.record(None)   # no count reported, e.g. an aborted stream
+    assert stats.stats() == {"turns": 2, "prompt_eval_tokens": 130,
+                             "prompt_eval_tokens_per_turn": 65.0, "last_turn_prompt_eval_tokens": 30}
+
+if __name__ == "__main__":
+    test_prefix_is_identical_across_turns()
+    test_memories_render_in_a_stable_order()
+    test_same_memories_keep_the_prefix_across_questions()
+    test_stats_report_raw_prompt_eval_counts()
+    print("All prompt builder tests passed.")
@@ -0,0 +1,57 @@
+"""
+Tests for the LLM response cache (no Ollama or Postgres needed)
+"""
+import asyncio
+
+from brain.embeddings import HashingEmbedder
+from brain.response_cache import ResponseCache
+
+MEMORIES = [{'id': 4, 'category': 'FACT', 'content': 'name is Krishna'}]
+
+def test_key_normalizes_prompt_and_includes_memories():
+    key = ResponseCache.make_key("llama3.2:1b", "Do you remember my NAME?", MEMORIES)
+    assert key == ResponseCache.make_key("llama3.2:1b", "do you remember my name", MEMORIES)
+    assert key != ResponseCache.make_key("llama3.2:1b", "do you remember my name", [])
+    assert key != ResponseCache.make_key("llama3.1:8b", "do you remember my name", MEMORIES)
+    assert ResponseCache.make_key("llama3.2:1b", "What time is it?") is None
+
+def test_hit_replays_the_same_text():
+    cache = ResponseCache()
+    key = cache.make_key("llama3.2:1b", "Tell me a very short joke.")
+    assert cache.get(key) is None
+    cache.put(key, "Why did the  chicken cross the road? To get to the other side.")
+
+    async def replay():
+        return [chunk async for chunk in cache.replay(cache.get(key))]
+    chunks = asyncio.run(replay())
+    assert len(chunks) > 1
+    assert "".join(chunks) == "Why did the  chicken cross the road? To get to the other side."
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_deleting_a_memory_evicts_its_responses():
+    cache = ResponseCache()
+    with_memory = cache.make_key("m", "my name?", MEMORIES)
+    without = cache.make_key("m", "hello")
+    cache.put(with_memory, "Krishna")
+    cache.put(without, "Hi!")
+    cache.on_memory_change("add", [{'id': 9, 'category': 'FACT', 'content': 'hello world'}])
+    cache.on_memory_change("delete", [{'id': 4}])
+    assert cache.get(with_memory) is None
+    assert cache.get(without) == "Hi!"
+
+def test_similar_prompts_hit_with_an_embedder():
+    cache = ResponseCache(embedder=HashingEmbedder(), similarity=0.9)
+    cache.put(cache.make_key("m", "what is your favorite color", MEMORIES), "Blue.")
+    assert cache.get(cache.make_key("m", "what is your favourite colour", MEMORIES)) is None
+    assert cache.get(cache.make_key("m", "What is your favorite color??", MEMORIES)) == "Blue."
+    assert cache.get(cache.make_key("m", "your favorite color is what", MEMORIES)) == "Blue."
+    # Same prompt with different memories is a different conversation
+    assert cache.get(cache.make_key("m", "your favorite color is what", [])) is None
+    assert cache.stats()['semantic_hits'] == 1
+
+if __name__ == "__main__":
+    test_key_normalizes_prompt_and_includes_memories()
+    test_hit_replays_the_same_text()
+    test_deleting_a_memory_evicts_its_responses()
+    test_similar_prompts_hit_with_an_embedder()
+    print("All response cache tests passed.")
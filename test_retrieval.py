@@ -0,0 +1,83 @@
+"""
+Tests for hybrid retrieval fusion (no Ollama or Postgres needed)
+"""
+import asyncio
+import datetime
+import time
+
+from brain.retrieval import HybridRetriever
+from testutils import memory
+
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+def _memory(memory_id, days_old=0, confidence=1.0):
+    stamp = NOW - datetime.timedelta(days=days_old)
+    return memory(memory_id, f"memory {memory_id}", confidence_score=confidence,
+                  created_at=stamp, last_accessed=stamp)
+
+def test_rrf_prefers_memories_found_by_both_legs():
+    retriever = HybridRetriever(legs={}, recency_weight=0, confidence_weight=0)
+    fused = retriever.fuse({
+        "keyword": [_memory(1), _memory(2), _memory(3)],
+        "semantic": [_memory(4), _memory(3), _memory(1)],
+    }, k=2, now=NOW)
+    assert [m['id'] for m in fused] == [1, 3]
+
+def test_recency_and_confidence_break_ties():
+    retriever = HybridRetriever(legs={})
+    fused = retriever.fuse({
+        "keyword": [_memory(1, days_old=365), _memory(2, days_old=0)],
+        "semantic": [_memory(2, days_old=0), _memory(1, days_old=365)],
+    }, k=2, now=NOW)
+    assert fused[0]['id'] == 2
+
+    fused = retriever.fuse({"keyword": [_memory(1, confidence=0.1)], "semantic": [_memory(2)]}, k=2, now=NOW)
+    assert fused[0]['id'] == 2
+
+def test_legs_run_concurrently():
+    def slow_leg(query, k):
+        time.sleep(0.2)
+        return [_memory(1)]
+
+    retriever = HybridRetriever(legs={"keyword": slow_leg, "semantic": slow_leg})
+    start = time.perf_counter()
+    assert retriever.retrieve("anything")[0]['id'] == 1
+    assert time.perf_counter() - start < 0.35
+
+    async def slow_async_leg(query, k):
+        await asyncio.sleep(0.2)
+        return [_memory(2)]
+
+    retriever = HybridRetriever(legs={"keyword": slow_leg, "semantic": slow_leg},
+                                async_legs={"keyword": slow_async_leg})
+    start = time.perf_counter()
+    ids = {m['id'] for m in asyncio.run(retriever.aretrieve("anything"))}
+    assert ids == {1, 2}
+    assert time.perf_counter() - start < 0.35
+
+def test_failing_leg_does_not_break_retrieval():
+    def broken(query, k):
+        raise RuntimeError("db down")
+
+    retriever = HybridRetriever(legs={"keyword": broken, "semantic": lambda q, k: [_memory(5)]})
+    assert [m['id'] for m in retriever.retrieve("anything")] == [5]
+
+def test_weak_semantic_only_hits_are_dropped():
+    retriever = HybridRetriever(legs={}, recency_weight=0, confidence_weight=0, min_similarity=0.4)
+    fused = retriever.fuse({
+        "keyword": [_memory(1)],
+        # 1 is weak but confirmed by the keyword leg; 3 is weak and semantic-only
+        "semantic": [dict(_memory(2), score=0.8), dict(_memory(1), score=0.1), dict(_memory(3), score=0.2)],
+    }, k=5, now=NOW)
+    assert sorted(m['id'] for m in fused) == [1, 2]
+
+    # Nothing relevant at all: no memories rather than the nearest unrelated ones
+    assert retriever.fuse({"keyword": [], "semantic": [dict(_memory(4), score=0.05)]}, k=5, now=NOW) == []
+
+if __name__ == "__main__":
+    test_rrf_prefers_memories_found_by_both_legs()
+    test_recency_and_confidence_break_ties()
+    test_legs_run_concurrently()
+    test_failing_leg_does_not_break_retrieval()
+    test_weak_semantic_only_hits_are_dropped()
+    print("All retrieval tests passed.")
@@ -0,0 +1,68 @@
+"""
+Tests for the retrieval result cache (no Postgres needed)
+"""
+from brain.retrieval_cache import RetrievalCache
+from testutils import memory
+
+def test_equivalent_questions_share_an_entry():
+    cache = RetrievalCache()
+    key = cache.make_key("Do you remember my name?")
+    assert key == cache.make_key("remember name")
+
+    memories, version = cache.get(key)
+    assert memories is None
+    cache.put(key, [memory(1, "name is Krishna")], version)
+    memories, _ = cache.get(cache.make_key("do you REMEMBER my name"))
+    assert memories[0]['id'] == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_add_only_invalidates_matching_entries():
+    cache = RetrievalCache()
+    name_key, coffee_key = cache.make_key("my name"), cache.make_key("favourite coffee")
+    for key in (name_key, coffee_key):
+        _, version = cache.get(key)
+        cache.put(key, [], version)
+
+    cache.on_memory_change("add", [memory(7, "Coffee order is a flat white")])
+    assert cache.get(coffee_key)[0] is None
+    assert cache.get(name_key)[0] == []
+
+def test_delete_invalidates_entries_containing_the_id():
+    cache = RetrievalCache()
+    key = cache.make_key("birthday")
+    _, version = cache.get(key)
+    cache.put(key, [memory(3, "birthday is 27th December")], version)
+    cache.on_memory_change("delete", [{'id': 3}])
+    assert cache.get(key)[0] is None
+
+def test_generation_mode_and_racing_puts():
+    cache = RetrievalCache(invalidation="generation")
+    key = cache.make_key("birthday")
+    _, version = cache.get(key)
+    cache.on_memory_change("add", [memory(9, "unrelated")])
+    # A result computed before the write must not be cached after it
+    cache.put(key, [], version)
+    assert cache.get(key)[0] is None
+    assert cache.stats()['generation'] == 1
+
+def test_ttl_and_lru_bounds():
+    cache = RetrievalCache(max_entries=2, ttl=0)
+    key = cache.make_key("birthday")
+    _, version = cache.get(key)
+    cache.put(key, [], version)
+    assert cache.get(key)[0] is None
+
+    cache = RetrievalCache(max_entries=2)
+    for query in ("alpha", "beta", "gamma"):
+        _, version = cache.get(cache.make_key(query))
+        cache.put(cache.make_key(query), [], version)
+    assert cache.get(cache.make_key("alpha"))[0] is None
+    assert cache.stats()['evictions'] == 1
+
+if __name__ == "__main__":
+    test_equivalent_questions_share_an_entry()
+    test_add_only_invalidates_matching_entries()
+    test_delete_invalidates_entries_containing_the_id()
+    test_generation_mode_and_racing_puts()
+    test_ttl_and_lru_bounds()
+    print("All retrieval cache tests passed.")
@@ -0,0 +1,114 @@
+"""
+Tests for memory search query building and mode fallback (fake connection, no Postgres needed)
+"""
+import psycopg2
+
+from brain import db
+from testutils import patch_db
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise psycopg2.errors.UndefinedColumn("column \"content_tsv\" does not exist")
+
+    def fetchall(self):
+        return [dict(row) for row in self.conn.rows]
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, rows=(), fail_on=None):
+        self.rows = list(rows)
+        self.fail_on = fail_on
+        self.executed = []
+        self.rollbacks = 0
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def _search_with(conn, *args, **kwargs):
+    with patch_db(get_db_connection=lambda: conn, return_connection=lambda c: None):
+        return db.search_memories(*args, **kwargs)
+
+def test_ilike_query_matches_each_keyword_and_the_phrase():
+    sql, params = db.build_search_query("When is my birthday?", 5, "ilike")
+    assert sql.count("content ILIKE %s") == 3   # relevance CASE, keyword, whole phrase
+    assert params == ("%When is my birthday?%", "%birthday%", "%When is my birthday?%", 5)
+
+    sql, params = db.build_search_query("how did I?", 3, "ilike")
+    assert params == ("%how did I?%", 3) and "relevance" not in sql
+
+def test_fts_query_ors_keywords_and_ranks():
+    sql, params = db.build_search_query("what is my coffee order?", 4, "fts")
+    assert params == ("coffee or order", 4)
+    assert "websearch_to_tsquery('english', %s)" in sql and "content_tsv @@ query" in sql
+    assert "ORDER BY relevance DESC" in sql and "ts_rank_cd" in sql
+    # No keywords left: search the raw text
+    assert db.build_search_query("who are you?", 4, "fts")[1] == ("who are you?", 4)
+
+def test_unknown_mode_is_rejected():
+    try:
+        db.build_search_query("tea", 5, "vector")
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "vector" in str(e)
+
+def test_only_trigram_needs_setup_statements():
+    assert db.search_setup_statements("ilike") == []
+    assert db.search_setup_statements("fts") == []
+
+def test_trigram_query_uses_the_word_similarity_operator():
+    sql, params = db.build_search_query("my cofee order", 5, "trigram")
+    # <%% is psycopg2's escape for the literal <% operator
+    assert sql.count("%s <%% content") == 2 and sql.count("word_similarity(%s, content)") == 2
+    assert params == ("cofee", "order", "cofee", "order", 5)
+    assert db.build_search_query("Who Are You", 5, "trigram")[1] == ("who are you", "who are you", 5)
+
+def test_trigram_setup_sets_the_threshold():
+    assert db.search_setup_statements("trigram") == [
+        ("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", (str(db.TRIGRAM_THRESHOLD),))]
+    assert db.search_setup_statements("trigram", threshold=0.6)[0][1] == ("0.6",)
+
+def test_trigram_search_runs_setup_before_the_query():
+    conn = FakeConnection(rows=[{'id': 1, 'content': "likes coffee", 'relevance': 0.8}])
+    assert _search_with(conn, "cofee", mode="trigram", threshold=0.5) == [{'id': 1, 'content': "likes coffee"}]
+    (setup_sql, setup_params), (sql, params) = conn.executed
+    assert "set_config" in setup_sql and setup_params == ("0.5",)
+    assert "<%% content" in sql and params == ("cofee", "cofee", 5)
+
+def test_failed_fts_search_falls_back_to_ilike_and_drops_relevance():
+    conn = FakeConnection(rows=[{'id': 3, 'content': "birthday is 27th December", 'relevance': 2}],
+                          fail_on="content_tsv")
+    memories = _search_with(conn, "my birthday", mode="fts")
+    assert memories == [{'id': 3, 'content': "birthday is 27th December"}]
+    assert conn.rollbacks == 1
+    assert "ILIKE" in conn.executed[-1][0] and "content_tsv" not in conn.executed[-1][0]
+
+def test_failed_ilike_search_is_not_retried():
+    conn = FakeConnection(fail_on="ILIKE")
+    try:
+        _search_with(conn, "tea", mode="ilike")
+        assert False, "expected the database error"
+    except psycopg2.Error:
+        pass
+    assert len(conn.executed) == 1
+
+if __name__ == "__main__":
+    test_ilike_query_matches_each_keyword_and_the_phrase()
+    test_fts_query_ors_keywords_and_ranks()
+    test_unknown_mode_is_rejected()
+    test_only_trigram_needs_setup_statements()
+    test_trigram_query_uses_the_word_similarity_operator()
+    test_trigram_setup_sets_the_threshold()
+    test_trigram_search_runs_setup_before_the_query()
+    test_failed_fts_search_falls_back_to_ilike_and_drops_relevance()
+    test_failed_ilike_search_is_not_retried()
+    print("All search mode tests passed.")
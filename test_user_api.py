@@ -10,7 +10,7 @@ from brain.user_service import UserServiceConnector
 from digital_self import DigitalSelf
 
 class TestUserServiceIntegration(unittest.TestCase):
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_get_all_users(self, mock_get):
         # Mocking the Spring Boot response
         mock_response = MagicMock()
@@ -0,0 +1,220 @@
+"""
+Tests for the user service connectors' retry, circuit breaker and coalescing
+policy (fake session / httpx mock transport, no real HTTP)
+"""
+import asyncio
+import time
+
+import httpx
+import requests
+
+from brain import user_service
+from brain.user_service import (
+    UserServiceConnector, AsyncUserServiceConnector, CircuitBreaker, CircuitOpenError, CLOSED, OPEN,
+)
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code))
+
+    def close(self):
+        pass
+
+class FakeSession:
+    """Returns (or raises) the scripted outcomes in order, repeating the last one."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append((method, url, timeout))
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def _connector(session, breaker=None, **kwargs):
+    connector = UserServiceConnector(breaker=breaker or CircuitBreaker(failure_threshold=3, reset_timeout=0.05), **kwargs)
+    connector.session = session
+    return connector
+
+def test_retries_reads_then_succeeds():
+    previous_backoff, user_service.BACKOFF = user_service.BACKOFF, 0.001
+    try:
+        session = FakeSession(FakeResponse(503), requests.exceptions.ConnectionError("reset"), FakeResponse(200, {"id": 7}))
+        connector = _connector(session)
+        assert connector.get_user_by_id(7) == {"id": 7}
+        assert len(session.calls) == 3
+        assert connector.stats()["retries"] == 2
+        # Every attempt carries a (connect, read) timeout
+        assert all(isinstance(timeout, tuple) and timeout[1] > 0 for _, _, timeout in session.calls)
+    finally:
+        user_service.BACKOFF = previous_backoff
+
+def test_posts_are_not_retried_after_sending():
+    session = FakeSession(requests.exceptions.ReadTimeout("slow"), FakeResponse(200))
+    connector = _connector(session)
+    assert connector.recognize(1, "asha", "thanks").startswith("Error")
+    assert len(session.calls) == 1
+
+def test_breaker_fails_fast_and_recovers():
+    previous_backoff, user_service.BACKOFF = user_service.BACKOFF, 0.001
+    try:
+        session = FakeSession(requests.exceptions.ConnectionError("refused"))
+        connector = _connector(session, max_retries=0)
+        for _ in range(3):
+            assert connector.get_user_by_id(1) is None
+        assert connector.breaker.state == OPEN
+
+        calls = len(session.calls)
+        assert connector.get_user_by_id(1) is None
+        assert len(session.calls) == calls  # rejected without touching the network
+        try:
+            connector._request("GET", "/participants")
+            assert False, "expected CircuitOpenError"
+        except CircuitOpenError:
+            pass
+
+        # After the reset timeout one trial call goes through and closes the breaker
+        time.sleep(0.06)
+        session.outcomes = [FakeResponse(200, [])]
+        assert connector.get_all_users() == []
+        assert connector.breaker.state == CLOSED
+    finally:
+        user_service.BACKOFF = previous_backoff
+
+def test_unexpected_error_in_trial_call_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    # The half-open trial dies with something _request doesn't treat as a service failure
+    connector = _connector(FakeSession(ValueError("bad payload")), breaker=breaker)
+    try:
+        connector._request("GET", "/participants")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert breaker.allow()   # the trial slot was released
+
+def test_half_open_trial_times_out():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()        # trial starts and never reports back
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()        # a new trial replaces the stuck one
+
+def _async_connector(handler, breaker=None, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncUserServiceConnector(breaker=breaker, client=client, **kwargs)
+
+def test_async_lookups_for_one_user_are_coalesced():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"userName": "krishna"})
+
+    async def run():
+        connector = _async_connector(handler)
+        users = await asyncio.gather(*[connector.get_user_by_id(7) for _ in range(20)])
+        other = await connector.get_user_by_id(8)
+        await connector.aclose()
+        return connector, users, other
+
+    connector, users, other = asyncio.run(run())
+    assert all(user == {"userName": "krishna"} for user in users)
+    assert other == {"userName": "krishna"}
+    assert calls == ["/empengagement/participants/7", "/empengagement/participants/8"]
+    assert connector.stats()["coalesced"] == 19
+    assert connector.stats()["in_flight_lookups"] == 0
+
+def test_async_cancelled_caller_does_not_cancel_shared_lookup():
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"userName": "krishna"})
+
+    async def run():
+        connector = _async_connector(handler)
+        first = asyncio.create_task(connector.get_user_by_id(7))
+        second = asyncio.create_task(connector.get_user_by_id(7))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        await connector.aclose()
+        return result
+
+    assert asyncio.run(run()) == {"userName": "krishna"}
+
+def test_async_connector_shares_the_breaker():
+    previous_backoff, user_service.BACKOFF = user_service.BACKOFF, 0.001
+    try:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        calls = []
+
+        def handler(request):
+            calls.append(request.method)
+            raise httpx.ConnectError("refused", request=request)
+
+        async def run():
+            connector = _async_connector(handler, breaker=breaker, max_retries=1)
+            history = await connector.get_recognition_history(7)
+            await connector.log_message(7, "krishna", "user", "hi")
+            await connector.aclose()
+            return history
+
+        assert asyncio.run(run()) == []
+        assert breaker.state == OPEN
+        # The comm-log POST was rejected by the breaker opened by the failed lookup
+        assert calls == ["GET", "GET"]
+        # ...and so is the sync connector sharing it
+        assert _connector(FakeSession(FakeResponse(200, {})), breaker=breaker).get_user_by_id(7) is None
+    finally:
+        user_service.BACKOFF = previous_backoff
+
+def test_async_cancelled_trial_releases_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    async def handler(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={})
+
+    async def run():
+        connector = _async_connector(handler, breaker=breaker)
+        trial = asyncio.create_task(connector.recognize(1, "asha", "thanks"))
+        await asyncio.sleep(0.02)
+        trial.cancel()
+        try:
+            await trial
+        except asyncio.CancelledError:
+            pass
+        await connector.aclose()
+
+    asyncio.run(run())
+    assert breaker.allow()
+
+if __name__ == "__main__":
+    test_retries_reads_then_succeeds()
+    test_posts_are_not_retried_after_sending()
+    test_breaker_fails_fast_and_recovers()
+    test_unexpected_error_in_trial_call_does_not_wedge_the_breaker()
+    test_half_open_trial_times_out()
+    test_async_lookups_for_one_user_are_coalesced()
+    test_async_cancelled_caller_does_not_cancel_shared_lookup()
+    test_async_connector_shares_the_breaker()
+    test_async_cancelled_trial_releases_the_breaker()
+    print("All user service tests passed.")
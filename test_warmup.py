@@ -0,0 +1,55 @@
+"""
+Tests for model warm-up (fake Ollama client, no server needed)
+"""
+import time
+
+from brain.health import OllamaHealthMonitor
+from brain.warmup import ModelWarmer
+
+class FakeClient:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    def generate(self, model, prompt, keep_alive):
+        self.calls.append(("generate", model, keep_alive))
+        if model in self.fail:
+            raise ConnectionError("model not found")
+
+    def embed(self, model, input, keep_alive):
+        self.calls.append(("embed", model, keep_alive))
+
+    def list(self):
+        return []
+
+def test_warms_chat_and_embedding_models_with_keep_alive():
+    client = FakeClient(fail={"missing"})
+    warmer = ModelWarmer(["llama3.2:1b", "missing"], ["nomic-embed-text", None], keep_alive="30m", client=client)
+    assert warmer.warm() == ["missing"]
+    assert client.calls == [
+        ("generate", "llama3.2:1b", "30m"),
+        ("generate", "missing", "30m"),
+        ("embed", "nomic-embed-text", "30m"),
+    ]
+    assert set(warmer.stats()["load_time_s"]) == {"llama3.2:1b", "nomic-embed-text"}
+
+def test_rewarms_when_ollama_recovers():
+    client = FakeClient()
+    warmer = ModelWarmer(["llama3.2:1b"], client=client)
+    health = OllamaHealthMonitor(client=client)
+    warmer.attach(health)
+
+    health.mark_success()
+    health.mark_failure(ConnectionError("restarting"))
+    assert client.calls == []
+    health.mark_success()
+    for _ in range(100):
+        if warmer.warmups:
+            break
+        time.sleep(0.01)
+    assert client.calls == [("generate", "llama3.2:1b", warmer.keep_alive)]
+
+if __name__ == "__main__":
+    test_warms_chat_and_embedding_models_with_keep_alive()
+    test_rewarms_when_ollama_recovers()
+    print("All warm-up tests passed.")
@@ -0,0 +1,100 @@
+"""
+Tests for the write-behind queue (fake user service and db writes, no Postgres needed)
+"""
+import threading
+
+from brain import write_behind
+from brain.write_behind import WriteBehindQueue, CONVERSATION, MEMORY
+from testutils import patch_db
+
+class FakeUserService:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.messages = []
+
+    def log_message(self, user_id, user_name, role, content):
+        self.messages.append((user_id, role, content))
+        return self.ok
+
+def test_writes_are_flushed_in_batches():
+    batches = []
+    with patch_db(log_conversations_bulk=lambda rows: batches.append(list(rows)) or True,
+                  add_memories_bulk=lambda rows: list(range(len(rows)))):
+        # A long interval means only max_batch can trigger the first flushes
+        queue = WriteBehindQueue(max_batch=3, flush_interval=60)
+        for i in range(7):
+            queue.log_conversation(f"q{i}", f"a{i}")
+        queue.add_memory("FACT", "likes tea")
+        assert queue.flush()
+        queue.close()
+        assert [len(b) for b in batches] == [3, 3, 1]
+        assert batches[0][0] == ("q0", "a0", "unknown")
+        assert queue.stats() == {"queued": 0, "flushed": 8, "failed": 0, "batches": 3}
+
+def test_pending_writes_stay_visible_until_persisted():
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_bulk(rows):
+        started.set()
+        release.wait(5)
+        return list(range(len(rows)))
+
+    with patch_db(add_memories_bulk=slow_bulk):
+        try:
+            queue = WriteBehindQueue(max_batch=1, flush_interval=60)
+            queue.add_memory("FACT", "dog is Bruno", session_id="s1")
+            assert started.wait(5)
+            # In flight: still readable by its own session only
+            queue.add_memory("FACT", "cat is Tom", session_id="s2")
+            assert queue.pending("s1") == [("FACT", "dog is Bruno", 1.0, "user_interaction")]
+            assert queue.pending("s1", kind=CONVERSATION) == []
+            assert [p[1] for p in queue.pending("s2", kind=MEMORY)] == ["cat is Tom"]
+            release.set()
+            assert queue.flush()
+            assert queue.pending("s1") == [] and queue.pending("s2") == []
+            queue.close()
+        finally:
+            release.set()
+
+def test_failed_flush_is_counted_and_closed_queue_writes_directly():
+    calls = []
+    with patch_db(log_conversations_bulk=lambda rows: calls.append(len(rows)) or False):
+        queue = WriteBehindQueue(flush_interval=0.05)
+        queue.log_conversation("hi", "hello")
+        assert queue.flush()
+        queue.close()
+        assert queue.stats()["failed"] == 1 and queue.stats()["flushed"] == 0
+        # After close there is no flusher left, so the write happens inline
+        queue.log_conversation("bye", "goodbye")
+        assert calls == [1, 1] and queue.stats()["queued"] == 0
+
+def test_comm_log_failures_are_counted():
+    queue = WriteBehindQueue(user_service=FakeUserService(ok=False))
+    queue.log_message(7, "krishna", "user", "hi")
+    assert queue.flush()
+    queue.close()
+    assert queue.stats()["failed"] == 1 and queue.stats()["flushed"] == 0
+
+    queue = WriteBehindQueue(user_service=FakeUserService(ok=True))
+    queue.log_message(7, "krishna", "user", "hi")
+    queue.log_message(7, "krishna", "assistant", "hello")
+    assert queue.flush()
+    queue.close()
+    assert queue.stats()["flushed"] == 2
+    assert [m[1] for m in queue.user_service.messages] == ["user", "assistant"]
+
+def test_queues_share_one_exit_hook():
+    queues = [WriteBehindQueue() for _ in range(3)]
+    assert all(q in write_behind._open_queues for q in queues)
+    for q in queues:
+        q.close()
+    assert not any(q in write_behind._open_queues for q in queues)
+
+if __name__ == "__main__":
+    test_writes_are_flushed_in_batches()
+    test_pending_writes_stay_visible_until_persisted()
+    test_failed_flush_is_counted_and_closed_queue_writes_directly()
+    test_comm_log_failures_are_counted()
+    test_queues_share_one_exit_hook()
+    print("All write-behind tests passed.")
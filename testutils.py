@@ -0,0 +1,22 @@
+"""
+Shared helpers for the test_*.py files (fakes that need no Postgres or Ollama)
+"""
+from contextlib import contextmanager
+
+from brain import db
+
+def memory(memory_id, content, category='FACT', **fields):
+    """A long_term_memory row as db's listeners and retrieval legs pass it around."""
+    return dict({'id': memory_id, 'category': category, 'content': content}, **fields)
+
+@contextmanager
+def patch_db(**functions):
+    """Temporarily replaces brain.db functions, e.g. patch_db(add_memories_bulk=fake)."""
+    originals = {name: getattr(db, name) for name in functions}
+    for name, fn in functions.items():
+        setattr(db, name, fn)
+    try:
+        yield
+    finally:
+        for name, fn in originals.items():
+            setattr(db, name, fn)
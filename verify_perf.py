@@ -15,6 +15,15 @@ def verify_performance():
     duration = time.time() - start
     print(f"Write 50 items took: {duration:.4f}s (Avg: {duration/50:.4f}s/item)")
 
+    # Measure Bulk Write Speed (single transaction)
+    print("\nBulk writing 5000 memories...")
+    start = time.time()
+    ids = db.add_memories_bulk(
+        ("FACT", f"Bulk perf memory item {i} - checking indexing capability") for i in range(5000)
+    )
+    duration = time.time() - start
+    print(f"Bulk write {len(ids)} items took: {duration:.4f}s (Avg: {duration/5000:.6f}s/item)")
+
     # Measure Read Speed
     print("\nReading recent memories...")
     start = time.time()
@@ -29,6 +38,8 @@ def verify_performance():
     print(f"Search took: {time.time() - start:.4f}s")
     print(f"Found {len(results)} matches.")
 
+    print(f"\nPool stats: {db.pool_stats()}")
+
     print("\nClosing Pool...")
     db.close_pool()
     print("Done.")